@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tools.database.database import Base
 from config import settings
+import models  # noqa: F401  注册所有模型到 Base.metadata，autogenerate 才能对比表结构
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,108 @@
+"""初始表结构：users、conversion_records、payment_records、daily_usage
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+与引入迁移之前 models.py 建出的表一致（daily_usage.usage_date 仍为带时区的DATETIME，由 0002 改为DATE）。
+新库从这里开始 `alembic upgrade head`；此前已由 create_all 或 tools/database/*.sql 建好表的库，
+先执行 `alembic stamp 0000` 再升级。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+USER_ROLE = sa.Enum("FREE", "VIP", "SVIP", name="userrole")
+PAYMENT_METHOD = sa.Enum("ALIPAY", "WECHAT", name="paymentmethod")
+PAYMENT_STATUS = sa.Enum("PENDING", "SUCCESS", "FAILED", "CANCELLED", name="paymentstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("hashed_password", sa.String(length=255), nullable=True),
+        sa.Column("role", USER_ROLE, nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("wechat_openid", sa.String(length=100), nullable=True),
+        sa.Column("wechat_unionid", sa.String(length=100), nullable=True),
+        sa.Column("wechat_nickname", sa.String(length=100), nullable=True),
+        sa.Column("wechat_avatar", sa.String(length=500), nullable=True),
+        sa.Column("is_wechat_user", sa.Boolean(), nullable=True),
+        sa.Column("auth0_id", sa.String(length=100), nullable=True),
+        sa.Column("auth0_name", sa.String(length=100), nullable=True),
+        sa.Column("auth0_picture", sa.String(length=500), nullable=True),
+        sa.Column("is_auth0_user", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_users_id"), "users", ["id"])
+    op.create_index(op.f("ix_users_username"), "users", ["username"], unique=True)
+    op.create_index(op.f("ix_users_email"), "users", ["email"], unique=True)
+    op.create_index(op.f("ix_users_wechat_openid"), "users", ["wechat_openid"], unique=True)
+    op.create_index(op.f("ix_users_auth0_id"), "users", ["auth0_id"], unique=True)
+
+    op.create_table(
+        "conversion_records",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("original_filename", sa.String(length=255), nullable=False),
+        sa.Column("original_format", sa.String(length=10), nullable=False),
+        sa.Column("target_format", sa.String(length=10), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("conversion_time", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_conversion_records_id"), "conversion_records", ["id"])
+
+    op.create_table(
+        "payment_records",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("order_id", sa.String(length=100), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("payment_method", PAYMENT_METHOD, nullable=False),
+        sa.Column("status", PAYMENT_STATUS, nullable=True),
+        sa.Column("transaction_id", sa.String(length=100), nullable=True),
+        sa.Column("target_role", USER_ROLE, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("order_id"),
+    )
+    op.create_index(op.f("ix_payment_records_id"), "payment_records", ["id"])
+
+    op.create_table(
+        "daily_usage",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("usage_date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("usage_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_daily_usage_id"), "daily_usage", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("daily_usage", "payment_records", "conversion_records", "users"):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in (PAYMENT_STATUS, PAYMENT_METHOD, USER_ROLE):
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,60 @@
+"""conversion_records按created_at月份范围分区（仅MySQL）
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-19 00:00:00
+
+分区表的要求：
+    - 主键必须包含分区列，主键改为 (id, created_at)
+    - InnoDB分区表不支持外键，去掉 user_id 外键（关联关系仍由ORM维护）
+    - RANGE COLUMNS 不支持TIMESTAMP，created_at 改为 DATETIME NOT NULL
+已有记录按最早记录所在月份起建分区，并预建 conversion_partition_premake_months 个未来月份，
+之后由调度器的 maintain_conversion_partitions 继续预建和删除过期分区。
+其他数据库不做任何修改。
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+from tools.database.partitioning import (
+    PARTITIONED_TABLE, add_months, list_partitions, month_range, month_start, partition_by_clause
+)
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql" or list_partitions(bind):
+        return
+
+    for foreign_key in sa.inspect(bind).get_foreign_keys(PARTITIONED_TABLE):
+        op.drop_constraint(foreign_key["name"], PARTITIONED_TABLE, type_="foreignkey")
+
+    op.execute(f"UPDATE {PARTITIONED_TABLE} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute(f"ALTER TABLE {PARTITIONED_TABLE} MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP")
+    op.execute(f"ALTER TABLE {PARTITIONED_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+
+    today = date.today()
+    first = bind.execute(sa.text(f"SELECT MIN(created_at) FROM {PARTITIONED_TABLE}")).scalar() or today
+    months = month_range(first, add_months(month_start(today), settings.conversion_partition_premake_months))
+    op.execute(f"ALTER TABLE {PARTITIONED_TABLE} {partition_by_clause(months)}")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql" or not list_partitions(bind):
+        return
+
+    op.execute(f"ALTER TABLE {PARTITIONED_TABLE} REMOVE PARTITIONING")
+    op.execute(f"ALTER TABLE {PARTITIONED_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.create_foreign_key(
+        "fk_conversion_records_user_id", PARTITIONED_TABLE, "users", ["user_id"], ["id"]
+    )
@@ -0,0 +1,82 @@
+"""热点查询索引，daily_usage.usage_date 改为DATE
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+    - daily_usage：合并同一用户同一天的重复行，usage_date 改为 DATE，加 (user_id, usage_date) 唯一约束，
+      当天用量查询不再对每行计算 DATE(usage_date)
+    - payment_records：(user_id, created_at)，用户支付记录倒序分页
+    - 此前以 tools/database/*.sql 发布的索引一并纳入迁移（已存在时跳过）：
+      payment_records (status, created_at)、conversion_records (user_id, created_at, id)
+users 的用户名/邮箱登录查询由两个唯一索引分别命中（OR 走索引合并），不需要新增索引，
+可用 tools/database/query_plan_check.py 检查各热点查询的执行计划。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("payment_records", "idx_payment_records_user_created_at", ["user_id", "created_at"]),
+    ("payment_records", "idx_payment_records_status_created_at", ["status", "created_at"]),
+    ("conversion_records", "idx_conversion_records_user_created_id", ["user_id", "created_at", "id"]),
+)
+
+daily_usage = sa.table(
+    "daily_usage",
+    sa.column("id", sa.Integer),
+    sa.column("user_id", sa.Integer),
+    sa.column("usage_date", sa.DateTime),
+    sa.column("usage_count", sa.Integer),
+)
+
+
+def _existing_indexes(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    names = {index["name"] for index in inspector.get_indexes(table)}
+    return names | {constraint["name"] for constraint in inspector.get_unique_constraints(table)}
+
+
+def _merge_duplicate_daily_usage() -> None:
+    """同一用户同一天有多行时，把用量累加到id最小的一行并删除其余行"""
+    bind = op.get_bind()
+    usage_day = sa.func.date(daily_usage.c.usage_date)
+    duplicates = bind.execute(
+        sa.select(daily_usage.c.user_id, usage_day, sa.func.min(daily_usage.c.id), sa.func.sum(daily_usage.c.usage_count))
+        .group_by(daily_usage.c.user_id, usage_day)
+        .having(sa.func.count() > 1)
+    ).all()
+    for user_id, day, keep_id, total in duplicates:
+        bind.execute(daily_usage.update().where(daily_usage.c.id == keep_id).values(usage_count=total))
+        bind.execute(daily_usage.delete().where(
+            daily_usage.c.user_id == user_id, usage_day == day, daily_usage.c.id != keep_id
+        ))
+
+
+def upgrade() -> None:
+    _merge_duplicate_daily_usage()
+    with op.batch_alter_table("daily_usage") as batch_op:
+        batch_op.alter_column(
+            "usage_date", type_=sa.Date(), existing_type=sa.DateTime(timezone=True), existing_nullable=False
+        )
+        if "uq_daily_usage_user_date" not in _existing_indexes("daily_usage"):
+            batch_op.create_unique_constraint("uq_daily_usage_user_date", ["user_id", "usage_date"])
+
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_payment_records_user_created_at", table_name="payment_records")
+    with op.batch_alter_table("daily_usage") as batch_op:
+        batch_op.drop_constraint("uq_daily_usage_user_date", type_="unique")
+        batch_op.alter_column(
+            "usage_date", type_=sa.DateTime(timezone=True), existing_type=sa.Date(), existing_nullable=False
+        )
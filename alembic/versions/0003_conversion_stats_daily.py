@@ -0,0 +1,46 @@
+"""转换统计日汇总表 conversion_stats_daily
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+每个用户每天每种目标格式一行，转换记录写入时在同一事务内累加（services/conversion_stats_service.py）。
+已按 tools/database/conversion_stats_migration.sql 建好表的库跳过建表。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("conversion_stats_daily"):
+        return
+
+    op.create_table(
+        "conversion_stats_daily",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("stat_date", sa.Date(), nullable=False),
+        sa.Column("target_format", sa.String(length=10), nullable=False),
+        sa.Column("conversion_count", sa.Integer(), nullable=False),
+        sa.Column("failure_count", sa.Integer(), nullable=False),
+        sa.Column("bytes_in", sa.BigInteger(), nullable=False),
+        sa.Column("bytes_out", sa.BigInteger(), nullable=False),
+        sa.Column("total_time", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id", "stat_date", "target_format", name="uq_conversion_stats_daily_user_date_format"
+        ),
+    )
+    op.create_index(op.f("ix_conversion_stats_daily_id"), "conversion_stats_daily", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("conversion_stats_daily")
@@ -1,6 +1,5 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -9,12 +8,16 @@ from tools.database.database import get_db
 from models import User
 from framework.schemas import TokenData
 from config import settings
+from services.session_service import get_session_service
+from services.token_service import TokenError, get_token_service
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2密码承载器
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# 令牌可选（如登出接口）
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -33,9 +36,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    to_encode.setdefault("jti", get_session_service().new_token_id())
+    encoded_jwt = get_token_service().create_token(to_encode)
+    get_session_service().register(
+        to_encode.get("sub"), to_encode["jti"], expire.replace(tzinfo=timezone.utc).timestamp()
+    )
     return encoded_jwt
 
+def revoke_access_token(token: str) -> bool:
+    """吊销访问令牌，令牌无效或已过期时返回False"""
+    try:
+        payload = get_token_service().verify(token)
+    except TokenError:
+        return False
+    return get_session_service().revoke_token(payload)
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """验证用户"""
     user = db.query(User).filter(User.username == username).first()
@@ -54,12 +69,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        # 同一令牌在有效期内会被反复校验，载荷由令牌服务缓存
+        payload = get_token_service().verify(token)
+        if get_session_service().is_revoked(payload):
+            raise credentials_exception
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
-    except JWTError:
+    except TokenError:
         raise credentials_exception
     
     user = db.query(User).filter(User.username == token_data.username).first()
@@ -17,9 +17,16 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    jwt_previous_secret_keys: List[str] = []  # 密钥轮换期间仍接受的旧密钥
+    jwt_backend: str = "auto"  # auto/hmac/jose，auto时HS*算法使用更快的hmac实现
+    jwt_cache_size: int = 4096  # 已校验令牌载荷的LRU缓存容量，0表示不缓存
+    token_revocation_sync_seconds: float = 1.0  # 从Redis同步吊销列表的最小间隔（其他进程的吊销最多延迟这么久生效）
+    token_revocation_bloom_capacity: int = 100000  # 吊销布隆过滤器的初始容量
+    token_revocation_bloom_error_rate: float = 0.001  # 布隆过滤器误判率，误判时才访问Redis确认
     
     # 开发模式
     debug: bool = False
+    db_create_all_on_startup: bool = False  # 启动时按模型直接建表（仅本地开发用，生产库结构由 alembic upgrade head 管理）
     
     # 支付宝配置
     alipay_app_id: str = ""
@@ -34,6 +41,14 @@ class Settings(BaseSettings):
     wechat_cert_path: str = ""  # 商户证书路径
     wechat_key_path: str = ""  # 商户私钥路径
     wechat_notify_url: str = "http://your-domain.com/api/payment/wechat/callback"  # 支付回调地址
+    wechat_pay_api_base: str = "https://api.mch.weixin.qq.com"  # 支付API地址，本地联调可指向 wechat_pay_stub
+    payment_callback_dedupe_ttl_seconds: int = 172800  # 已处理回调的去重记录保留时间（网关重试持续约24小时）
+    payment_callback_processing_ttl_seconds: int = 60  # 回调处理中的登记有效期，进程崩溃后到期可重新处理
+    payment_reconcile_interval_minutes: int = 10  # 待支付订单对账间隔
+    payment_reconcile_min_age_seconds: int = 300  # 创建超过该时间仍未收到回调的订单才主动查询
+    payment_order_expire_seconds: int = 7200  # 超过该时间仍未支付的订单关闭（与扫码支付二维码有效期一致）
+    payment_reconcile_batch_size: int = 200  # 每批扫描的订单数
+    payment_reconcile_concurrency: int = 10  # 同时查询支付网关的订单数
     
     # 微信开放平台配置（扫码登录）
     wechat_open_app_id: str = ""
@@ -61,6 +76,39 @@ class Settings(BaseSettings):
     max_file_size: int = 10485760  # 10MB
     allowed_extensions: List[str] = ["jpg", "jpeg", "png", "gif", "bmp", "tiff", "webp"]
     
+    # 图片像素操作后端: pillow / numpy（numpy需额外安装）
+    image_ops_backend: str = "pillow"
+    
+    # 扫码/授权登录状态
+    login_state_ttl_seconds: int = 300  # 登录state的有效期
+    login_state_max_wait_seconds: float = 25.0  # 状态查询长轮询的最长等待时间
+    login_state_recheck_seconds: float = 5.0  # 长轮询期间兜底查询Redis的间隔（pub/sub通知丢失时）
+    qr_cache_size: int = 256  # 已渲染登录二维码PNG的LRU缓存容量
+    static_response_max_age_seconds: int = 3600  # 公开的预计算响应（格式列表）的浏览器缓存时间，与用户有关的响应每次回源确认
+    conversion_stats_max_days: int = 366  # 转换统计接口可查询的最长天数
+    conversion_record_retention_days: int = 30  # 转换记录保留天数（统计汇总不受影响）
+    conversion_partition_premake_months: int = 3  # MySQL分区表提前建好的未来月份数
+    
+    # 本地IP地理位置数据（CSV或MMDB），用于智能登录推荐
+    ip_geo_db_path: str = "data/ip_geo.csv"
+    ip_geo_cache_size: int = 10000  # 按IP缓存查询结果
+    ip_geo_reload_check_seconds: float = 30.0  # 检查数据文件是否更新的间隔
+    ip_geo_remote_fallback: bool = False  # 本地数据中查不到的IP是否再请求在线定位API（没有加载本地数据时总是使用在线API）
+    
+    # 外部HTTP客户端连接池（每个上游一个池）
+    http_pool_max_connections: int = 100
+    http_pool_max_keepalive: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    
+    # 认证中间件日志采样率(0-1)
+    auth_log_sample_rate: float = 0.01
+    
+    # 请求追踪配置
+    tracing_enabled: bool = True
+    slow_request_threshold_ms: float = 1000.0  # 超过该耗时的请求写入慢请求日志
+    slow_request_sample_rate: float = 1.0  # 慢请求日志采样率(0-1)
+    tracing_otel_export: bool = False  # 同时导出OpenTelemetry span（需安装opentelemetry-api/sdk）
+    
     # 会员配置
     free_user_daily_limit: int = 5
     vip_user_daily_limit: int = 100
@@ -1,10 +1,13 @@
 """
 FastAPI应用配置
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+import logging
 import os
 
 from config import settings
@@ -13,12 +16,23 @@ from routers import payment, wechat_auth
 from routers.auth_simple import router as auth_router
 from routers.image_optimized import router as image_router
 from framework.middleware.auth_middleware import AuthMiddleware
+from framework.middleware.tracing_middleware import TracingMiddleware
+from framework.responses import ORJSONRoute
+from services.http_client_service import get_http_client_registry
+from services.ip_geo_service import get_ip_geo_service
+from services.login_state_service import get_login_state_service
+from services.metrics_service import CONTENT_TYPE_LATEST, get_metrics_service
+from services.static_response_service import get_static_response_service
+
+# 设置日志级别
+logging.basicConfig(level=logging.INFO)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时初始化
-    Base.metadata.create_all(bind=engine)
+    # 表结构由alembic迁移管理，只有本地开发时才按模型直接建表
+    if settings.db_create_all_on_startup:
+        Base.metadata.create_all(bind=engine)
     
     # 确保必要的目录存在
     os.makedirs(settings.upload_dir, exist_ok=True)
@@ -26,10 +40,23 @@ async def lifespan(app: FastAPI):
     os.makedirs(os.path.join(settings.upload_dir, "converted"), exist_ok=True)
     os.makedirs(os.path.join(settings.upload_dir, "temp"), exist_ok=True)
     
+    # 外部HTTP连接池在整个进程生命周期内复用
+    await get_http_client_registry().startup()
+    
+    # 角色权益、升级选项、格式列表只取决于配置，启动时构建一次
+    get_static_response_service().reload()
+    
+    # IP地理位置数据在线程池中预加载，不阻塞事件循环
+    if not await run_in_threadpool(get_ip_geo_service().load):
+        logging.getLogger(__name__).warning(
+            f"未加载本地IP地理位置数据（{settings.ip_geo_db_path}），智能登录将使用在线定位API"
+        )
+    
     yield
     
     # 关闭时清理
-    pass
+    await get_login_state_service().close()
+    await get_http_client_registry().aclose()
 
 def create_app() -> FastAPI:
     """创建FastAPI应用"""
@@ -40,6 +67,8 @@ def create_app() -> FastAPI:
         version="1.0.0",
         lifespan=lifespan
     )
+    # 应用上直接定义的接口（/、/health）同样用orjson
+    app.router.route_class = ORJSONRoute
     
     # 添加认证中间件（必须在CORS之前）
     app.add_middleware(AuthMiddleware)
@@ -75,6 +104,9 @@ def create_app() -> FastAPI:
         max_age=3600,  # 预检请求缓存时间
     )
     
+    # 请求追踪放在最外层，total包含所有中间件的耗时
+    app.add_middleware(TracingMiddleware)
+    
     # 静态文件服务
     app.mount("/static", StaticFiles(directory=settings.upload_dir), name="static")
     
@@ -101,13 +133,26 @@ def create_app() -> FastAPI:
         """健康检查接口"""
         return {"status": "healthy", "message": "服务运行正常"}
     
+    # Prometheus指标
+    @app.get("/metrics", summary="Prometheus指标", include_in_schema=False)
+    async def metrics():
+        """Prometheus抓取接口"""
+        metrics_service = get_metrics_service()
+        if not metrics_service.available:
+            return Response("prometheus_client未安装\n", status_code=503, media_type="text/plain")
+        return Response(metrics_service.render(), media_type=CONTENT_TYPE_LATEST)
+    
     # 全局异常处理
     @app.exception_handler(404)
     async def not_found_handler(request, exc):
-        return {"message": "接口不存在", "success": False}
+        # 接口主动抛出的404保留原来的detail，未匹配的路由返回统一提示
+        detail = getattr(exc, "detail", None)
+        if detail and detail != "Not Found":
+            return JSONResponse({"detail": detail}, status_code=404, headers=getattr(exc, "headers", None))
+        return JSONResponse({"message": "接口不存在", "success": False}, status_code=404)
     
     @app.exception_handler(500)
     async def internal_error_handler(request, exc):
-        return {"message": "服务器内部错误", "success": False}
+        return JSONResponse({"message": "服务器内部错误", "success": False}, status_code=500)
     
     return app
@@ -1,75 +1,152 @@
 """
-认证中间件 - 自动处理需要验证的接口
+认证中间件 - 公开接口直接放行，其余接口要求有效的Bearer令牌
 """
-from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from typing import Callable
 import logging
+import random
+from typing import Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import settings
+from services.session_service import get_session_service
+from services.token_service import TokenError, get_token_service
 
-# 设置日志级别
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class AuthMiddleware(BaseHTTPMiddleware):
+# 不需要验证的路径（精确匹配）
+PUBLIC_PATHS = {
+    "/",
+    "/health",
+    "/metrics",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/api/auth/login",
+    "/api/auth/register",
+    "/api/auth/logout",
+    "/api/image/convert",    # 图片转换接口
+    "/api/image/compress",   # 图片压缩接口
+    "/api/image/resize",     # 图片调整大小接口
+    "/api/image/watermark",  # 图片水印接口
+    "/api/image/formats",    # 获取支持的格式
+    "/api/image/info",       # 获取图片信息
+    "/api/payment/alipay/callback",  # 支付平台回调，由签名校验
+    "/api/payment/wechat/callback",
+    "/api/auth/wechat/login",        # 微信扫码登录流程
+    "/api/auth/wechat/callback",
+    "/api/auth/wechat/login-page",
+    "/api/auth/wechat/success",
+}
+
+# 不需要验证的路径前缀（按路径段匹配）
+PUBLIC_PREFIXES = [
+    "/static/",
+    "/uploads/",
+    "/docs/",
+    "/redoc/",
+    "/api/image/preview/",
+    "/api/image/download/",
+    "/api/auth/wechat/status/",
+    "/api/auth/wechat/qr/",
+]
+
+
+class PrefixTrie:
+    """按路径段组织的前缀树，匹配耗时只与请求路径的段数有关，与前缀数量无关"""
+
+    _END = ""
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict[str, dict] = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str):
+        node = self._root
+        for segment in prefix.strip("/").split("/"):
+            node = node.setdefault(segment, {})
+        node[self._END] = {}
+
+    def match(self, path: str) -> bool:
+        """path是否位于某个前缀之下（前缀本身不算，与startswith("/static/")语义一致）"""
+        node = self._root
+        segments = path.lstrip("/").split("/")
+        for index, segment in enumerate(segments):
+            node = node.get(segment)
+            if node is None:
+                return False
+            if self._END in node and index < len(segments) - 1:
+                return True
+        return False
+
+
+class AuthMiddleware:
     """
-    认证中间件 - 自动为需要验证的接口添加认证检查
+    纯ASGI认证中间件
+    路由分类表在初始化时构建：精确路径用集合，前缀用路径段前缀树；
+    非公开路径校验Bearer令牌的签名和有效期，解码后的载荷放入 scope["state"]["token_payload"]，
+    用户是否存在、是否活跃仍由路由依赖 get_current_active_user 判断。
     """
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        # 定义不需要验证的路径
-        self.public_paths = {
-            "/api/auth/login",
-            "/api/auth/register", 
-            "/api/image/convert",  # 图片转换接口
-            "/api/image/compress", # 图片压缩接口
-            "/api/image/resize",   # 图片调整大小接口
-            "/api/image/watermark", # 图片水印接口
-            "/api/image/formats",  # 获取支持的格式
-            "/api/image/info",     # 获取图片信息
-            "/health",
-            "/docs",
-            "/openapi.json",
-            "/redoc"
-        }
-        logger.info(f"🔧 认证中间件初始化完成，公开路径: {self.public_paths}")
-        
-        # 定义不需要验证的路径前缀
-        self.public_prefixes = [
-            "/static/",
-            "/uploads/",
-            "/docs/",
-            "/redoc/"
-        ]
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        """
-        处理请求，检查是否需要认证
-        """
-        # 获取请求路径
-        path = request.url.path
-        print(f"🔍 中间件处理请求: {path}")  # 使用print确保输出
-        
-        # 检查是否为公开路径
-        if self._is_public_path(path):
-            print(f"✅ 公开路径，跳过认证: {path}")
-            return await call_next(request)
-        
-        # 检查是否为公开路径前缀
-        if self._is_public_prefix(path):
-            print(f"✅ 公开路径前缀，跳过认证: {path}")
-            return await call_next(request)
-        
-        # 需要认证的路径 - 暂时先通过，让路由自己处理
-        print(f"🔒 需要认证的路径: {path}")
-        return await call_next(request)
-    
-    def _is_public_path(self, path: str) -> bool:
-        """检查是否为公开路径"""
-        return path in self.public_paths
-    
-    def _is_public_prefix(self, path: str) -> bool:
-        """检查是否为公开路径前缀"""
-        return any(path.startswith(prefix) for prefix in self.public_prefixes)
+
+    def __init__(self, app: ASGIApp, public_paths: Optional[Iterable[str]] = None,
+                 public_prefixes: Optional[Iterable[str]] = None):
+        self.app = app
+        prefixes = list(PUBLIC_PREFIXES if public_prefixes is None else public_prefixes)
+        self.public_paths = frozenset(PUBLIC_PATHS if public_paths is None else public_paths)
+        self.public_prefixes = PrefixTrie(prefixes)
+        logger.info(f"🔧 认证中间件初始化完成，公开路径 {len(self.public_paths)} 个，公开前缀 {len(prefixes)} 个")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or self.is_public(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        payload, error = self._authenticate(scope)
+        if payload is None:
+            self._log("rejected", scope, error)
+            response = JSONResponse(
+                {"detail": error, "success": False},
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+            await response(scope, receive, send)
+            return
+
+        self._log("authenticated", scope)
+        scope.setdefault("state", {})["token_payload"] = payload
+        await self.app(scope, receive, send)
+
+    def is_public(self, path: str) -> bool:
+        """检查是否为公开路径或公开前缀"""
+        return path in self.public_paths or self.public_prefixes.match(path)
+
+    def _authenticate(self, scope: Scope):
+        """校验令牌，返回 (载荷, 错误信息)"""
+        token = _get_bearer_token(scope)
+        if not token:
+            return None, "缺少访问令牌"
+        try:
+            payload = get_token_service().verify(token)
+        except TokenError as e:
+            return None, e.message
+        if get_session_service().is_revoked(payload):
+            return None, "访问令牌已失效"
+        return payload, None
+
+    def _log(self, decision: str, scope: Scope, reason: str = ""):
+        """按采样率输出结构化日志，避免高并发时日志本身成为瓶颈"""
+        if random.random() >= settings.auth_log_sample_rate:
+            return
+        logger.info(f"auth decision={decision} method={scope['method']} path={scope['path']}"
+                    + (f" reason={reason}" if reason else ""))
+
+
+def _get_bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token.strip()
+            return None
+    return None
@@ -0,0 +1,41 @@
+"""
+追踪中间件 - 为每个请求开启链路追踪，输出 Server-Timing 响应头和慢请求日志
+"""
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from services.tracing_service import log_slow_request, trace_request
+
+
+class TracingMiddleware:
+    """
+    纯ASGI中间件，不经过BaseHTTPMiddleware的额外任务和响应流包装
+    Server-Timing在响应头发送时生成，只包含此前完成的span
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.tracing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        with trace_request(scope.get("method", ""), scope.get("path", "")) as trace:
+            async def send_with_timing(message: Message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", trace.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                log_slow_request(trace, status_code, (time.perf_counter() - trace.start) * 1000)
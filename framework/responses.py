@@ -0,0 +1,49 @@
+"""
+JSON响应类
+各路由器使用 ORJSONRoute：没有指定response_class的接口默认用 ORJSONResponse（orjson序列化，
+未安装orjson时退回标准json）；声明了response_model的接口不经过这里，
+由FastAPI直接调用pydantic的JSON序列化（Rust实现），省去中间dict和json.dumps。
+"""
+from typing import Any
+
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """orjson不认识的类型：pydantic模型按JSON模式导出，其余交给jsonable_encoder"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return jsonable_encoder(obj)
+
+
+class ORJSONResponse(JSONResponse):
+    """使用orjson序列化的JSON响应，直接返回pydantic模型时用model_dump_json"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        if orjson is None:
+            return super().render(jsonable_encoder(content))
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONRoute(APIRoute):
+    """
+    默认响应类改为ORJSONResponse的路由
+    仍以Default占位传入：FastAPI只在响应类是默认占位时才对response_model走pydantic直接序列化，
+    直接设置default_response_class=ORJSONResponse反而会让这些接口多一次dict转换
+    """
+
+    def __init__(self, path: str, endpoint, *, response_class=Default(JSONResponse), **kwargs):
+        if isinstance(response_class, DefaultPlaceholder) and response_class.value is JSONResponse:
+            response_class = Default(ORJSONResponse)
+        super().__init__(path, endpoint, response_class=response_class, **kwargs)
@@ -10,7 +10,9 @@ from .user import (
 # 图片处理相关
 from .image import (
     ImageInfo, ImageConversionResponse, ImageConvertRequest,
-    ConversionRecordBase, ConversionRecordCreate, ConversionRecordResponse
+    ConversionRecordBase, ConversionRecordCreate, ConversionRecordResponse,
+    ConversionRecordSummary, ConversionRecordPage, ConversionRecordSummaryPage,
+    ConversionStatsItem, ConversionFormatStats, ConversionStatsResponse
 )
 
 # 认证相关（微信、Auth0等）
@@ -42,6 +44,8 @@ __all__ = [
     # 图片处理相关
     "ImageInfo", "ImageConversionResponse", "ImageConvertRequest",
     "ConversionRecordBase", "ConversionRecordCreate", "ConversionRecordResponse",
+    "ConversionRecordSummary", "ConversionRecordPage", "ConversionRecordSummaryPage",
+    "ConversionStatsItem", "ConversionFormatStats", "ConversionStatsResponse",
     
     # 认证相关
     "WeChatLoginRequest", "WeChatLoginResponse", "WeChatCallbackRequest", "WeChatLoginStatusResponse",
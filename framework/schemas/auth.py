@@ -12,16 +12,18 @@ class WeChatLoginRequest(BaseModel):
 class WeChatLoginResponse(BaseModel):
     auth_url: str
     state: str
-    qr_code: str  # 二维码内容
+    qr_code: str = ""  # 二维码内容（base64 data URI），inline=false时为空
+    qr_code_url: Optional[str] = None  # 二维码PNG图片地址
 
 class WeChatCallbackRequest(BaseModel):
     code: str
     state: str
 
 class WeChatLoginStatusResponse(BaseModel):
-    status: str  # pending, success, failed
+    status: str  # pending, success, failed, expired
     message: str
     user: Optional[UserResponse] = None
+    access_token: Optional[str] = None
 
 # Auth0登录相关Schema
 class Auth0LoginRequest(BaseModel):
@@ -40,15 +42,17 @@ class Auth0CallbackRequest(BaseModel):
     state: str
 
 class Auth0LoginStatusResponse(BaseModel):
-    status: str  # pending, success, failed
+    status: str  # pending, success, failed, expired
     message: str
     user: Optional[UserResponse] = None
+    access_token: Optional[str] = None
 
 # 智能登录相关Schema
 class SmartLoginResponse(BaseModel):
     recommended_method: str  # wechat, auth0
     location_info: dict
     wechat_login_url: Optional[str] = None
+    wechat_qr_code_url: Optional[str] = None
     auth0_login_url: Optional[str] = None
     # google_login_url已移除，使用auth0_login_url替代
     message: str
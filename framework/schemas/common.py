@@ -3,14 +3,14 @@
 """
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date
 from models import UserRole
 
 # 使用统计Schema
 class DailyUsageResponse(BaseModel):
     id: int
     user_id: int
-    usage_date: datetime
+    usage_date: date
     usage_count: int
     
     class Config:
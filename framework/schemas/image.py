@@ -3,7 +3,7 @@
 """
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 # 图片信息Schema
 class ImageInfo(BaseModel):
@@ -40,6 +40,11 @@ class ImageConvertRequest(BaseModel):
     quality: Optional[int] = 95  # 图片质量 1-100
     resize: Optional[dict] = None  # {"width": 800, "height": 600}
     watermark: Optional[bool] = False
+    strip_metadata: Optional[bool] = False  # 去除EXIF/ICC等元数据以减小体积
+    brightness: Optional[float] = 1.0  # 亮度系数，1.0为原图
+    contrast: Optional[float] = 1.0  # 对比度系数，1.0为原图
+    grayscale: Optional[bool] = False
+    sharpen: Optional[bool] = False
 
 # 转换记录Schema
 class ConversionRecordBase(BaseModel):
@@ -61,3 +66,48 @@ class ConversionRecordResponse(ConversionRecordBase):
     
     class Config:
         from_attributes = True
+
+# 转换记录摘要（列表页使用，不含错误信息）
+class ConversionRecordSummary(BaseModel):
+    id: int
+    user_id: int
+    original_filename: str
+    original_format: str
+    target_format: str
+    file_size: int
+    conversion_time: float
+    status: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+# 转换记录分页（next_cursor传给下一次请求的cursor参数，没有更多记录时为空）
+class ConversionRecordPage(BaseModel):
+    items: list[ConversionRecordResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class ConversionRecordSummaryPage(BaseModel):
+    items: list[ConversionRecordSummary]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+# 转换统计（来自日汇总表）
+class ConversionStatsItem(BaseModel):
+    conversion_count: int
+    failure_count: int
+    bytes_in: int
+    bytes_out: int
+    bytes_saved: int
+    total_time: float
+    average_time: float
+
+class ConversionFormatStats(ConversionStatsItem):
+    target_format: str
+
+class ConversionStatsResponse(BaseModel):
+    days: int
+    since: date
+    total: ConversionStatsItem
+    by_format: list[ConversionFormatStats]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, Float, Text, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from tools.database.database import Base
@@ -54,6 +54,7 @@ class User(Base):
     daily_usage = relationship("DailyUsage", back_populates="user")
 
 class ConversionRecord(Base):
+    # MySQL上按created_at月份分区（alembic 0001）：库中主键为 (id, created_at)，不建user_id外键
     __tablename__ = "conversion_records"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -65,11 +66,35 @@ class ConversionRecord(Base):
     conversion_time = Column(Float, nullable=False)  # 转换耗时（秒）
     status = Column(String(20), default="success")  # success, failed
     error_message = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # 分区列
     
     # 关联关系
     user = relationship("User", back_populates="conversion_records")
 
+    __table_args__ = (
+        # 转换历史按 (created_at, id) 倒序游标分页
+        Index("idx_conversion_records_user_created_id", "user_id", "created_at", "id"),
+    )
+
+class ConversionStatsDaily(Base):
+    """转换统计日汇总：每个用户每天每种目标格式一行，由转换记录写入时增量累加"""
+    __tablename__ = "conversion_stats_daily"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stat_date = Column(Date, nullable=False)
+    target_format = Column(String(10), nullable=False)
+    conversion_count = Column(Integer, default=0, nullable=False)  # 转换次数（含失败）
+    failure_count = Column(Integer, default=0, nullable=False)
+    bytes_in = Column(BigInteger, default=0, nullable=False)  # 成功转换的原图总字节数
+    bytes_out = Column(BigInteger, default=0, nullable=False)  # 成功转换的输出总字节数
+    total_time = Column(Float, default=0.0, nullable=False)  # 转换总耗时（秒）
+    
+    __table_args__ = (
+        # 增量累加的冲突键，同时覆盖按用户、日期范围的统计查询
+        UniqueConstraint("user_id", "stat_date", "target_format", name="uq_conversion_stats_daily_user_date_format"),
+    )
+
 class PaymentRecord(Base):
     __tablename__ = "payment_records"
     
@@ -86,16 +111,28 @@ class PaymentRecord(Base):
     
     # 关联关系
     user = relationship("User", back_populates="payment_records")
+    
+    __table_args__ = (
+        # 对账任务按状态扫描待支付订单，按创建时间分批
+        Index("idx_payment_records_status_created_at", "status", "created_at"),
+        # 用户支付记录按创建时间倒序分页
+        Index("idx_payment_records_user_created_at", "user_id", "created_at"),
+    )
 
 class DailyUsage(Base):
     __tablename__ = "daily_usage"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    usage_date = Column(DateTime(timezone=True), nullable=False)
+    usage_date = Column(Date, nullable=False)
     usage_count = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # 关联关系
     user = relationship("User", back_populates="daily_usage")
+    
+    __table_args__ = (
+        # 每个用户每天一行，同时是按 (user_id, usage_date) 查询当天用量的索引
+        UniqueConstraint("user_id", "usage_date", name="uq_daily_usage_user_date"),
+    )
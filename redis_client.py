@@ -0,0 +1,139 @@
+"""
+Redis客户端封装
+统一处理序列化和连接异常，Redis不可用时返回空结果而不是中断请求
+"""
+import json
+import logging
+import time
+from typing import Any, Optional
+
+import redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 连接失败后暂停访问Redis的时间（秒）
+RECONNECT_COOLDOWN_SECONDS = 30
+
+
+class RedisClient:
+    """Redis客户端"""
+
+    def __init__(self, url: str = None):
+        # 连接在第一次执行命令时才会建立
+        self.redis_client = redis.Redis.from_url(
+            url or settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=2,
+            socket_timeout=2
+        )
+        self._unavailable_until = 0.0
+
+    def _serialize(self, value: Any) -> Any:
+        """字典和列表序列化为JSON字符串"""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return value
+
+    def _deserialize(self, value: Any) -> Any:
+        """尝试把JSON字符串还原为字典/列表"""
+        if isinstance(value, str) and value[:1] in ("{", "["):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
+
+    def _execute(self, command: str, *args, default: Any = None, **kwargs) -> Any:
+        """执行Redis命令，连接失败后在冷却期内直接返回默认值，避免每次请求都等待超时"""
+        if time.monotonic() < self._unavailable_until:
+            return default
+        try:
+            return getattr(self.redis_client, command)(*args, **kwargs)
+        except redis.ConnectionError as e:
+            self._unavailable_until = time.monotonic() + RECONNECT_COOLDOWN_SECONDS
+            logger.warning(f"Redis连接失败，{RECONNECT_COOLDOWN_SECONDS}秒内跳过Redis: {e}")
+            return default
+        except redis.RedisError as e:
+            logger.warning(f"Redis {command.upper()}失败 {args[:1]}: {e}")
+            return default
+
+    def ping(self) -> bool:
+        return bool(self._execute("ping", default=False))
+
+    def set(self, key: str, value: Any, ex: int = None, nx: bool = False, xx: bool = False) -> bool:
+        return bool(self._execute("set", key, self._serialize(value), ex=ex, nx=nx, xx=xx, default=False))
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._deserialize(self._execute("get", key))
+
+    def getdel(self, key: str) -> Optional[Any]:
+        """原子地读取并删除（Redis 6.2+）"""
+        return self._deserialize(self._execute("getdel", key))
+
+    def delete(self, *keys: str) -> bool:
+        return bool(self._execute("delete", *keys, default=0))
+
+    def exists(self, key: str) -> bool:
+        return bool(self._execute("exists", key, default=0))
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return bool(self._execute("expire", key, seconds, default=False))
+
+    def incr(self, key: str, amount: int = 1) -> Optional[int]:
+        return self._execute("incr", key, amount)
+
+    def hset(self, key: str, field: str, value: Any) -> bool:
+        return self._execute("hset", key, field, self._serialize(value)) is not None
+
+    def hgetall(self, key: str) -> dict:
+        data = self._execute("hgetall", key, default={})
+        return {k: self._deserialize(v) for k, v in data.items()}
+
+    def lpush(self, key: str, *values: Any) -> Optional[int]:
+        return self._execute("lpush", key, *[self._serialize(v) for v in values])
+
+    def rpop(self, key: str) -> Optional[Any]:
+        return self._deserialize(self._execute("rpop", key))
+
+    def llen(self, key: str) -> int:
+        return self._execute("llen", key, default=0)
+
+    def sadd(self, key: str, *members: Any) -> Optional[int]:
+        return self._execute("sadd", key, *members)
+
+    def smembers(self, key: str) -> set:
+        return self._execute("smembers", key, default=set())
+
+    def publish(self, channel: str, message: Any) -> int:
+        return self._execute("publish", channel, self._serialize(message), default=0)
+
+    def ttl(self, key: str) -> int:
+        return self._execute("ttl", key, default=-2)
+
+    def zadd(self, key: str, mapping: dict) -> Optional[int]:
+        return self._execute("zadd", key, mapping)
+
+    def zrem(self, key: str, *members: str) -> int:
+        return self._execute("zrem", key, *members, default=0)
+
+    def zscore(self, key: str, member: str) -> Optional[float]:
+        return self._execute("zscore", key, member)
+
+    def zrangebyscore(self, key: str, min: Any, max: Any, withscores: bool = False) -> list:
+        return self._execute("zrangebyscore", key, min, max, withscores=withscores, default=[])
+
+    def zremrangebyscore(self, key: str, min: Any, max: Any) -> int:
+        return self._execute("zremrangebyscore", key, min, max, default=0)
+
+
+_redis_client: Optional[RedisClient] = None
+
+
+def get_redis() -> RedisClient:
+    """获取全局Redis客户端"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = RedisClient()
+    return _redis_client
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import UserCreate, UserResponse, Token, MessageResponse
@@ -8,7 +9,7 @@ from auth import authenticate_user, create_access_token, get_current_active_user
 from datetime import timedelta
 from config import settings
 
-router = APIRouter(prefix="/auth", tags=["认证"])
+router = APIRouter(prefix="/auth", tags=["认证"], route_class=ORJSONRoute)
 
 @router.post("/register", response_model=UserResponse, summary="用户注册")
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import RedirectResponse, HTMLResponse
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import Auth0LoginRequest, Auth0LoginResponse, Auth0LoginStatusResponse, Token, UserResponse, Auth0CallbackRequest
 from services.auth0_service import Auth0Service
 from auth import create_access_token
 from config import settings
+from models import User
 
-router = APIRouter(prefix="/auth/auth0", tags=["Auth0登录"])
+router = APIRouter(prefix="/auth/auth0", tags=["Auth0登录"], route_class=ORJSONRoute)
 
 @router.post("/login", response_model=Auth0LoginResponse, summary="发起Auth0登录")
 async def auth0_login(
@@ -72,6 +74,7 @@ async def complete_auth0_login(
         )
         
         if not user:
+            auth0_service.set_auth0_login_status(request.state, "failed", message=message)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"登录失败: {message}"
@@ -79,6 +82,9 @@ async def complete_auth0_login(
         
         # 生成JWT token
         access_token = create_access_token(data={"sub": user.username})
+        auth0_service.set_auth0_login_status(
+            request.state, "success", user_id=user.id, message="登录成功", access_token=access_token
+        )
         
         # 构建响应
         return Auth0LoginResponse(
@@ -120,7 +126,8 @@ async def auth0_callback(
         user, message = await auth0_service.handle_auth0_callback(code, state)
         
         if not user:
-            # 登录失败，重定向到错误页面
+            # 登录失败，通知等待中的前端并重定向到错误页面
+            auth0_service.set_auth0_login_status(state, "failed", message=message)
             return RedirectResponse(
                 url=f"/login?error={message}",
                 status_code=302
@@ -128,6 +135,9 @@ async def auth0_callback(
         
         # 生成JWT token
         access_token = create_access_token(data={"sub": user.username})
+        auth0_service.set_auth0_login_status(
+            state, "success", user_id=user.id, message="登录成功", access_token=access_token
+        )
         
         # 重定向到前端页面，携带token和用户信息
         return RedirectResponse(
@@ -144,14 +154,34 @@ async def auth0_callback(
 @router.get("/status/{state}", response_model=Auth0LoginStatusResponse, summary="查询Auth0登录状态")
 async def get_auth0_login_status(
     state: str,
+    wait: float = Query(0, ge=0, description="长轮询等待秒数，0表示立即返回"),
     db: Session = Depends(get_db)
 ):
-    """查询Auth0登录状态"""
+    """查询Auth0登录状态，wait>0时等待授权结果，最长等待 login_state_max_wait_seconds 秒"""
     auth0_service = Auth0Service(db)
     
     try:
-        status_info = auth0_service.get_auth0_login_status(state)
-        return Auth0LoginStatusResponse(**status_info)
+        if wait > 0:
+            status_info = await auth0_service.wait_auth0_login_status(
+                state, min(wait, settings.login_state_max_wait_seconds)
+            )
+        else:
+            status_info = auth0_service.get_auth0_login_status(state)
+        
+        # 令牌只在第一次查到成功时返回，之后只返回状态
+        user = None
+        access_token = None
+        if status_info["status"] == "success":
+            access_token = auth0_service.claim_auth0_login_token(state)
+            if access_token and status_info.get("user_id"):
+                user = db.query(User).filter(User.id == status_info["user_id"]).first()
+        
+        return Auth0LoginStatusResponse(
+            status=status_info["status"],
+            message=status_info.get("message", ""),
+            user=UserResponse.model_validate(user) if user else None,
+            access_token=access_token
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import UserCreate, UserResponse, LoginResponse, MessageResponse
 from services.user_service import UserService
-from auth import authenticate_user, create_access_token, get_current_active_user
+from auth import (authenticate_user, create_access_token, get_current_active_user,
+                  optional_oauth2_scheme, revoke_access_token)
 from models import User
 from datetime import timedelta
+from typing import Optional
 from config import settings
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/auth", tags=["认证"])
+router = APIRouter(prefix="/auth", tags=["认证"], route_class=ORJSONRoute)
 
 class LoginRequest(BaseModel):
     username: str
@@ -78,9 +81,6 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             "wechat_nickname": user.wechat_nickname,
             "wechat_avatar": user.wechat_avatar,
             "is_wechat_user": user.is_wechat_user,
-            "google_name": user.google_name,
-            "google_picture": user.google_picture,
-            "is_google_user": user.is_google_user,
             "auth0_name": user.auth0_name,
             "auth0_picture": user.auth0_picture,
             "is_auth0_user": user.is_auth0_user,
@@ -94,6 +94,8 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
     return current_user
 
 @router.post("/logout", response_model=MessageResponse, summary="用户登出")
-async def logout():
-    """用户登出接口"""
+async def logout(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """用户登出接口，吊销当前访问令牌（未携带或令牌已失效时同样返回成功）"""
+    if token:
+        revoke_access_token(token)
     return {"message": "登出成功", "success": True}
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form, status
+from typing import Optional, Union
 from fastapi.responses import FileResponse
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
-from framework.schemas import ImageConvertRequest, ConversionRecordResponse, MessageResponse, UsageStatsResponse, ImageConversionResponse, ImageInfo
+from framework.schemas import ImageConvertRequest, ConversionRecordPage, ConversionRecordSummaryPage, ConversionStatsResponse, MessageResponse, UsageStatsResponse, ImageConversionResponse, ImageInfo
 from services.image_service import ImageService
+from services.image_probe_service import ImageProbeService
+from services.conversion_history_service import MAX_PAGE_SIZE, ConversionHistoryService
+from services.conversion_stats_service import ConversionStatsService
+from services.tracing_service import span
+from services.cache_service import get_cache_service
 from services.permission_service import PermissionService
+from services.static_response_service import get_static_response_service
 from services.user_service import UserService
 from auth import get_current_active_user
 from models import User
@@ -14,20 +21,18 @@ from PIL import Image
 import os
 import uuid
 
-router = APIRouter(prefix="/image", tags=["图片转换"])
+router = APIRouter(prefix="/image", tags=["图片转换"], route_class=ORJSONRoute)
 
 # ==================== 公开接口（不需要token） ====================
 
 @router.get("/formats", summary="获取支持的图片格式")
-async def get_supported_formats():
-    """获取支持的图片格式列表 - 公开接口"""
-    image_service = ImageService(None)
-    return image_service.get_supported_formats()
+async def get_supported_formats(request: Request):
+    """获取支持的图片格式列表及能力（透明通道、动画、无损） - 公开接口，预计算响应，支持ETag"""
+    return get_static_response_service().response("image_formats", request)
 
 @router.get("/info", summary="获取图片信息")
 async def get_image_info(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    file: UploadFile = File(...)
 ):
     """获取图片信息 - 公开接口"""
     if not file.filename:
@@ -43,17 +48,21 @@ async def get_image_info(
             detail=f"不支持的文件格式，支持的格式: {', '.join(settings.allowed_extensions)}"
         )
     
-    # 检查文件大小
-    file_content = await file.read()
-    if len(file_content) > settings.max_file_size:
+    # 检查文件大小（不读取文件内容）
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+    if file_size > settings.max_file_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"文件大小超过限制({settings.max_file_size // 1024 // 1024}MB)"
         )
     
-    image_service = ImageService(db)
+    # 只解析文件头部，结果按内容哈希缓存
+    probe_service = ImageProbeService(get_cache_service())
     try:
-        info = image_service.get_image_info(file_content, file.filename)
+        info = probe_service.probe_file(file.file, file_size)
         return info
     except Exception as e:
         raise HTTPException(
@@ -101,6 +110,8 @@ async def compress_image(
     resize_height: int = Form(0),
     maxWidth: int = Form(0),  # 支持maxWidth参数
     maxHeight: int = Form(0),  # 支持maxHeight参数
+    strip_metadata: bool = Form(True),  # 压缩默认去除元数据
+    output_format: str = Form(""),  # 输出格式，auto表示自动选择体积最小的格式
     db: Session = Depends(get_db)
 ):
     """压缩图片 - 公开接口，专门用于图片压缩"""
@@ -119,7 +130,8 @@ async def compress_image(
         )
     
     # 检查文件大小
-    file_content = await file.read()
+    with span("upload.read"):
+        file_content = await file.read()
     if len(file_content) > settings.max_file_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -139,12 +151,12 @@ async def compress_image(
     upload_path = os.path.join(settings.upload_dir, "uploads", upload_filename)
     os.makedirs(os.path.dirname(upload_path), exist_ok=True)
     
-    with open(upload_path, "wb") as f:
+    with span("upload.write"), open(upload_path, "wb") as f:
         f.write(file_content)
     
     try:
         # 获取原图尺寸
-        with Image.open(upload_path) as img:
+        with span("image.inspect"), Image.open(upload_path) as img:
             original_width, original_height = img.size
             
         # 优先使用maxWidth/maxHeight参数，如果没有则使用resize_width/resize_height
@@ -159,12 +171,14 @@ async def compress_image(
             
         # 对于PNG格式，建议转换为JPEG以获得更好的压缩效果
         target_format = file_extension.upper()
-        if target_format == 'PNG' and quality < 90:
+        if output_format:
+            target_format = output_format.upper()
+            file_extension = output_format.lower()
+        elif target_format == 'PNG' and quality < 90:
             target_format = 'JPEG'
             file_extension = 'jpg'
         
         # 创建压缩请求
-        from schemas import ImageConvertRequest
         resize_params = None
         if final_width or final_height:
             resize_params = {"width": final_width, "height": final_height}
@@ -173,7 +187,8 @@ async def compress_image(
             target_format=target_format,
             quality=quality,
             resize=resize_params,
-            watermark=False  # 压缩接口默认不添加水印
+            watermark=False,  # 压缩接口默认不添加水印
+            strip_metadata=strip_metadata
         )
         
         # 执行压缩
@@ -193,13 +208,16 @@ async def compress_image(
                 detail=f"压缩失败: {error_message}"
             )
         
+        # auto格式以实际输出的文件扩展名为准
+        file_extension = os.path.splitext(output_path)[1][1:]
+        
         # 计算压缩信息
         original_size = len(file_content)
         compressed_size = os.path.getsize(output_path)
         compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
         
         # 获取最终图片尺寸
-        with Image.open(output_path) as final_img:
+        with span("image.inspect"), Image.open(output_path) as final_img:
             final_width, final_height = final_img.size
         
         # 生成文件URL
@@ -211,43 +229,45 @@ async def compress_image(
         base_url = "http://localhost:8000"
         download_url = f"{base_url}/api/image/download/{os.path.basename(output_path)}"
         
-        response_data = ImageConversionResponse(
-            success=True,
-            message="压缩成功",
-            original_image=ImageInfo(
-                filename=file.filename,
-                format=file_extension.upper(),
-                width=original_width,
-                height=original_height,
-                file_size=original_size,
-                url=f"{base_url}/static/uploads/{os.path.basename(upload_path)}"
-            ),
-            converted_image=ImageInfo(
-                filename=filename,
-                format=file_extension.upper(),
-                width=final_width,
-                height=final_height,
-                file_size=compressed_size,
-                url=f"{base_url}{file_url}"
-            ),
-            processing_params={
-                "quality": quality,
-                "resize_width": resize_width if resize_width > 0 else None,
-                "resize_height": resize_height if resize_height > 0 else None,
-                "max_width": maxWidth if maxWidth > 0 else None,
-                "max_height": maxHeight if maxHeight > 0 else None,
-                "watermark": False
-            },
-            conversion_stats={
-                "compression_ratio": f"{compression_ratio:.1f}%",
-                "size_reduction": f"{original_size - compressed_size} bytes",
-                "original_size": f"{original_width}x{original_height}",
-                "converted_size": f"{final_width}x{final_height}",
-                "size_changed": original_size != compressed_size,
-                "dimensions_changed": (original_width, original_height) != (final_width, final_height)
-            },
-            download_url=download_url
-        )
+        with span("response.build"):
+            response_data = ImageConversionResponse(
+                success=True,
+                message="压缩成功",
+                original_image=ImageInfo(
+                    filename=file.filename,
+                    format=file_extension.upper(),
+                    width=original_width,
+                    height=original_height,
+                    file_size=original_size,
+                    url=f"{base_url}/static/uploads/{os.path.basename(upload_path)}"
+                ),
+                converted_image=ImageInfo(
+                    filename=filename,
+                    format=file_extension.upper(),
+                    width=final_width,
+                    height=final_height,
+                    file_size=compressed_size,
+                    url=f"{base_url}{file_url}"
+                ),
+                processing_params={
+                    "quality": quality,
+                    "resize_width": resize_width if resize_width > 0 else None,
+                    "resize_height": resize_height if resize_height > 0 else None,
+                    "max_width": maxWidth if maxWidth > 0 else None,
+                    "max_height": maxHeight if maxHeight > 0 else None,
+                    "watermark": False,
+                    "strip_metadata": strip_metadata
+                },
+                conversion_stats={
+                    "compression_ratio": f"{compression_ratio:.1f}%",
+                    "size_reduction": f"{original_size - compressed_size} bytes",
+                    "original_size": f"{original_width}x{original_height}",
+                    "converted_size": f"{final_width}x{final_height}",
+                    "size_changed": original_size != compressed_size,
+                    "dimensions_changed": (original_width, original_height) != (final_width, final_height)
+                },
+                download_url=download_url
+            )
         
         return response_data
         
@@ -264,6 +284,11 @@ async def convert_image(
     resize_width: int = Form(None),
     resize_height: int = Form(None),
     watermark: bool = Form(False),
+    strip_metadata: bool = Form(False),
+    brightness: float = Form(1.0),
+    contrast: float = Form(1.0),
+    grayscale: bool = Form(False),
+    sharpen: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     """转换图片格式 - 公开接口"""
@@ -283,7 +308,8 @@ async def convert_image(
         )
     
     # 检查文件大小
-    file_content = await file.read()
+    with span("upload.read"):
+        file_content = await file.read()
     if len(file_content) > settings.max_file_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -296,17 +322,21 @@ async def convert_image(
     upload_path = os.path.join(settings.upload_dir, "uploads", upload_filename)
     os.makedirs(os.path.dirname(upload_path), exist_ok=True)
     
-    with open(upload_path, "wb") as f:
+    with span("upload.write"), open(upload_path, "wb") as f:
         f.write(file_content)
     
     try:
         # 创建转换请求
-        from schemas import ImageConvertRequest
         convert_request = ImageConvertRequest(
             target_format=target_format,
             quality=quality,
             resize={"width": resize_width, "height": resize_height} if resize_width or resize_height else None,
-            watermark=watermark
+            watermark=watermark,
+            strip_metadata=strip_metadata,
+            brightness=brightness,
+            contrast=contrast,
+            grayscale=grayscale,
+            sharpen=sharpen
         )
         
         # 执行转换
@@ -321,27 +351,29 @@ async def convert_image(
                 detail=f"转换失败: {error_message}"
             )
         
-        # 获取图片信息
-        from PIL import Image
-        import os
+        # auto格式以实际输出的格式为准
+        output_format = os.path.splitext(output_path)[1][1:]
         
-        # 获取原图信息
-        with Image.open(upload_path) as original_img:
-            original_width, original_height = original_img.size
-            original_format = original_img.format
-            original_size = os.path.getsize(upload_path)
+        # 获取图片信息
         
-        # 获取转换后图片信息
-        with Image.open(output_path) as converted_img:
-            converted_width, converted_height = converted_img.size
-            converted_size = os.path.getsize(output_path)
+        with span("image.inspect"):
+            # 获取原图信息
+            with Image.open(upload_path) as original_img:
+                original_width, original_height = original_img.size
+                original_format = original_img.format
+                original_size = os.path.getsize(upload_path)
+            
+            # 获取转换后图片信息
+            with Image.open(output_path) as converted_img:
+                converted_width, converted_height = converted_img.size
+                converted_size = os.path.getsize(output_path)
         
         # 计算压缩比例
         compression_ratio = ((original_size - converted_size) / original_size * 100) if original_size > 0 else 0
         
         # 生成文件名
         original_filename = file.filename
-        converted_filename = f"converted_{original_filename.split('.')[0]}.{target_format.lower()}"
+        converted_filename = f"converted_{original_filename.split('.')[0]}.{output_format.lower()}"
         
         # 生成访问URL
         base_url = "http://localhost:8000"
@@ -350,40 +382,46 @@ async def convert_image(
         
         # 构建响应数据
         
-        response_data = ImageConversionResponse(
-            success=True,
-            message="转换成功",
-            original_image=ImageInfo(
-                filename=original_filename,
-                format=original_format or file_extension.upper(),
-                width=original_width,
-                height=original_height,
-                file_size=original_size,
-                url=f"{base_url}/static/uploads/{os.path.basename(upload_path)}"
-            ),
-            converted_image=ImageInfo(
-                filename=converted_filename,
-                format=target_format.upper(),
-                width=converted_width,
-                height=converted_height,
-                file_size=converted_size,
-                url=converted_url
-            ),
-            processing_params={
-                "target_format": target_format,
-                "quality": quality,
-                "resize_width": resize_width,
-                "resize_height": resize_height,
-                "watermark": watermark
-            },
-            conversion_stats={
-                "compression_ratio": f"{compression_ratio:.1f}%",
-                "size_reduction": f"{original_size - converted_size} bytes",
-                "original_size": f"{original_width}x{original_height}",
-                "converted_size": f"{converted_width}x{converted_height}"
-            },
-            download_url=download_url
-        )
+        with span("response.build"):
+            response_data = ImageConversionResponse(
+                success=True,
+                message="转换成功",
+                original_image=ImageInfo(
+                    filename=original_filename,
+                    format=original_format or file_extension.upper(),
+                    width=original_width,
+                    height=original_height,
+                    file_size=original_size,
+                    url=f"{base_url}/static/uploads/{os.path.basename(upload_path)}"
+                ),
+                converted_image=ImageInfo(
+                    filename=converted_filename,
+                    format=output_format.upper(),
+                    width=converted_width,
+                    height=converted_height,
+                    file_size=converted_size,
+                    url=converted_url
+                ),
+                processing_params={
+                    "target_format": target_format,
+                    "quality": quality,
+                    "resize_width": resize_width,
+                    "resize_height": resize_height,
+                    "watermark": watermark,
+                    "strip_metadata": strip_metadata,
+                    "brightness": brightness,
+                    "contrast": contrast,
+                    "grayscale": grayscale,
+                    "sharpen": sharpen
+                },
+                conversion_stats={
+                    "compression_ratio": f"{compression_ratio:.1f}%",
+                    "size_reduction": f"{original_size - converted_size} bytes",
+                    "original_size": f"{original_width}x{original_height}",
+                    "converted_size": f"{converted_width}x{converted_height}"
+                },
+                download_url=download_url
+            )
         
         return response_data
         
@@ -402,21 +440,34 @@ async def get_usage_stats(
     stats = user_service.get_usage_stats(current_user.id)
     return stats
 
-@router.get("/records", response_model=list[ConversionRecordResponse], summary="获取转换记录")
+@router.get("/stats", response_model=ConversionStatsResponse, summary="获取转换统计")
+async def get_conversion_stats(
+    days: int = Query(30, ge=1, le=settings.conversion_stats_max_days),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取最近days天的转换次数、节省字节数和平均耗时（按目标格式分组） - 需要认证"""
+    return ConversionStatsService(db).get_stats(current_user.id, days=days)
+
+@router.get("/records", response_model=Union[ConversionRecordPage, ConversionRecordSummaryPage], summary="获取转换记录")
 async def get_conversion_records(
-    limit: int = 5,
-    offset: int = 0,
+    limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    summary: bool = Query(False, description="只返回列表展示需要的字段（不含错误信息）"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取用户转换记录 - 需要认证"""
-    image_service = ImageService(db)
-    records = image_service.get_conversion_records(
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset
-    )
-    return records
+    """获取用户转换记录（游标分页，最新的在前） - 需要认证"""
+    history_service = ConversionHistoryService(db)
+    try:
+        page = history_service.list_records(current_user.id, limit=limit, cursor=cursor, summary=summary)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    page_class = ConversionRecordSummaryPage if summary else ConversionRecordPage
+    return page_class.model_validate(page, from_attributes=True)
 
 @router.delete("/records/{record_id}", summary="删除转换记录")
 async def delete_conversion_record(
@@ -425,8 +476,8 @@ async def delete_conversion_record(
     db: Session = Depends(get_db)
 ):
     """删除转换记录 - 需要认证"""
-    image_service = ImageService(db)
-    success = image_service.delete_conversion_record(record_id, current_user.id)
+    history_service = ConversionHistoryService(db)
+    success = history_service.delete_record(record_id, current_user.id)
     
     if not success:
         raise HTTPException(
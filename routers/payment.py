@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from fastapi.responses import PlainTextResponse, Response
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import PaymentCreate, PaymentResponse, MessageResponse
 from services.payment_service import PaymentService
-from services.wechat_pay_service import WeChatPayService
-from services.permission_service import PermissionService
+from services.wechat_pay_service import WeChatPayService, XmlDictParser, dict_to_xml
+from services.payment_callback_service import APPLIED, IN_PROGRESS, get_payment_callback_service
+from services.static_response_service import get_static_response_service
 from auth import get_current_active_user
 from models import User, PaymentStatus
 from config import settings
 import json
 
-router = APIRouter(prefix="/payment", tags=["支付"])
+router = APIRouter(prefix="/payment", tags=["支付"], route_class=ORJSONRoute)
 
 @router.post("/create", response_model=PaymentResponse, summary="创建支付订单")
 async def create_payment(
@@ -77,7 +80,7 @@ async def create_wechat_payment(
         total_fee = int(payment.amount * 100)  # 转换为分
         body = f"图片转换服务 - {payment.target_role.value.upper()}会员"
         
-        result = wechat_pay_service.create_unified_order(
+        result = await wechat_pay_service.create_unified_order(
             out_trade_no=payment.order_id,
             total_fee=total_fee,
             body=body,
@@ -105,9 +108,10 @@ async def create_wechat_payment(
         )
 
 @router.post("/alipay/callback", summary="支付宝支付回调")
-async def alipay_callback(request: Request, db: Session = Depends(get_db)):
-    """支付宝支付回调"""
+async def alipay_callback(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """支付宝支付回调（应答纯文本success/fail，否则支付宝会持续重试）"""
     payment_service = PaymentService(db)
+    callback_service = get_payment_callback_service()
     
     # 获取回调数据
     form_data = await request.form()
@@ -115,68 +119,63 @@ async def alipay_callback(request: Request, db: Session = Depends(get_db)):
     
     # 验证签名
     if not payment_service.verify_alipay_callback(callback_data):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="签名验证失败"
-        )
+        return PlainTextResponse("fail")
     
     # 更新支付状态
     order_id = callback_data.get("out_trade_no")
     trade_status = callback_data.get("trade_status")
     transaction_id = callback_data.get("trade_no")
     
-    if trade_status == "TRADE_SUCCESS":
-        payment_service.update_payment_status(
-            order_id, PaymentStatus.SUCCESS, transaction_id
-        )
-        # 处理支付成功
-        payment_service.process_payment_success(order_id)
-        return {"status": "success"}
-    else:
-        payment_service.update_payment_status(order_id, PaymentStatus.FAILED)
-        return {"status": "failed"}
+    try:
+        if trade_status in ("TRADE_SUCCESS", "TRADE_FINISHED"):
+            result = callback_service.handle_success(db, order_id, transaction_id)
+            if result == IN_PROGRESS:
+                return PlainTextResponse("fail")
+            if result == APPLIED:
+                background_tasks.add_task(callback_service.finish_success, order_id)
+        else:
+            callback_service.apply_failure(db, order_id)
+    except Exception:
+        return PlainTextResponse("fail")
+    return PlainTextResponse("success")
+
+def wechat_notify_response(return_code: str, return_msg: str) -> Response:
+    """微信支付回调应答（XML）"""
+    return Response(dict_to_xml({"return_code": return_code, "return_msg": return_msg}),
+                    media_type="application/xml")
 
 @router.post("/wechat/callback", summary="微信支付回调")
-async def wechat_callback(request: Request, db: Session = Depends(get_db)):
+async def wechat_callback(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """微信支付回调"""
-    payment_service = PaymentService(db)
     wechat_pay_service = WeChatPayService()
+    callback_service = get_payment_callback_service()
     
+    # 边接收边解析回调数据，超大或带DTD的请求体在读完之前就会被拒绝
+    parser = XmlDictParser()
     try:
-        # 获取回调数据
-        body = await request.body()
-        xml_data = body.decode('utf-8')
-        
-        # 验证回调
-        result = wechat_pay_service.verify_notify(xml_data)
-        
-        if not result["success"]:
-            return {
-                "return_code": "FAIL",
-                "return_msg": result["error"]
-            }
-        
-        # 更新支付状态
-        order_id = result["out_trade_no"]
-        transaction_id = result["transaction_id"]
-        
-        payment_service.update_payment_status(
-            order_id, PaymentStatus.SUCCESS, transaction_id
-        )
-        
-        # 处理支付成功
-        payment_service.process_payment_success(order_id)
-        
-        return {
-            "return_code": "SUCCESS",
-            "return_msg": "OK"
-        }
-        
+        async for chunk in request.stream():
+            parser.feed(chunk)
+        params = parser.close()
+    except ValueError as e:
+        return wechat_notify_response("FAIL", f"解析回调数据失败: {str(e)}")
+    
+    # 验证回调
+    result = wechat_pay_service.verify_notify_params(params)
+    if not result["success"]:
+        return wechat_notify_response("FAIL", result["error"])
+    
+    # 去重后更新支付状态，副作用在应答之后执行
+    order_id = result["out_trade_no"]
+    try:
+        outcome = callback_service.handle_success(db, order_id, result["transaction_id"])
     except Exception as e:
-        return {
-            "return_code": "FAIL",
-            "return_msg": f"处理回调失败: {str(e)}"
-        }
+        return wechat_notify_response("FAIL", f"处理回调失败: {str(e)}")
+    
+    if outcome == IN_PROGRESS:
+        return wechat_notify_response("FAIL", "回调处理中，请稍后重试")
+    if outcome == APPLIED:
+        background_tasks.add_task(callback_service.finish_success, order_id)
+    return wechat_notify_response("SUCCESS", "OK")
 
 @router.get("/orders", response_model=list[PaymentResponse], summary="获取支付记录")
 async def get_payment_orders(
@@ -191,21 +190,19 @@ async def get_payment_orders(
 
 @router.get("/upgrade-options", summary="获取升级选项")
 async def get_upgrade_options(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
 ):
-    """获取会员升级选项"""
-    permission_service = PermissionService(db)
-    return permission_service.get_upgrade_options(current_user.role)
+    """获取会员升级选项（预计算响应，支持ETag）"""
+    return get_static_response_service().response(f"upgrade_options:{current_user.role.value}", request)
 
 @router.get("/role-benefits", summary="获取角色权益")
 async def get_role_benefits(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
 ):
-    """获取当前用户角色权益"""
-    permission_service = PermissionService(db)
-    return permission_service.get_role_benefits(current_user.role)
+    """获取当前用户角色权益（预计算响应，支持ETag）"""
+    return get_static_response_service().response(f"role_benefits:{current_user.role.value}", request)
 
 @router.get("/wechat/query/{order_id}", summary="查询微信支付订单")
 async def query_wechat_order(
@@ -217,7 +214,7 @@ async def query_wechat_order(
     wechat_pay_service = WeChatPayService()
     
     try:
-        result = wechat_pay_service.query_order(out_trade_no=order_id)
+        result = await wechat_pay_service.query_order(out_trade_no=order_id)
         
         if result["success"]:
             return {
@@ -249,7 +246,7 @@ async def close_wechat_order(
     wechat_pay_service = WeChatPayService()
     
     try:
-        result = wechat_pay_service.close_order(order_id)
+        result = await wechat_pay_service.close_order(order_id)
         
         if result["success"]:
             return {"message": "订单关闭成功"}
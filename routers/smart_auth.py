@@ -1,57 +1,65 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import RedirectResponse, HTMLResponse
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import SmartLoginResponse, WeChatLoginResponse, Auth0LoginResponse
 from services.wechat_auth_service import WeChatAuthService
 from services.auth0_service import Auth0Service
+from routers.wechat_auth import qr_code_url
 # GoogleAuthService已移除，使用Auth0Service替代
-import httpx
+from services.http_client_service import get_http_client
+from services.ip_geo_service import get_ip_geo_service, unknown_location
+from config import settings
 import uuid
 
-router = APIRouter(prefix="/auth/smart", tags=["智能登录"])
+router = APIRouter(prefix="/auth/smart", tags=["智能登录"], route_class=ORJSONRoute)
 
 async def detect_ip_location(ip_address: str) -> dict:
-    """检测IP地址的地理位置"""
+    """检测IP地址的地理位置，优先查询本地IP库"""
     if not ip_address or ip_address == "无法获取":
-        return {
-            "country": "未知",
-            "country_code": "XX",
-            "region": "未知",
-            "city": "未知",
-            "is_china": False,
-            "login_method": "auth0"
-        }
+        return unknown_location()
     
+    ip_geo_service = get_ip_geo_service()
+    location = ip_geo_service.lookup(ip_address)
+    if location is not None:
+        return location
+    
+    # 本地IP库已加载但查不到时，默认不在登录路径上访问外部API；
+    # 没有本地IP库时始终使用在线API，避免所有用户都被判断为海外
+    if ip_geo_service.available and not settings.ip_geo_remote_fallback:
+        return unknown_location()
+    return await detect_ip_location_remote(ip_address)
+
+async def detect_ip_location_remote(ip_address: str) -> dict:
+    """通过在线API检测IP地址的地理位置"""
     try:
         # 使用免费的IP地理位置API
-        async with httpx.AsyncClient() as client:
-            # 尝试使用ip-api.com (免费，无需API key)
-            response = await client.get(
-                f"http://ip-api.com/json/{ip_address}",
-                timeout=5
-            )
+        # 尝试使用ip-api.com (免费，无需API key)
+        response = await get_http_client("ip_geo").get(
+            f"http://ip-api.com/json/{ip_address}"
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # 检查是否在中国
+            is_china = data.get("countryCode") == "CN"
+            
+            return {
+                "country": data.get("country", "未知"),
+                "country_code": data.get("countryCode", "XX"),
+                "region": data.get("regionName", "未知"),
+                "city": data.get("city", "未知"),
+                "is_china": is_china,
+                "login_method": "wechat" if is_china else "auth0",
+                "timezone": data.get("timezone", ""),
+                "isp": data.get("isp", "")
+            }
+        else:
+            # 如果API失败，使用备用方法
+            return await detect_ip_location_fallback(ip_address)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # 检查是否在中国
-                is_china = data.get("countryCode") == "CN"
-                
-                return {
-                    "country": data.get("country", "未知"),
-                    "country_code": data.get("countryCode", "XX"),
-                    "region": data.get("regionName", "未知"),
-                    "city": data.get("city", "未知"),
-                    "is_china": is_china,
-                    "login_method": "wechat" if is_china else "auth0",
-                    "timezone": data.get("timezone", ""),
-                    "isp": data.get("isp", "")
-                }
-            else:
-                # 如果API失败，使用备用方法
-                return await detect_ip_location_fallback(ip_address)
-                
     except Exception as e:
         print(f"IP地理位置检测失败: {e}")
         return await detect_ip_location_fallback(ip_address)
@@ -60,39 +68,30 @@ async def detect_ip_location_fallback(ip_address: str) -> dict:
     """备用IP地理位置检测方法"""
     try:
         # 使用ipinfo.io作为备用
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://ipinfo.io/{ip_address}/json",
-                timeout=5
-            )
+        response = await get_http_client("ip_geo_fallback").get(
+            f"https://ipinfo.io/{ip_address}/json"
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            country_code = data.get("country", "XX")
+            is_china = country_code == "CN"
             
-            if response.status_code == 200:
-                data = response.json()
-                country_code = data.get("country", "XX")
-                is_china = country_code == "CN"
-                
-                return {
-                    "country": data.get("country", "未知"),
-                    "country_code": country_code,
-                    "region": data.get("region", "未知"),
-                    "city": data.get("city", "未知"),
-                    "is_china": is_china,
-                    "login_method": "wechat" if is_china else "auth0",
-                    "timezone": data.get("timezone", ""),
-                    "org": data.get("org", "")
-                }
+            return {
+                "country": data.get("country", "未知"),
+                "country_code": country_code,
+                "region": data.get("region", "未知"),
+                "city": data.get("city", "未知"),
+                "is_china": is_china,
+                "login_method": "wechat" if is_china else "auth0",
+                "timezone": data.get("timezone", ""),
+                "org": data.get("org", "")
+            }
     except Exception as e:
         print(f"备用IP检测也失败: {e}")
     
     # 如果所有方法都失败，返回默认值
-    return {
-        "country": "未知",
-        "country_code": "XX",
-        "region": "未知",
-        "city": "未知",
-        "is_china": False,
-        "login_method": "auth0"
-    }
+    return unknown_location()
 
 @router.get("/login", response_model=SmartLoginResponse, summary="智能登录推荐")
 async def smart_login(
@@ -139,6 +138,7 @@ async def smart_login(
             recommended_method=recommended_method,
             location_info=location_info,
             wechat_login_url=wechat_login_url,
+            wechat_qr_code_url=qr_code_url(wechat_state),
             auth0_login_url=auth0_login_url,
             message=f"检测到您来自{location_info['country']}，推荐使用{'微信' if location_info['is_china'] else 'Auth0(Google)'}登录"
         )
@@ -1,47 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, Response
+from framework.responses import ORJSONRoute
 from sqlalchemy.orm import Session
 from tools.database.database import get_db
 from framework.schemas import WeChatLoginRequest, WeChatLoginResponse, WeChatLoginStatusResponse, Token, UserResponse
+from services.qr_code_service import get_qr_code_service
 from services.wechat_auth_service import WeChatAuthService
 from auth import create_access_token
 from config import settings
-import qrcode
-import io
-import base64
+from models import User
+from urllib.parse import quote
 
-router = APIRouter(prefix="/auth/wechat", tags=["微信登录"])
+router = APIRouter(prefix="/auth/wechat", tags=["微信登录"], route_class=ORJSONRoute)
+
+def qr_code_url(state: str) -> str:
+    """二维码PNG接口地址"""
+    return f"/api/auth/wechat/qr/{quote(state, safe='')}"
+
+async def build_login_response(wechat_service: WeChatAuthService, state: str = None,
+                               inline: bool = True) -> WeChatLoginResponse:
+    """生成微信登录URL，并按需内联二维码"""
+    auth_url, state = wechat_service.generate_auth_url(state)
+    
+    qr_code = ""
+    if inline:
+        png = await get_qr_code_service().render_png_async(auth_url)
+        qr_code = get_qr_code_service().to_data_uri(png)
+    
+    return WeChatLoginResponse(
+        auth_url=auth_url,
+        state=state,
+        qr_code=qr_code,
+        qr_code_url=qr_code_url(state)
+    )
 
 @router.post("/login", response_model=WeChatLoginResponse, summary="发起微信扫码登录")
 async def wechat_login(
     request: WeChatLoginRequest,
+    inline: bool = Query(True, description="是否在JSON中内联base64二维码，false时只返回qr_code_url"),
     db: Session = Depends(get_db)
 ):
     """发起微信扫码登录，返回登录URL和二维码"""
     wechat_service = WeChatAuthService(db)
     
     try:
-        # 生成微信登录URL
-        auth_url, state = wechat_service.generate_auth_url(request.state)
-        
-        # 生成二维码
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(auth_url)
-        qr.make(fit=True)
-        
-        # 创建二维码图片
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return WeChatLoginResponse(
-            auth_url=auth_url,
-            state=state,
-            qr_code=f"data:image/png;base64,{img_str}"
-        )
+        return await build_login_response(wechat_service, request.state, inline)
         
     except Exception as e:
         raise HTTPException(
@@ -52,33 +55,14 @@ async def wechat_login(
 @router.get("/login", response_model=WeChatLoginResponse, summary="获取微信登录二维码")
 async def get_wechat_qr(
     state: str = Query(None, description="状态参数"),
+    inline: bool = Query(True, description="是否在JSON中内联base64二维码，false时只返回qr_code_url"),
     db: Session = Depends(get_db)
 ):
     """获取微信登录二维码"""
     wechat_service = WeChatAuthService(db)
     
     try:
-        # 生成微信登录URL
-        auth_url, state = wechat_service.generate_auth_url(state)
-        
-        # 生成二维码
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(auth_url)
-        qr.make(fit=True)
-        
-        # 创建二维码图片
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return WeChatLoginResponse(
-            auth_url=auth_url,
-            state=state,
-            qr_code=f"data:image/png;base64,{img_str}"
-        )
+        return await build_login_response(wechat_service, state, inline)
         
     except Exception as e:
         raise HTTPException(
@@ -86,6 +70,27 @@ async def get_wechat_qr(
             detail=f"生成微信登录失败: {str(e)}"
         )
 
+@router.get("/qr/{state}", summary="微信登录二维码图片")
+async def get_wechat_qr_image(
+    state: str,
+    db: Session = Depends(get_db)
+):
+    """返回已登记state的二维码PNG，二维码内容不变，允许浏览器在state有效期内缓存"""
+    wechat_service = WeChatAuthService(db)
+    
+    if wechat_service.get_wechat_login_status(state)["status"] == "expired":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="二维码已过期"
+        )
+    
+    png = await get_qr_code_service().render_png_async(wechat_service.build_auth_url(state))
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Cache-Control": f"private, max-age={settings.login_state_ttl_seconds}"}
+    )
+
 @router.get("/callback", summary="微信登录回调")
 async def wechat_callback(
     code: str = Query(..., description="授权码"),
@@ -100,7 +105,8 @@ async def wechat_callback(
         user, message = await wechat_service.handle_wechat_callback(code, state)
         
         if not user:
-            # 登录失败，重定向到错误页面
+            # 登录失败，通知登录页并重定向到错误页面
+            wechat_service.set_wechat_login_status(state, "failed", message=message)
             return RedirectResponse(
                 url=f"/login?error={message}",
                 status_code=302
@@ -109,6 +115,11 @@ async def wechat_callback(
         # 生成JWT token
         access_token = create_access_token(data={"sub": user.username})
         
+        # 唤醒正在等待该state的登录页
+        wechat_service.set_wechat_login_status(
+            state, "success", user_id=user.id, message="登录成功", access_token=access_token
+        )
+        
         # 重定向到前端页面，携带token
         return RedirectResponse(
             url=f"/login/success?token={access_token}&user_id={user.id}",
@@ -116,6 +127,7 @@ async def wechat_callback(
         )
         
     except Exception as e:
+        wechat_service.set_wechat_login_status(state, "failed", message=f"登录失败: {str(e)}")
         return RedirectResponse(
             url=f"/login?error=登录失败: {str(e)}",
             status_code=302
@@ -124,14 +136,34 @@ async def wechat_callback(
 @router.get("/status/{state}", response_model=WeChatLoginStatusResponse, summary="查询微信登录状态")
 async def get_wechat_login_status(
     state: str,
+    wait: float = Query(0, ge=0, description="长轮询等待秒数，0表示立即返回"),
     db: Session = Depends(get_db)
 ):
-    """查询微信登录状态"""
+    """查询微信登录状态，wait>0时等待扫码结果，最长等待 login_state_max_wait_seconds 秒"""
     wechat_service = WeChatAuthService(db)
     
     try:
-        status_info = wechat_service.get_wechat_login_status(state)
-        return WeChatLoginStatusResponse(**status_info)
+        if wait > 0:
+            status_info = await wechat_service.wait_wechat_login_status(
+                state, min(wait, settings.login_state_max_wait_seconds)
+            )
+        else:
+            status_info = wechat_service.get_wechat_login_status(state)
+        
+        # 令牌只在第一次查到成功时返回，之后只返回状态
+        user = None
+        access_token = None
+        if status_info["status"] == "success":
+            access_token = wechat_service.claim_wechat_login_token(state)
+            if access_token and status_info.get("user_id"):
+                user = db.query(User).filter(User.id == status_info["user_id"]).first()
+        
+        return WeChatLoginStatusResponse(
+            status=status_info["status"],
+            message=status_info.get("message", ""),
+            user=UserResponse.model_validate(user) if user else None,
+            access_token=access_token
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -208,16 +240,15 @@ async def wechat_login_page():
         
         <script>
             let currentState = null;
-            let checkInterval = null;
             
             async function loadQRCode() {
                 try {
-                    const response = await fetch('/api/auth/wechat/login');
+                    const response = await fetch('/api/auth/wechat/login?inline=false');
                     const data = await response.json();
                     
                     currentState = data.state;
                     document.getElementById('qrCode').innerHTML = 
-                        `<img src="${data.qr_code}" alt="微信登录二维码" style="max-width: 200px;">`;
+                        `<img src="${data.qr_code_url}" alt="微信登录二维码" style="max-width: 200px;">`;
                     
                     // 开始轮询登录状态
                     startStatusCheck();
@@ -226,30 +257,34 @@ async def wechat_login_page():
                 }
             }
             
-            function startStatusCheck() {
-                if (checkInterval) clearInterval(checkInterval);
+            async function startStatusCheck() {
+                // 长轮询：服务端在扫码完成时立即返回，否则最多挂起25秒后返回pending
+                const state = currentState;
                 
-                checkInterval = setInterval(async () => {
+                while (state === currentState) {
                     try {
-                        const response = await fetch(`/api/auth/wechat/status/${currentState}`);
+                        const response = await fetch(`/api/auth/wechat/status/${state}?wait=25`);
                         const data = await response.json();
+                        if (state !== currentState) return;
                         
                         if (data.status === 'success') {
                             showStatus('登录成功！正在跳转...', 'success');
-                            clearInterval(checkInterval);
                             
                             // 跳转到成功页面
                             setTimeout(() => {
-                                window.location.href = '/login/success?user_id=' + data.user.id;
+                                window.location.href = '/login/success?token=' + encodeURIComponent(data.access_token)
+                                    + '&user_id=' + data.user.id;
                             }, 2000);
-                        } else if (data.status === 'failed') {
+                            return;
+                        } else if (data.status === 'failed' || data.status === 'expired') {
                             showStatus(data.message, 'error');
-                            clearInterval(checkInterval);
+                            return;
                         }
                     } catch (error) {
                         console.error('检查登录状态失败:', error);
+                        await new Promise(resolve => setTimeout(resolve, 2000));
                     }
-                }, 2000);
+                }
             }
             
             function showStatus(message, type) {
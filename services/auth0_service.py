@@ -1,4 +1,3 @@
-import httpx
 import json
 import uuid
 from typing import Optional, Dict, Any, Tuple
@@ -6,6 +5,8 @@ from urllib.parse import urlencode
 from config import settings
 from sqlalchemy.orm import Session
 from models import User
+from services.http_client_service import get_http_client
+from services.login_state_service import get_login_state_service
 from services.user_service import UserService
 
 class Auth0Service:
@@ -39,6 +40,8 @@ class Auth0Service:
             params["audience"] = settings.auth0_audience
         
         auth_url = f"{self.auth0_auth_url}?{urlencode(params)}"
+        # 登记state，供前端查询授权结果
+        get_login_state_service().create("auth0", state)
         return auth_url, state
     
     async def get_access_token(self, code: str, redirect_uri: str = None) -> Optional[Dict[str, Any]]:
@@ -48,39 +51,37 @@ class Auth0Service:
             if redirect_uri is None:
                 redirect_uri = settings.auth0_redirect_uri
                 
-            async with httpx.AsyncClient() as client:
-                data = {
-                    "grant_type": "authorization_code",
-                    "client_id": settings.auth0_client_id,
-                    "client_secret": settings.auth0_client_secret,
-                    "code": code,
-                    "redirect_uri": redirect_uri
-                }
-                
-                headers = {
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.post(
-                    self.auth0_token_url,
-                    json=data,
-                    headers=headers,
-                    timeout=10
-                )
+            data = {
+                "grant_type": "authorization_code",
+                "client_id": settings.auth0_client_id,
+                "client_secret": settings.auth0_client_secret,
+                "code": code,
+                "redirect_uri": redirect_uri
+            }
+            
+            headers = {
+                "Content-Type": "application/json"
+            }
+            
+            response = await get_http_client("auth0").post(
+                self.auth0_token_url,
+                json=data,
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                print(f"✅ 获取Auth0 token成功!")
+                token_data = response.json()
+                print(f"Token数据: {token_data}")
+                return token_data
+            else:
+                print(f"❌ 获取Auth0 token失败: {response.status_code}")
+                print(f"响应内容: {response.text}")
+                print(f"请求数据: {data}")
+                print(f"Token URL: {self.auth0_token_url}")
+                print(f"重定向URI: {redirect_uri}")
+                return None
                 
-                if response.status_code == 200:
-                    print(f"✅ 获取Auth0 token成功!")
-                    token_data = response.json()
-                    print(f"Token数据: {token_data}")
-                    return token_data
-                else:
-                    print(f"❌ 获取Auth0 token失败: {response.status_code}")
-                    print(f"响应内容: {response.text}")
-                    print(f"请求数据: {data}")
-                    print(f"Token URL: {self.auth0_token_url}")
-                    print(f"重定向URI: {redirect_uri}")
-                    return None
-                    
         except Exception as e:
             print(f"获取Auth0 token异常: {e}")
             return None
@@ -88,27 +89,25 @@ class Auth0Service:
     async def get_user_info(self, access_token: str) -> Optional[Dict[str, Any]]:
         """获取Auth0用户信息"""
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.get(
-                    self.auth0_userinfo_url,
-                    headers=headers,
-                    timeout=10
-                )
+            headers = {
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json"
+            }
+            
+            response = await get_http_client("auth0").get(
+                self.auth0_userinfo_url,
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                user_data = response.json()
+                print(f"✅ 获取用户信息成功: {user_data}")
+                return user_data
+            else:
+                print(f"❌ 获取用户信息失败: {response.status_code}")
+                print(f"响应内容: {response.text}")
+                return None
                 
-                if response.status_code == 200:
-                    user_data = response.json()
-                    print(f"✅ 获取用户信息成功: {user_data}")
-                    return user_data
-                else:
-                    print(f"❌ 获取用户信息失败: {response.status_code}")
-                    print(f"响应内容: {response.text}")
-                    return None
-                    
         except Exception as e:
             print(f"获取Auth0用户信息异常: {e}")
             return None
@@ -204,15 +203,17 @@ class Auth0Service:
     
     def get_auth0_login_status(self, state: str) -> Dict[str, Any]:
         """获取Auth0登录状态"""
-        # 这里可以从Redis或数据库获取登录状态
-        # 简化实现
-        return {
-            "status": "pending",
-            "message": "等待授权"
-        }
+        return get_login_state_service().get("auth0", state)
+    
+    def claim_auth0_login_token(self, state: str) -> Optional[str]:
+        """领取Auth0登录成功后的访问令牌（只能领取一次）"""
+        return get_login_state_service().claim_token("auth0", state)
+    
+    async def wait_auth0_login_status(self, state: str, timeout: float) -> Dict[str, Any]:
+        """等待Auth0登录结果（长轮询），超时返回当前状态"""
+        return await get_login_state_service().wait("auth0", state, timeout)
     
-    def set_auth0_login_status(self, state: str, status: str, user_id: int = None, message: str = ""):
+    def set_auth0_login_status(self, state: str, status: str, user_id: int = None, message: str = "",
+                               access_token: str = None):
         """设置Auth0登录状态"""
-        # 这里可以存储到Redis或数据库
-        # 简化实现
-        pass
+        get_login_state_service().set("auth0", state, status, user_id, message, access_token)
@@ -0,0 +1,149 @@
+"""
+图片编解码器注册表
+运行时探测可用的编码器（Pillow内置 + 可选的AVIF/HEIF插件），插件在第一次使用时才加载
+"""
+import importlib
+import importlib.util
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from PIL import features
+
+logger = logging.getLogger(__name__)
+
+# 已知格式及其能力，plugins为按顺序尝试的可选插件模块
+FORMAT_SPECS = [
+    {"format": "JPEG", "description": "JPEG图片格式", "extension": "jpg",
+     "alpha": False, "animation": False, "lossless": False, "feature": "jpg"},
+    {"format": "PNG", "description": "PNG图片格式", "extension": "png",
+     "alpha": True, "animation": True, "lossless": True, "feature": "zlib"},
+    {"format": "WEBP", "description": "WebP图片格式", "extension": "webp",
+     "alpha": True, "animation": True, "lossless": True, "feature": "webp"},
+    {"format": "BMP", "description": "BMP图片格式", "extension": "bmp",
+     "alpha": False, "animation": False, "lossless": True},
+    {"format": "TIFF", "description": "TIFF图片格式", "extension": "tiff",
+     "alpha": True, "animation": False, "lossless": True},
+    {"format": "GIF", "description": "GIF图片格式", "extension": "gif",
+     "alpha": True, "animation": True, "lossless": False},
+    {"format": "AVIF", "description": "AVIF图片格式", "extension": "avif",
+     "alpha": True, "animation": True, "lossless": True, "feature": "avif",
+     "plugins": ["pillow_avif"]},
+    {"format": "HEIF", "description": "HEIF/HEIC图片格式", "extension": "heic",
+     "alpha": True, "animation": False, "lossless": False,
+     "plugins": ["pillow_heif"]},
+]
+
+# "auto" 目标格式时参与比较的候选格式（按优先级排序，体积相同时取靠前的）
+AUTO_CANDIDATE_FORMATS = ["AVIF", "WEBP", "JPEG"]
+
+# 扩展名别名
+EXTENSION_ALIASES = {"jpeg": "jpg", "tif": "tiff", "heif": "heic"}
+
+
+class CodecRegistry:
+    """图片编解码器注册表"""
+
+    def __init__(self, specs: List[dict] = None):
+        self._specs = {spec["format"]: dict(spec) for spec in (specs or FORMAT_SPECS)}
+        self._loaded = set()
+        self._lock = threading.Lock()
+
+    def get_spec(self, fmt: str) -> Optional[dict]:
+        return self._specs.get(self.normalize_format(fmt))
+
+    def normalize_format(self, fmt: str) -> str:
+        fmt = (fmt or "").upper()
+        return {"JPG": "JPEG", "TIF": "TIFF", "HEIC": "HEIF"}.get(fmt, fmt)
+
+    def format_for_extension(self, extension: str) -> Optional[str]:
+        extension = extension.lower().lstrip(".")
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        for spec in self._specs.values():
+            if spec["extension"] == extension:
+                return spec["format"]
+        return None
+
+    def is_available(self, fmt: str) -> bool:
+        """
+        判断格式是否可用
+        只检查Pillow编译特性或插件模块是否存在，不导入插件
+        """
+        spec = self.get_spec(fmt)
+        if spec is None:
+            return False
+        if spec["format"] in self._loaded:
+            return True
+
+        feature = spec.get("feature")
+        if feature and features.check(feature):
+            return True
+        if spec.get("plugins"):
+            return any(importlib.util.find_spec(name) is not None for name in spec["plugins"])
+        return not feature
+
+    def ensure_loaded(self, fmt: str) -> bool:
+        """第一次使用某格式时加载对应插件，返回是否可用"""
+        spec = self.get_spec(fmt)
+        if spec is None:
+            return False
+        name = spec["format"]
+        if name in self._loaded:
+            return True
+
+        with self._lock:
+            if name in self._loaded:
+                return True
+
+            feature = spec.get("feature")
+            available = bool(feature and features.check(feature)) or (not feature and not spec.get("plugins"))
+            if not available:
+                available = self._load_plugin(spec)
+            if available:
+                self._loaded.add(name)
+            return available
+
+    def _load_plugin(self, spec: dict) -> bool:
+        for module_name in spec.get("plugins", []):
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+
+            # pillow_heif需要显式注册，pillow_avif导入即注册
+            register = getattr(module, "register_heif_opener", None)
+            if register:
+                register()
+            logger.info(f"已加载图片插件 {module_name} ({spec['format']})")
+            return True
+        return False
+
+    def list_formats(self) -> List[Dict]:
+        """列出所有格式及其能力，供 /api/image/formats 使用"""
+        return [
+            {
+                "format": spec["format"],
+                "description": spec["description"],
+                "extension": spec["extension"],
+                "available": self.is_available(spec["format"]),
+                "alpha": spec["alpha"],
+                "animation": spec["animation"],
+                "lossless": spec["lossless"],
+            }
+            for spec in self._specs.values()
+        ]
+
+    def auto_candidates(self, has_alpha: bool = False) -> List[str]:
+        """'auto'目标格式的候选列表，需要透明通道时排除不支持alpha的格式"""
+        return [
+            fmt for fmt in AUTO_CANDIDATE_FORMATS
+            if self.is_available(fmt) and (not has_alpha or self._specs[fmt]["alpha"])
+        ]
+
+
+# 创建全局编解码器注册表实例
+codec_registry = CodecRegistry()
+
+def get_codec_registry() -> CodecRegistry:
+    """获取编解码器注册表实例"""
+    return codec_registry
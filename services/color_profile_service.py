@@ -0,0 +1,127 @@
+"""
+ICC色彩配置服务
+把带ICC配置文件的图片转换到sRGB，转换对象按 (配置文件, 输入模式, 输出模式) 缓存复用
+"""
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from services.metrics_service import get_metrics_service
+
+logger = logging.getLogger(__name__)
+
+# 最多缓存的转换对象数量
+MAX_CACHED_TRANSFORMS = 32
+
+# ImageCms支持直接转换的输入模式及对应的输出模式
+CMS_OUTPUT_MODES = {"RGB": "RGB", "RGBA": "RGBA", "CMYK": "RGB", "L": "L"}
+
+
+class ColorProfileService:
+    """ICC色彩配置服务"""
+
+    def __init__(self, max_transforms: int = MAX_CACHED_TRANSFORMS):
+        self.max_transforms = max_transforms
+        self._transforms = OrderedDict()
+        self._lock = threading.Lock()
+        self._srgb_profile = None
+        self._srgb_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            from PIL import ImageCms
+            self._cms = ImageCms
+        except ImportError:
+            # Pillow未编译littlecms时跳过色彩转换
+            self._cms = None
+            logger.warning("ImageCms不可用，ICC配置文件将不做转换")
+
+    @property
+    def available(self) -> bool:
+        return self._cms is not None
+
+    def get_srgb_profile_bytes(self) -> Optional[bytes]:
+        """sRGB配置文件字节，用于写入输出图片"""
+        if not self.available:
+            return None
+        self._ensure_srgb()
+        return self._srgb_bytes
+
+    def to_srgb(self, img: Image.Image) -> Tuple[Image.Image, bool]:
+        """
+        把图片从内嵌ICC配置转换到sRGB
+        返回: (转换后的图片, 是否做了转换)
+        """
+        icc_profile = img.info.get("icc_profile")
+        if not icc_profile or not self.available or img.mode not in CMS_OUTPUT_MODES:
+            return img, False
+
+        out_mode = CMS_OUTPUT_MODES[img.mode]
+        transform = self._get_transform(icc_profile, img.mode, out_mode)
+        if transform is None:
+            return img, False
+
+        converted = self._cms.applyTransform(img, transform)
+        converted.info = {k: v for k, v in img.info.items() if k != "icc_profile"}
+        return converted, True
+
+    def _ensure_srgb(self):
+        if self._srgb_profile is None:
+            self._srgb_profile = self._cms.ImageCmsProfile(self._cms.createProfile("sRGB"))
+            self._srgb_bytes = self._srgb_profile.tobytes()
+
+    def _get_transform(self, icc_profile: bytes, in_mode: str, out_mode: str):
+        """获取（或构建并缓存）转换对象，源配置本身是sRGB时返回None"""
+        key = (hashlib.sha1(icc_profile).hexdigest(), in_mode, out_mode)
+
+        with self._lock:
+            if key in self._transforms:
+                self._transforms.move_to_end(key)
+                self.hits += 1
+                get_metrics_service().record_cache("icc_transform", True)
+                return self._transforms[key]
+
+        get_metrics_service().record_cache("icc_transform", False)
+
+        transform = self._build_transform(icc_profile, in_mode, out_mode)
+
+        with self._lock:
+            self.misses += 1
+            self._transforms[key] = transform
+            while len(self._transforms) > self.max_transforms:
+                self._transforms.popitem(last=False)
+        return transform
+
+    def _build_transform(self, icc_profile: bytes, in_mode: str, out_mode: str):
+        try:
+            source = self._cms.ImageCmsProfile(io.BytesIO(icc_profile))
+        except Exception as e:
+            logger.warning(f"无法解析ICC配置文件: {e}")
+            return None
+
+        # 已经是sRGB的RGB图片无需转换
+        description = self._cms.getProfileDescription(source) or ""
+        if in_mode == out_mode and "srgb" in description.lower():
+            return None
+
+        # 配置文件与图片模式不匹配等情况下无法构建，缓存None，之后同样的配置直接跳过色彩转换
+        self._ensure_srgb()
+        try:
+            return self._cms.buildTransform(source, self._srgb_profile, in_mode, out_mode)
+        except (self._cms.PyCMSError, OSError) as e:
+            logger.warning(f"无法构建ICC色彩转换（{in_mode} -> {out_mode}），跳过色彩转换: {e}")
+            return None
+
+
+# 创建全局色彩配置服务实例（转换对象跨请求复用）
+color_profile_service = ColorProfileService()
+
+def get_color_profile_service() -> ColorProfileService:
+    """获取色彩配置服务实例"""
+    return color_profile_service
@@ -0,0 +1,83 @@
+"""
+转换历史服务
+按 (created_at, id) 倒序做游标（keyset）分页：每页只按索引
+idx_conversion_records_user_created_id 定位到游标位置再取 limit+1 条，翻到多深都不需要跳过前面的记录。
+摘要模式只查询列表展示需要的列，不读取 error_message 文本。
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models import ConversionRecord
+
+MAX_PAGE_SIZE = 100
+
+SUMMARY_COLUMNS = (
+    ConversionRecord.id,
+    ConversionRecord.user_id,
+    ConversionRecord.original_filename,
+    ConversionRecord.original_format,
+    ConversionRecord.target_format,
+    ConversionRecord.file_size,
+    ConversionRecord.conversion_time,
+    ConversionRecord.status,
+    ConversionRecord.created_at,
+)
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """把最后一条记录的位置编码为游标"""
+    raw = f"{created_at.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, record_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+class ConversionHistoryService:
+    """用户转换历史"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_records(self, user_id: int, limit: int = 20, cursor: Optional[str] = None,
+                     summary: bool = False) -> dict:
+        """
+        获取一页转换记录（最新的在前）
+        返回 {"items": 记录, "next_cursor": 下一页游标或None, "has_more": 是否还有更多}
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = self.db.query(*SUMMARY_COLUMNS) if summary else self.db.query(ConversionRecord)
+        query = query.filter(ConversionRecord.user_id == user_id)
+        if cursor:
+            created_at, record_id = decode_cursor(cursor)
+            query = query.filter(tuple_(ConversionRecord.created_at, ConversionRecord.id) < (created_at, record_id))
+
+        rows = query.order_by(
+            ConversionRecord.created_at.desc(), ConversionRecord.id.desc()
+        ).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+        return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+
+    def delete_record(self, record_id: int, user_id: int) -> bool:
+        """删除用户自己的转换记录"""
+        deleted = self.db.query(ConversionRecord).filter(
+            ConversionRecord.id == record_id,
+            ConversionRecord.user_id == user_id
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted > 0
@@ -0,0 +1,114 @@
+"""
+转换统计服务
+每次写入转换记录时，在同一事务内把次数、字节数、耗时累加到 conversion_stats_daily
+（每个用户每天每种目标格式一行）。统计接口只读这张汇总表，不再对 conversion_records 做聚合扫描，
+查询代价与转换次数无关，转换记录按保留期清理后统计也不会丢失。
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from models import ConversionStatsDaily
+
+COUNTER_COLUMNS = ("conversion_count", "failure_count", "bytes_in", "bytes_out", "total_time")
+CONFLICT_COLUMNS = ("user_id", "stat_date", "target_format")
+
+
+def _insert_for_dialect(dialect_name: str):
+    """返回支持冲突时累加的INSERT构造函数，不支持的数据库返回None"""
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+class ConversionStatsService:
+    """转换统计日汇总的写入与查询"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, user_id: int, target_format: str, conversion_time: float, success: bool,
+               bytes_in: int = 0, bytes_out: int = 0, stat_date: Optional[date] = None):
+        """
+        把一次转换累加到当天的汇总行（不提交，由调用方与转换记录一起提交）
+        失败的转换只计次数和耗时
+        """
+        values = {
+            "user_id": user_id,
+            "stat_date": stat_date or date.today(),
+            "target_format": target_format.upper(),
+            "conversion_count": 1,
+            "failure_count": 0 if success else 1,
+            "bytes_in": bytes_in if success else 0,
+            "bytes_out": bytes_out if success else 0,
+            "total_time": conversion_time,
+        }
+        table = ConversionStatsDaily.__table__
+        dialect_name = self.db.get_bind().dialect.name
+        insert = _insert_for_dialect(dialect_name)
+
+        if insert is None:
+            # 其他数据库：先累加，没有命中再插入
+            result = self.db.execute(
+                update(table)
+                .where(*(table.c[name] == values[name] for name in CONFLICT_COLUMNS))
+                .values({name: table.c[name] + values[name] for name in COUNTER_COLUMNS})
+            )
+            if result.rowcount == 0:
+                self.db.execute(table.insert().values(**values))
+            return
+
+        stmt = insert(table).values(**values)
+        if dialect_name == "mysql":
+            stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in COUNTER_COLUMNS})
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(CONFLICT_COLUMNS),
+                set_={name: table.c[name] + stmt.excluded[name] for name in COUNTER_COLUMNS},
+            )
+        self.db.execute(stmt)
+
+    def get_stats(self, user_id: Optional[int] = None, days: int = 30, today: Optional[date] = None) -> dict:
+        """
+        最近days天（含今天）的转换统计，按目标格式分组
+        user_id为None时统计全部用户（管理端）
+        """
+        today = today or date.today()
+        since = today - timedelta(days=days - 1)
+        query = self.db.query(
+            ConversionStatsDaily.target_format,
+            *(func.coalesce(func.sum(getattr(ConversionStatsDaily, name)), 0).label(name) for name in COUNTER_COLUMNS)
+        ).filter(ConversionStatsDaily.stat_date >= since, ConversionStatsDaily.stat_date <= today)
+        if user_id is not None:
+            query = query.filter(ConversionStatsDaily.user_id == user_id)
+        rows = query.group_by(ConversionStatsDaily.target_format).order_by(ConversionStatsDaily.target_format).all()
+
+        by_format = [self._summarize({"target_format": row.target_format, **{name: getattr(row, name) for name in COUNTER_COLUMNS}})
+                     for row in rows]
+        totals = {name: sum(item[name] for item in by_format) for name in COUNTER_COLUMNS}
+        return {
+            "days": days,
+            "since": since,
+            "total": self._summarize(totals),
+            "by_format": by_format,
+        }
+
+    @staticmethod
+    def _summarize(counters: dict) -> dict:
+        """补充节省字节数和平均耗时"""
+        counters = {**counters, "total_time": float(counters["total_time"])}
+        for name in ("conversion_count", "failure_count", "bytes_in", "bytes_out"):
+            counters[name] = int(counters[name])
+        counters["bytes_saved"] = counters["bytes_in"] - counters["bytes_out"]
+        counters["average_time"] = (
+            counters["total_time"] / counters["conversion_count"] if counters["conversion_count"] else 0.0
+        )
+        return counters
@@ -0,0 +1,242 @@
+"""
+外部HTTP客户端服务
+按上游（微信开放平台、Auth0、IP定位、微信支付）维护共享的 httpx.AsyncClient：
+连接池复用TCP/TLS连接，安装了h2时启用HTTP/2，每个上游有独立的超时、重试退避和熔断器。
+客户端在应用lifespan中创建和关闭；脚本或测试中首次使用时按需创建。
+"""
+import asyncio
+import logging
+import random
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 这些方法重复发送没有副作用，读超时和5xx也可以重试；其他方法只在连接未建立时重试
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    """上游配置"""
+    timeout: float = 10.0
+    connect_timeout: float = 3.0
+    retries: int = 2
+    backoff: float = 0.2
+    failure_threshold: int = 5
+    reset_seconds: float = 30.0
+    http2: bool = True
+    cert: Optional[Tuple[str, str]] = None
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "wechat_open": UpstreamConfig(timeout=5.0, connect_timeout=2.0),
+    "auth0": UpstreamConfig(timeout=10.0, connect_timeout=3.0),
+    # 只用于登录方式推荐，宁可快速失败也不拖慢登录
+    "ip_geo": UpstreamConfig(timeout=2.0, connect_timeout=1.0, retries=0, failure_threshold=3),
+    "ip_geo_fallback": UpstreamConfig(timeout=2.0, connect_timeout=1.0, retries=0, failure_threshold=3),
+    "wechat_pay": UpstreamConfig(timeout=10.0, connect_timeout=3.0, retries=1),
+}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """熔断器打开，请求未发送"""
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开，reset_seconds内直接拒绝请求；
+    之后放行一个试探请求（半开），成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self):
+        """请求既没有成功也没有记为失败就结束时（取消、URL错误等）释放试探名额，不改变熔断状态"""
+        self._probing = False
+
+
+class UpstreamClient:
+    """单个上游的客户端：连接池 + 超时 + 重试 + 熔断"""
+
+    def __init__(self, name: str, config: UpstreamConfig, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.config = config
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_seconds)
+        self._transport = transport
+        # 事件循环 -> httpx客户端；应用和调度器线程各有自己的事件循环，互不替换对方的连接池
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """当前事件循环中的httpx客户端（连接池不能跨事件循环复用）"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = self._create_client()
+        return client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        config = self.config
+        kwargs = {}
+        if config.cert:
+            kwargs["cert"] = config.cert
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.http_pool_max_connections,
+                max_keepalive_connections=settings.http_pool_max_keepalive,
+                keepalive_expiry=settings.http_keepalive_expiry_seconds,
+            ),
+            http2=config.http2 and HTTP2_AVAILABLE,
+            transport=self._transport,
+            **kwargs,
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        发送请求，失败时按指数退避重试
+        连接错误总是可以重试；读超时和502/503/504只对幂等方法重试，避免重复下单等副作用
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"上游 {self.name} 熔断中，请求未发送")
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                retryable = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)) or idempotent
+                if not retryable or attempt >= self.config.retries:
+                    logger.warning(f"请求上游 {self.name} 失败: {method} {url} {type(e).__name__}: {e}")
+                    raise
+            except BaseException:
+                # 取消、InvalidURL、TooManyRedirects等：不计入上游失败，但半开的试探名额必须释放，
+                # 否则allow()之后一直返回False
+                self.breaker.release_probe()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not idempotent or attempt >= self.config.retries:
+                    return response
+                await response.aclose()
+
+            attempt += 1
+            await asyncio.sleep(self.config.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        """关闭当前事件循环中的客户端"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class HttpClientRegistry:
+    """上游客户端注册表"""
+
+    def __init__(self, upstreams: Optional[Dict[str, UpstreamConfig]] = None):
+        self.upstreams = dict(UPSTREAMS if upstreams is None else upstreams)
+        if upstreams is None and settings.wechat_cert_path and settings.wechat_key_path:
+            # 退款等接口需要商户证书，单独一个连接池
+            self.upstreams["wechat_pay_cert"] = UpstreamConfig(
+                timeout=10.0, connect_timeout=3.0, retries=1,
+                cert=(settings.wechat_cert_path, settings.wechat_key_path),
+            )
+        self._clients: Dict[str, UpstreamClient] = {}
+
+    def get(self, name: str) -> UpstreamClient:
+        client = self._clients.get(name)
+        if client is None:
+            config = self.upstreams.get(name)
+            if config is None:
+                raise KeyError(f"未注册的上游: {name}")
+            client = self._clients[name] = UpstreamClient(name, config)
+        return client
+
+    def register(self, name: str, config: UpstreamConfig, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """注册或替换上游，transport用于测试中替换网络层"""
+        self.upstreams[name] = config
+        self._clients[name] = UpstreamClient(name, config, transport)
+
+    async def startup(self):
+        """在lifespan中预先创建各上游客户端"""
+        for name in self.upstreams:
+            self.get(name).client
+        logger.info(f"外部HTTP客户端已创建: {', '.join(self.upstreams)}，HTTP/2 {'启用' if HTTP2_AVAILABLE else '未安装h2，使用HTTP/1.1'}")
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+
+    def status(self) -> Dict[str, str]:
+        """各上游熔断器状态"""
+        return {name: client.breaker.state for name, client in self._clients.items()}
+
+
+# 创建全局客户端注册表（连接池在进程内共享）
+http_client_registry = HttpClientRegistry()
+
+def get_http_client(name: str) -> UpstreamClient:
+    """获取指定上游的客户端"""
+    return http_client_registry.get(name)
+
+def get_http_client_registry() -> HttpClientRegistry:
+    """获取客户端注册表"""
+    return http_client_registry
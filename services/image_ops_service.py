@@ -0,0 +1,143 @@
+"""
+图片像素操作后端
+提供透明通道合成、亮度/对比度、灰度、锐化等操作，支持Pillow和NumPy两种实现，运行时可切换
+"""
+import logging
+from typing import Optional, Tuple
+
+from PIL import Image, ImageEnhance, ImageFilter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 默认背景色（白色）
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+
+class PillowOpsBackend:
+    """Pillow实现（默认）"""
+
+    name = "pillow"
+
+    def flatten_alpha(self, img: Image.Image, background: Tuple[int, int, int] = DEFAULT_BACKGROUND) -> Image.Image:
+        """把带透明通道的图片合成到纯色背景上，输出RGB"""
+        if img.mode not in ('RGBA', 'LA', 'P'):
+            return img if img.mode == 'RGB' else img.convert('RGB')
+
+        result = Image.new('RGB', img.size, background)
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        result.paste(img, mask=img.getchannel('A'))
+        return result
+
+    def adjust_brightness_contrast(self, img: Image.Image, brightness: float = 1.0, contrast: float = 1.0) -> Image.Image:
+        """调整亮度和对比度，系数为1.0时保持不变"""
+        if brightness != 1.0:
+            img = ImageEnhance.Brightness(img).enhance(brightness)
+        if contrast != 1.0:
+            img = ImageEnhance.Contrast(img).enhance(contrast)
+        return img
+
+    def grayscale(self, img: Image.Image) -> Image.Image:
+        """转换为灰度图"""
+        return img.convert('L')
+
+    def sharpen(self, img: Image.Image) -> Image.Image:
+        """锐化"""
+        return img.filter(ImageFilter.SHARPEN)
+
+
+class NumpyOpsBackend(PillowOpsBackend):
+    """
+    NumPy向量化实现
+    尽量在np.asarray视图和预分配缓冲区上原地计算，减少整图中间副本
+    透明通道合成和灰度转换Pillow的C实现已经是单次遍历，直接沿用，不在这里重写
+    """
+
+    name = "numpy"
+
+    def __init__(self):
+        import numpy as np
+        self.np = np
+
+    def adjust_brightness_contrast(self, img: Image.Image, brightness: float = 1.0, contrast: float = 1.0) -> Image.Image:
+        if brightness == 1.0 and contrast == 1.0:
+            return img
+        if img.mode not in ('RGB', 'L'):
+            return super().adjust_brightness_contrast(img, brightness, contrast)
+
+        np = self.np
+        bands = len(img.getbands())
+        # 用查找表代替ImageEnhance的整图blend，每个系数只遍历一次像素
+        if brightness != 1.0:
+            lut = np.clip(np.arange(256, dtype=np.float32) * brightness + 0.5, 0, 255).astype(np.uint8)
+            img = img.point(lut.tolist() * bands)
+        if contrast != 1.0:
+            # 与ImageEnhance一致：以（亮度调整后）灰度图的均值为中心
+            mean = int(self._mean_luminance(img) + 0.5)
+            lut = mean + (np.arange(256, dtype=np.float32) - mean) * contrast
+            lut = np.clip(lut + 0.5, 0, 255).astype(np.uint8)
+            img = img.point(lut.tolist() * bands)
+        return img
+
+    def sharpen(self, img: Image.Image) -> Image.Image:
+        if img.mode not in ('RGB', 'L') or img.width < 3 or img.height < 3:
+            return super().sharpen(img)
+
+        np = self.np
+        pixels = np.asarray(img).astype(np.int16)
+        # 3x3锐化核 [-2 ... 32 ... -2] / 16，等价于 (34 * 中心 - 2 * 3x3邻域和) / 16
+        box = pixels[:-2] + pixels[1:-1] + pixels[2:]
+        box = box[:, :-2] + box[:, 1:-1] + box[:, 2:]
+
+        center = pixels[1:-1, 1:-1]
+        box *= -2
+        box += center * 34
+        box += 8
+        box //= 16
+        np.clip(box, 0, 255, out=box)
+
+        out = np.array(img)
+        out[1:-1, 1:-1] = box
+        return Image.fromarray(out, img.mode)
+
+    def _mean_luminance(self, img: Image.Image) -> float:
+        gray = img if img.mode == 'L' else img.convert('L')
+        histogram = self.np.asarray(gray.histogram(), dtype=self.np.float64)
+        return float((histogram * self.np.arange(256)).sum() / histogram.sum())
+
+
+BACKENDS = {
+    PillowOpsBackend.name: PillowOpsBackend,
+    NumpyOpsBackend.name: NumpyOpsBackend,
+}
+
+_backend = None
+
+
+def set_image_ops_backend(name: str):
+    """切换操作后端，依赖不可用时回退到Pillow"""
+    global _backend
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"未知的图片操作后端: {name}，可选: {', '.join(BACKENDS)}")
+
+    try:
+        _backend = backend_class()
+    except ImportError as e:
+        logger.warning(f"图片操作后端 {name} 不可用({e})，使用pillow")
+        _backend = PillowOpsBackend()
+    return _backend
+
+
+def get_image_ops_backend(name: Optional[str] = None):
+    """获取图片操作后端，默认使用配置中的 image_ops_backend"""
+    if name is not None:
+        backend_class = BACKENDS.get(name)
+        if backend_class is None:
+            raise ValueError(f"未知的图片操作后端: {name}")
+        return backend_class()
+    if _backend is None:
+        return set_image_ops_backend(settings.image_ops_backend)
+    return _backend
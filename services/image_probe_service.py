@@ -0,0 +1,275 @@
+"""
+图片元数据探测服务
+只解析文件头部（默认前64KB）获取尺寸、格式、模式、EXIF方向、帧数和ICC信息，不做完整解码
+启用缓存时按整个文件内容的哈希缓存结果（流式计算，不整体读入内存）
+"""
+import hashlib
+import io
+import struct
+from typing import BinaryIO, Optional
+
+from PIL import Image
+
+from services.cache_service import CacheService
+from services.metrics_service import get_metrics_service
+
+# 首次读取的头部字节数
+PROBE_HEADER_BYTES = 64 * 1024
+
+# 头部信息过大时（如JPEG内嵌大缩略图/ICC）逐步扩大读取范围的上限
+MAX_PROBE_BYTES = 1024 * 1024
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# EXIF方向标签
+EXIF_ORIENTATION_TAG = 0x0112
+
+# PNG颜色类型 -> Pillow模式
+PNG_COLOR_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+
+
+class IncompleteHeaderError(Exception):
+    """头部数据不足以完成解析"""
+
+
+class ImageProbeService:
+    """图片元数据探测服务"""
+
+    def __init__(self, cache_service: Optional[CacheService] = None):
+        self.cache_service = cache_service
+
+    def probe_file(self, fileobj: BinaryIO, file_size: int) -> dict:
+        """
+        探测文件对象的图片信息
+        仅解析头部；启用缓存时结果按整个文件内容的哈希缓存
+        （头部相同的文件，帧数、文件末尾的EXIF等仍可能不同）
+        """
+        file_hash = None
+        if self.cache_service:
+            file_hash = self._hash_file(fileobj)
+            cached = self._get_cached(file_hash)
+            if cached is not None:
+                return cached
+
+        fileobj.seek(0)
+        head = fileobj.read(PROBE_HEADER_BYTES)
+        while True:
+            try:
+                info = self.probe_bytes(head, file_size)
+                break
+            except IncompleteHeaderError:
+                if len(head) >= min(file_size, MAX_PROBE_BYTES):
+                    raise ValueError("无法识别的图片文件头")
+                head += fileobj.read(min(len(head), MAX_PROBE_BYTES - len(head)))
+
+        if file_hash:
+            info["file_hash"] = file_hash
+            self.cache_service.cache_image_info(file_hash, info)
+        return info
+
+    def probe_path(self, file_path: str) -> dict:
+        """探测磁盘文件的图片信息"""
+        with open(file_path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            file_size = f.tell()
+            return self.probe_file(f, file_size)
+
+    def probe_bytes(self, head: bytes, file_size: int) -> dict:
+        """解析头部字节，头部不完整时抛出IncompleteHeaderError"""
+        complete = len(head) >= file_size
+
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            info = self._probe_png(head, complete)
+        elif head[:6] in (b"GIF87a", b"GIF89a"):
+            info = self._probe_gif(head, complete)
+        elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            info = self._probe_webp(head, complete)
+        else:
+            info = self._probe_with_pillow(head, complete)
+
+        info["size"] = (info["width"], info["height"])
+        info["file_size"] = file_size
+        if info["frame_count"] is not None:
+            info["is_animated"] = info["frame_count"] > 1
+        return info
+
+    def _hash_file(self, fileobj: BinaryIO) -> str:
+        """整个文件内容的SHA-256，分块读取"""
+        fileobj.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: fileobj.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _get_cached(self, file_hash: str) -> Optional[dict]:
+        if not self.cache_service:
+            return None
+        cached = self.cache_service.get_image_info(file_hash)
+        hit = isinstance(cached, dict)
+        get_metrics_service().record_cache("image_info", hit)
+        return cached.get("image_info") if hit else None
+
+    def _result(self, fmt: str, mode: str, width: int, height: int,
+                orientation: Optional[int] = None, frame_count: Optional[int] = 1,
+                is_animated: Optional[bool] = False, has_icc_profile: bool = False) -> dict:
+        return {
+            "format": fmt,
+            "mode": mode,
+            "width": width,
+            "height": height,
+            "orientation": orientation,
+            "frame_count": frame_count,
+            "is_animated": is_animated,
+            "has_icc_profile": has_icc_profile
+        }
+
+    def _read_orientation(self, exif_data: bytes) -> Optional[int]:
+        exif = Image.Exif()
+        try:
+            exif.load(exif_data)
+        except Exception:
+            return None
+        return exif.get(EXIF_ORIENTATION_TAG)
+
+    def _probe_png(self, head: bytes, complete: bool) -> dict:
+        if len(head) < 33:
+            raise IncompleteHeaderError()
+
+        width, height, bit_depth, color_type = struct.unpack(">IIBB", head[16:26])
+        mode = PNG_COLOR_MODES.get(color_type, "RGB")
+        if color_type == 0 and bit_depth == 16:
+            mode = "I;16"
+        elif color_type == 0 and bit_depth == 1:
+            mode = "1"
+
+        info = self._result("PNG", mode, width, height)
+        offset = 8
+        # 遍历IDAT之前的辅助块
+        while offset + 8 <= len(head):
+            length, chunk_type = struct.unpack(">I4s", head[offset:offset + 8])
+            data_start = offset + 8
+            if chunk_type in (b"IDAT", b"IEND"):
+                return info
+            if chunk_type == b"acTL" and data_start + 4 <= len(head):
+                info["frame_count"] = struct.unpack(">I", head[data_start:data_start + 4])[0]
+            elif chunk_type == b"iCCP":
+                info["has_icc_profile"] = True
+            elif chunk_type == b"eXIf":
+                if data_start + length > len(head):
+                    break
+                info["orientation"] = self._read_orientation(head[data_start:data_start + length])
+            offset = data_start + length + 4
+
+        if complete:
+            return info
+        raise IncompleteHeaderError()
+
+    def _probe_gif(self, head: bytes, complete: bool) -> dict:
+        if len(head) < 13:
+            raise IncompleteHeaderError()
+
+        width, height, flags = struct.unpack("<HHB", head[6:11])
+        offset = 13
+        if flags & 0x80:
+            offset += 3 << ((flags & 0x07) + 1)
+
+        # 在已读取的头部范围内统计图像描述符
+        frame_count = 0
+        while offset < len(head):
+            block = head[offset]
+            if block == 0x3B:  # 文件结束
+                return self._result("GIF", "P", width, height, frame_count=frame_count,
+                                    is_animated=frame_count > 1)
+            if block == 0x21:  # 扩展块
+                offset += 2
+            elif block == 0x2C:  # 图像描述符
+                frame_count += 1
+                if offset + 10 > len(head):
+                    break
+                local_flags = head[offset + 9]
+                offset += 10
+                if local_flags & 0x80:
+                    offset += 3 << ((local_flags & 0x07) + 1)
+                offset += 1  # LZW最小码长
+            else:
+                break
+            # 跳过数据子块
+            while offset < len(head) and head[offset]:
+                offset += head[offset] + 1
+            offset += 1
+
+        if frame_count == 0 and not complete:
+            raise IncompleteHeaderError()
+
+        # 文件未读完时帧数未知，但已能判断是否为动图
+        return self._result("GIF", "P", width, height, frame_count=None,
+                            is_animated=True if frame_count > 1 else None)
+
+    def _probe_webp(self, head: bytes, complete: bool) -> dict:
+        if len(head) < 30:
+            raise IncompleteHeaderError()
+
+        chunk_type = head[12:16]
+        if chunk_type == b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            return self._result("WEBP", "RGB", width & 0x3FFF, height & 0x3FFF)
+        if chunk_type == b"VP8L":
+            bits = struct.unpack("<I", head[21:25])[0]
+            width = (bits & 0x3FFF) + 1
+            height = ((bits >> 14) & 0x3FFF) + 1
+            mode = "RGBA" if (bits >> 28) & 1 else "RGB"
+            return self._result("WEBP", mode, width, height)
+        if chunk_type != b"VP8X":
+            raise ValueError("无法识别的WebP数据块")
+
+        flags = head[20]
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        animated = bool(flags & 0x02)
+        info = self._result(
+            "WEBP", "RGBA" if flags & 0x10 else "RGB", width, height,
+            frame_count=None if animated else 1,
+            is_animated=animated,
+            has_icc_profile=bool(flags & 0x20)
+        )
+
+        # 统计头部范围内的ANMF帧，EXIF块通常位于文件末尾，仅在已读取时解析
+        frame_count = 0
+        offset = 30
+        while offset + 8 <= len(head):
+            sub_type, length = struct.unpack("<4sI", head[offset:offset + 8])
+            if sub_type == b"ANMF":
+                frame_count += 1
+            elif sub_type == b"EXIF" and offset + 8 + length <= len(head):
+                info["orientation"] = self._read_orientation(head[offset + 8:offset + 8 + length])
+            offset += 8 + length + (length & 1)
+
+        if animated and complete:
+            info["frame_count"] = frame_count
+        return info
+
+    def _probe_with_pillow(self, head: bytes, complete: bool) -> dict:
+        """JPEG/TIFF/BMP等格式由Pillow解析，Image.open只读取头部，不会解码像素"""
+        try:
+            img = Image.open(io.BytesIO(head))
+        except Exception:
+            if complete:
+                raise ValueError("无法识别的图片格式")
+            raise IncompleteHeaderError()
+
+        with img:
+            try:
+                frame_count = getattr(img, "n_frames", 1)
+            except Exception:
+                frame_count = None
+            return self._result(
+                img.format,
+                img.mode,
+                img.width,
+                img.height,
+                orientation=img.getexif().get(EXIF_ORIENTATION_TAG),
+                frame_count=frame_count,
+                is_animated=frame_count > 1 if frame_count is not None else None,
+                has_icc_profile=bool(img.info.get("icc_profile"))
+            )
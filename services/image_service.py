@@ -1,12 +1,86 @@
+import io
 import os
 import time
-from typing import Optional, Tuple
-from PIL import Image, ImageOps
+from typing import Callable, Iterator, Optional, Tuple
+from PIL import Image, ImageOps, ImageSequence, GifImagePlugin
 from sqlalchemy.orm import Session
 from models import ConversionRecord
 from framework.schemas import ImageConvertRequest
+from services.conversion_stats_service import ConversionStatsService
+from services.image_probe_service import ImageProbeService
+from services.color_profile_service import get_color_profile_service
+from services.image_ops_service import get_image_ops_backend
+from services.codec_service import get_codec_registry
+from services.metrics_service import StageTimer, get_metrics_service
+from services.tracing_service import span
 from config import settings
 
+# 支持输出动图的目标格式
+ANIMATED_TARGET_FORMATS = {"GIF", "WEBP"}
+
+# GIF帧未声明时长时使用的默认值（毫秒）
+DEFAULT_FRAME_DURATION = 100
+
+# 可以写入EXIF/ICC元数据的目标格式
+METADATA_TARGET_FORMATS = {"JPEG", "WEBP", "PNG", "TIFF", "AVIF", "HEIF"}
+
+# 自动选择体积最小格式的目标格式标识
+AUTO_TARGET_FORMAT = "AUTO"
+
+# EXIF方向标签
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+class AnimatedFrameStream(Image.Image):
+    """
+    动图帧流 - 按需解码并处理单帧
+
+    对外表现为一个多帧Image，Pillow编码器每次seek时才解码源图对应帧并执行处理，
+    同一时刻只持有当前帧，内存占用与动画长度无关。
+    """
+
+    def __init__(self, source: Image.Image, transform: Callable[[Image.Image], Image.Image]):
+        super().__init__()
+        self._source = source
+        self._transform = transform
+        self._frame_index = -1
+        # 编码器读取第i帧时长前一定已经seek过第i帧，因此按seek顺序追加即可
+        self.durations = []
+        self.seek(0)
+
+    @property
+    def n_frames(self) -> int:
+        return getattr(self._source, "n_frames", 1)
+
+    @property
+    def is_animated(self) -> bool:
+        return self.n_frames > 1
+
+    def seek(self, frame: int) -> None:
+        if frame == self._frame_index:
+            return
+        self._source.seek(frame)
+        processed = self._transform(self._source)
+        processed.load()
+
+        self.im = processed.im
+        if isinstance(getattr(Image.Image, "mode", None), property):
+            self._mode = processed.mode
+        else:
+            # Pillow < 10.1 中mode为普通属性
+            self.mode = processed.mode
+        self._size = processed.size
+        self.palette = processed.palette
+        self.info = {k: v for k, v in self._source.info.items() if k != "transparency"}
+        self._frame_index = frame
+
+        if len(self.durations) == frame:
+            self.durations.append(self._source.info.get("duration") or DEFAULT_FRAME_DURATION)
+
+    def tell(self) -> int:
+        return self._frame_index
+
+
 class ImageService:
     def __init__(self, db: Session):
         self.db = db
@@ -21,59 +95,63 @@ class ImageService:
         返回: (是否成功, 输出文件路径, 错误信息)
         """
         start_time = time.time()
+        metrics = get_metrics_service()
+        timer = StageTimer()
+        source_label = os.path.splitext(file_path)[1][1:].upper()
+        metrics.in_progress.inc()
         
         try:
+            registry = get_codec_registry()
+            # 源格式依赖可选插件（如AVIF/HEIF）时，首次使用才加载
+            source_format = registry.format_for_extension(os.path.splitext(file_path)[1])
+            if source_format:
+                registry.ensure_loaded(source_format)
+            
             # 打开原始图片
             with Image.open(file_path) as img:
-                # 转换为RGB模式（如果需要）
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # 创建白色背景
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 调整大小（如果指定）
-                if convert_request.resize:
-                    width = convert_request.resize.get('width')
-                    height = convert_request.resize.get('height')
-                    if width and height and width > 0 and height > 0:
-                        img = img.resize((width, height), Image.Resampling.LANCZOS)
-                    elif width and width > 0:
-                        ratio = width / img.width
-                        height = int(img.height * ratio)
-                        img = img.resize((width, height), Image.Resampling.LANCZOS)
-                    elif height and height > 0:
-                        ratio = height / img.height
-                        width = int(img.width * ratio)
-                        img = img.resize((width, height), Image.Resampling.LANCZOS)
-                
-                # 添加水印（如果需要）
-                if convert_request.watermark:
-                    img = self._add_watermark(img)
-                
-                # 生成输出文件路径
                 original_filename = os.path.basename(file_path)
                 name, _ = os.path.splitext(original_filename)
-                output_filename = f"{name}_converted.{target_format.lower()}"
-                output_path = os.path.join(settings.upload_dir, "converted", output_filename)
-                
-                # 确保输出目录存在
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                source_size = img.size
                 
-                # 保存转换后的图片
-                save_kwargs = {}
-                if target_format.upper() in ['JPEG', 'JPG']:
-                    save_kwargs['quality'] = convert_request.quality
-                    save_kwargs['optimize'] = True
-                elif target_format.upper() == 'WEBP':
-                    save_kwargs['quality'] = convert_request.quality
-                    save_kwargs['optimize'] = True
-                
-                img.save(output_path, format=target_format.upper(), **save_kwargs)
+                if self.is_animated(img) and (target_format.upper() in ANIMATED_TARGET_FORMATS
+                                              or target_format.upper() == AUTO_TARGET_FORMAT):
+                    if target_format.upper() == AUTO_TARGET_FORMAT:
+                        target_format = "WEBP" if registry.is_available("WEBP") else "GIF"
+                    
+                    # 动图逐帧流式转换，保留帧时长和循环次数
+                    output_path = self._get_output_path(name, target_format)
+                    # 动图的解码与编码逐帧交错，只统计缩放/水印和总耗时
+                    self._save_animated(img, output_path, target_format.upper(), convert_request, timer)
+                else:
+                    with timer.stage("decode"):
+                        img.load()
+                    # 方向/色彩归一化在同一次解码内完成
+                    img, metadata = self._normalize_image(img, convert_request)
+                    
+                    # 透明通道按源图判断（合成背景之后就看不出来了）；
+                    # 目标格式支持透明时保留，"auto"只在支持透明的候选格式中选择
+                    has_alpha = self._has_alpha(img)
+                    keep_alpha = has_alpha and (target_format.upper() == AUTO_TARGET_FORMAT
+                                                or bool((registry.get_spec(target_format) or {}).get("alpha")))
+                    img = self._process_frame(img, convert_request, flatten_alpha=not keep_alpha, timer=timer)
+                    
+                    if target_format.upper() == AUTO_TARGET_FORMAT:
+                        # 逐个候选格式编码，保留体积最小的结果
+                        with timer.stage("encode"):
+                            target_format, encoded = self._encode_smallest(img, convert_request, metadata, has_alpha)
+                        output_path = self._get_output_path(name, registry.get_spec(target_format)["extension"])
+                        with open(output_path, "wb") as f:
+                            f.write(encoded)
+                    else:
+                        if registry.get_spec(target_format) and not registry.ensure_loaded(target_format):
+                            raise ValueError(f"当前环境不支持输出{target_format.upper()}格式")
+                        
+                        # 保存转换后的图片
+                        output_path = self._get_output_path(name, target_format)
+                        save_format = registry.normalize_format(target_format)
+                        with timer.stage("encode"):
+                            img.save(output_path, format=save_format,
+                                     **self._get_save_kwargs(save_format, convert_request, metadata))
                 
                 # 计算转换时间
                 conversion_time = time.time() - start_time
@@ -81,6 +159,12 @@ class ImageService:
                 # 获取文件大小
                 file_size = os.path.getsize(output_path)
                 
+                timer.stages["total"] = conversion_time
+                metrics.observe_conversion(source_label, target_format.upper(), source_size, timer.stages)
+                source_bytes = os.path.getsize(file_path)
+                metrics.record_bytes("in", source_label, source_bytes)
+                metrics.record_bytes("out", target_format.upper(), file_size)
+                
                 # 记录转换记录
                 self._record_conversion(
                     user_id=user_id,
@@ -89,7 +173,8 @@ class ImageService:
                     target_format=target_format.upper(),
                     file_size=file_size,
                     conversion_time=conversion_time,
-                    status="success"
+                    status="success",
+                    source_size=source_bytes
                 )
                 
                 return True, output_path, None
@@ -97,6 +182,7 @@ class ImageService:
         except Exception as e:
             conversion_time = time.time() - start_time
             error_message = str(e)
+            metrics.record_failure(source_label, target_format.upper())
             
             # 记录失败的转换
             self._record_conversion(
@@ -111,6 +197,238 @@ class ImageService:
             )
             
             return False, "", error_message
+        
+        finally:
+            metrics.in_progress.dec()
+    
+    def _get_output_path(self, name: str, extension: str) -> str:
+        """生成输出文件路径并确保输出目录存在"""
+        output_filename = f"{name}_converted.{extension.lower()}"
+        output_path = os.path.join(settings.upload_dir, "converted", output_filename)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        return output_path
+    
+    def _get_save_kwargs(self, save_format: str, convert_request: ImageConvertRequest, metadata: dict) -> dict:
+        """各格式的编码参数"""
+        save_kwargs = {}
+        if save_format in ['JPEG', 'WEBP']:
+            save_kwargs['quality'] = convert_request.quality
+            save_kwargs['optimize'] = True
+        elif save_format in ['AVIF', 'HEIF']:
+            save_kwargs['quality'] = convert_request.quality
+        if save_format in METADATA_TARGET_FORMATS:
+            save_kwargs.update(metadata)
+        return save_kwargs
+    
+    def _encode_smallest(self, 
+                         img: Image.Image, 
+                         convert_request: ImageConvertRequest,
+                         metadata: dict,
+                         has_alpha: bool) -> Tuple[str, bytes]:
+        """
+        "auto"目标格式：用每个候选格式编码一次，返回体积最小的格式和编码结果
+        has_alpha为源图是否带透明通道，带透明时只尝试支持alpha的格式
+        """
+        registry = get_codec_registry()
+        best_format, best_data = None, None
+        for candidate in registry.auto_candidates(has_alpha=has_alpha):
+            if not registry.ensure_loaded(candidate):
+                continue
+            buffer = io.BytesIO()
+            img.save(buffer, format=candidate, **self._get_save_kwargs(candidate, convert_request, metadata))
+            if best_data is None or buffer.tell() < len(best_data):
+                best_format, best_data = candidate, buffer.getvalue()
+        
+        if best_format is None:
+            raise ValueError("没有可用的输出格式")
+        return best_format, best_data
+    
+    def _has_alpha(self, img: Image.Image) -> bool:
+        """图片是否带透明信息（alpha通道，或调色板/RGB图的透明色）"""
+        return 'A' in img.getbands() or 'transparency' in img.info
+    
+    def is_animated(self, img: Image.Image) -> bool:
+        """判断是否为多帧动图"""
+        return getattr(img, "is_animated", False) and getattr(img, "n_frames", 1) > 1
+    
+    def _normalize_image(self, 
+                         img: Image.Image, 
+                         convert_request: ImageConvertRequest) -> Tuple[Image.Image, dict]:
+        """
+        归一化：按EXIF方向旋转、ICC转换到sRGB、整理需要写回的元数据
+        返回: (归一化后的图片, 保存时使用的元数据参数)
+        """
+        exif = img.getexif()
+        
+        # 只有方向标签要求旋转时才转置，避免无谓的整图复制
+        orientation = exif.get(EXIF_ORIENTATION_TAG)
+        if orientation and orientation != 1:
+            img = ImageOps.exif_transpose(img)
+            exif = img.getexif()
+        
+        color_profile_service = get_color_profile_service()
+        img, converted = color_profile_service.to_srgb(img)
+        icc_profile = img.info.pop("icc_profile", None)
+        if converted:
+            icc_profile = color_profile_service.get_srgb_profile_bytes()
+        
+        if convert_request.strip_metadata:
+            return img, {}
+        
+        metadata = {}
+        if len(exif):
+            metadata["exif"] = exif.tobytes()
+        if icc_profile:
+            metadata["icc_profile"] = icc_profile
+        return img, metadata
+    
+    def _get_resize_size(self, size: Tuple[int, int], resize: Optional[dict]) -> Optional[Tuple[int, int]]:
+        """根据调整参数计算目标尺寸，无需调整时返回None"""
+        if not resize:
+            return None
+        
+        width = resize.get('width')
+        height = resize.get('height')
+        if width and height and width > 0 and height > 0:
+            return width, height
+        elif width and width > 0:
+            ratio = width / size[0]
+            return width, int(size[1] * ratio)
+        elif height and height > 0:
+            ratio = height / size[1]
+            return int(size[0] * ratio), height
+        return None
+    
+    def _process_frame(self, 
+                       img: Image.Image, 
+                       convert_request: ImageConvertRequest,
+                       flatten_alpha: bool,
+                       timer: Optional[StageTimer] = None) -> Image.Image:
+        """
+        处理单帧：模式转换、调整大小、水印
+        flatten_alpha为True时合成到白色背景并输出RGB，否则保留透明通道输出RGBA
+        """
+        ops = get_image_ops_backend()
+        timer = timer or StageTimer()
+        
+        if flatten_alpha:
+            # 转换为RGB模式（合成到白色背景）
+            img = ops.flatten_alpha(img)
+        elif img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        
+        # 调整大小（如果指定）
+        target_size = self._get_resize_size(img.size, convert_request.resize)
+        if target_size:
+            with timer.stage("resize"):
+                img = img.resize(target_size, Image.Resampling.LANCZOS)
+        
+        # 滤镜（在缩放后执行，处理的像素更少）
+        img = self._apply_filters(img, convert_request, ops)
+        
+        # 添加水印（如果需要）
+        if convert_request.watermark:
+            with timer.stage("watermark"):
+                img = self._add_watermark(img)
+        
+        return img
+    
+    def _apply_filters(self, img: Image.Image, convert_request: ImageConvertRequest, ops) -> Image.Image:
+        """亮度/对比度、灰度、锐化"""
+        brightness = convert_request.brightness or 1.0
+        contrast = convert_request.contrast or 1.0
+        if brightness == 1.0 and contrast == 1.0 and not convert_request.grayscale and not convert_request.sharpen:
+            return img
+        
+        if img.mode == 'RGBA':
+            # 透明通道不参与滤镜
+            alpha = img.getchannel('A')
+            rgb = self._apply_filters(img.convert('RGB'), convert_request, ops)
+            rgb = rgb.convert('RGB') if rgb.mode != 'RGB' else rgb
+            rgb.putalpha(alpha)
+            return rgb
+        
+        if brightness != 1.0 or contrast != 1.0:
+            img = ops.adjust_brightness_contrast(img, brightness, contrast)
+        if convert_request.grayscale:
+            img = ops.grayscale(img)
+        if convert_request.sharpen:
+            img = ops.sharpen(img)
+        return img
+    
+    def _save_animated(self, 
+                       img: Image.Image, 
+                       output_path: str, 
+                       target_format: str,
+                       convert_request: ImageConvertRequest,
+                       timer: Optional[StageTimer] = None):
+        """逐帧流式保存动图（GIF/WEBP）"""
+        loop = img.info.get("loop", 0)
+        
+        if target_format == "WEBP":
+            stream = AnimatedFrameStream(
+                img, lambda frame: self._process_frame(frame, convert_request, flatten_alpha=False, timer=timer)
+            )
+            stream.save(
+                output_path,
+                format="WEBP",
+                save_all=True,
+                duration=stream.durations,
+                loop=loop,
+                quality=convert_request.quality
+            )
+        else:
+            self._save_animated_gif(img, output_path, convert_request, loop, timer)
+    
+    def _save_animated_gif(self, 
+                           img: Image.Image, 
+                           output_path: str,
+                           convert_request: ImageConvertRequest,
+                           loop: int,
+                           timer: Optional[StageTimer] = None):
+        """
+        逐帧写出GIF
+        Pillow的save_all会缓存全部帧用于差分优化，这里改为每帧独立调色板直接写入文件
+        """
+        with open(output_path, "wb") as fp:
+            for index, (frame, duration) in enumerate(self._iter_gif_frames(img, convert_request, timer)):
+                params = {
+                    "duration": duration,
+                    "disposal": 2,
+                    "loop": loop,
+                    "include_color_table": True
+                }
+                if "transparency" in frame.info:
+                    params["transparency"] = frame.info["transparency"]
+                
+                if index == 0:
+                    header, _ = GifImagePlugin.getheader(frame, info=dict(params))
+                    for chunk in header:
+                        fp.write(chunk)
+                
+                for chunk in GifImagePlugin.getdata(frame, **params):
+                    fp.write(chunk)
+            
+            # GIF文件结束符
+            fp.write(b";")
+    
+    def _iter_gif_frames(self, 
+                         img: Image.Image,
+                         convert_request: ImageConvertRequest,
+                         timer: Optional[StageTimer] = None) -> Iterator[Tuple[Image.Image, int]]:
+        """惰性迭代源动图，逐帧处理并量化为调色板模式"""
+        for frame in ImageSequence.Iterator(img):
+            duration = frame.info.get("duration") or DEFAULT_FRAME_DURATION
+            processed = self._process_frame(frame, convert_request, flatten_alpha=False, timer=timer)
+            
+            alpha = processed.getchannel("A")
+            paletted = processed.convert("RGB").quantize(colors=255)
+            if alpha.getextrema()[0] < 128:
+                # 预留255号索引作为透明色
+                paletted.paste(255, mask=alpha.point(lambda a: 255 if a < 128 else 0))
+                paletted.info["transparency"] = 255
+            
+            yield paletted, duration
     
     def _add_watermark(self, img: Image.Image) -> Image.Image:
         """添加水印"""
@@ -145,8 +463,11 @@ class ImageService:
             # 绘制半透明文本
             draw.text((x, y), watermark_text, font=font, fill=(255, 255, 255, 128))
             
-            # 合并水印
+            # 合并水印，不带透明通道的图片合并后仍输出原模式
+            mode = img.mode
             img = Image.alpha_composite(img.convert('RGBA'), watermark)
+            if mode != 'RGBA':
+                img = img.convert(mode)
             
         except Exception:
             # 如果水印添加失败，返回原图
@@ -162,8 +483,9 @@ class ImageService:
                           file_size: int,
                           conversion_time: float,
                           status: str,
-                          error_message: Optional[str] = None):
-        """记录转换记录"""
+                          error_message: Optional[str] = None,
+                          source_size: int = 0):
+        """记录转换记录，并在同一事务内累加当天的转换统计"""
         # 如果user_id为None，跳过记录（公开接口不需要记录到数据库）
         if user_id is None:
             return
@@ -179,19 +501,21 @@ class ImageService:
             error_message=error_message
         )
         
-        self.db.add(conversion_record)
-        self.db.commit()
+        with span("db.record_conversion"):
+            self.db.add(conversion_record)
+            ConversionStatsService(self.db).record(
+                user_id=user_id,
+                target_format=target_format,
+                conversion_time=conversion_time,
+                success=status == "success",
+                bytes_in=source_size,
+                bytes_out=file_size
+            )
+            self.db.commit()
     
     def get_supported_formats(self) -> list:
-        """获取支持的图片格式"""
-        return [
-            {"format": "JPEG", "description": "JPEG图片格式", "extension": "jpg"},
-            {"format": "PNG", "description": "PNG图片格式", "extension": "png"},
-            {"format": "WEBP", "description": "WebP图片格式", "extension": "webp"},
-            {"format": "BMP", "description": "BMP图片格式", "extension": "bmp"},
-            {"format": "TIFF", "description": "TIFF图片格式", "extension": "tiff"},
-            {"format": "GIF", "description": "GIF图片格式", "extension": "gif"}
-        ]
+        """获取支持的图片格式及其能力（透明通道、动画、无损）"""
+        return get_codec_registry().list_formats()
     
     def validate_image_file(self, file_path: str) -> bool:
         """验证图片文件"""
@@ -203,16 +527,8 @@ class ImageService:
             return False
     
     def get_image_info(self, file_path: str) -> dict:
-        """获取图片信息"""
+        """获取图片信息（只解析文件头）"""
         try:
-            with Image.open(file_path) as img:
-                return {
-                    "format": img.format,
-                    "mode": img.mode,
-                    "size": img.size,
-                    "width": img.width,
-                    "height": img.height,
-                    "file_size": os.path.getsize(file_path)
-                }
+            return ImageProbeService().probe_path(file_path)
         except Exception as e:
             return {"error": str(e)}
@@ -0,0 +1,271 @@
+"""
+本地IP地理位置服务
+从本地IP段表判断用户所在国家，用于智能登录推荐，登录路径上不再访问外部定位API。
+支持两种数据文件：
+    CSV   每行 起始IP,结束IP,国家代码[,国家,省份,城市]，IP可以是点分/冒号格式或整数
+          （IP2Location LITE DB1/DB3 的CSV可以直接使用，APNIC分配表可用 tools/scripts/build_ip_geo_db.py 转换）
+    MMDB  MaxMind/DB-IP格式，需安装maxminddb，以内存映射方式打开，多个worker共享页缓存
+CSV按起始地址排序后存入紧凑数组，二分查找；数据文件修改后自动重新加载，查询结果按IP缓存。
+数据在应用启动时预加载；之后的重新加载在后台线程中完成，加载好再替换，查询不会等待解析文件。
+"""
+import bisect
+import csv
+import ipaddress
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+
+def unknown_location() -> dict:
+    """无法判断位置时的默认结果（推荐Auth0登录）"""
+    return {
+        "country": "未知",
+        "country_code": "XX",
+        "region": "未知",
+        "city": "未知",
+        "is_china": False,
+        "login_method": "auth0"
+    }
+
+
+def make_location(country_code: str, country: str = "", region: str = "", city: str = "") -> dict:
+    country_code = (country_code or "XX").upper()
+    is_china = country_code == "CN"
+    return {
+        "country": country or country_code,
+        "country_code": country_code,
+        "region": region or "未知",
+        "city": city or "未知",
+        "is_china": is_china,
+        "login_method": "wechat" if is_china else "auth0"
+    }
+
+
+class RangeTable:
+    """按起始地址排序的IP段表"""
+
+    def __init__(self, typecode: Optional[str]):
+        # IPv4用4字节无符号数组，IPv6超出机器整数范围用list
+        self.starts = array(typecode) if typecode else []
+        self.ends = array(typecode) if typecode else []
+        self.locations = array("I")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, ip: int) -> Optional[int]:
+        index = bisect.bisect_right(self.starts, ip) - 1
+        if index >= 0 and ip <= self.ends[index]:
+            return self.locations[index]
+        return None
+
+
+class CsvDatabase:
+    """CSV格式的IP段数据"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # 地区信息去重后保存一份，段表里只存下标
+        self.location_table: List[dict] = []
+        self.tables: Dict[int, RangeTable] = {}
+        self._load()
+
+    def _load(self):
+        location_index: Dict[Tuple[str, ...], int] = {}
+        rows: Dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0].startswith("#"):
+                    continue
+                try:
+                    version, start = _parse_ip(row[0])
+                    _, end = _parse_ip(row[1])
+                except ValueError:
+                    # 表头或无效行
+                    continue
+                key = tuple(value.strip() for value in row[2:6])
+                if key[0] in ("", "-"):
+                    continue
+                index = location_index.get(key)
+                if index is None:
+                    index = location_index[key] = len(self.location_table)
+                    self.location_table.append(make_location(*key))
+                rows[version].append((start, end, index))
+
+        for version, typecode in ((4, "I"), (6, None)):
+            table = RangeTable(typecode)
+            for start, end, index in sorted(rows[version]):
+                table.starts.append(start)
+                table.ends.append(end)
+                table.locations.append(index)
+            self.tables[version] = table
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def lookup(self, address: ipaddress._BaseAddress) -> Optional[dict]:
+        index = self.tables[address.version].find(int(address))
+        return self.location_table[index] if index is not None else None
+
+
+class MmdbDatabase:
+    """MMDB格式的数据（内存映射）"""
+
+    def __init__(self, path: str):
+        if maxminddb is None:
+            raise RuntimeError("读取MMDB需要安装maxminddb")
+        self.path = path
+        self._reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+
+    def __len__(self):
+        return self._reader.metadata().node_count
+
+    def lookup(self, address: ipaddress._BaseAddress) -> Optional[dict]:
+        record = self._reader.get(address)
+        if not record:
+            return None
+        country = record.get("country") or record.get("registered_country") or {}
+        if not country.get("iso_code"):
+            return None
+        subdivisions = record.get("subdivisions") or [{}]
+        return make_location(
+            country["iso_code"],
+            _localized_name(country),
+            _localized_name(subdivisions[0]),
+            _localized_name(record.get("city") or {}),
+        )
+
+
+class IpGeoService:
+    """IP地理位置查询服务"""
+
+    def __init__(self, path: Optional[str] = None, cache_size: Optional[int] = None):
+        self.path = path or settings.ip_geo_db_path
+        self.cache_size = settings.ip_geo_cache_size if cache_size is None else cache_size
+        self._database = None
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._cache: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+
+    @property
+    def available(self) -> bool:
+        """是否已加载数据（不触发加载）"""
+        return self._database is not None
+
+    def load(self) -> bool:
+        """加载（或重新加载）数据文件，成功返回True；失败时保留已加载的数据"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is not None or self._database is None:
+                logger.warning(f"IP地理位置数据文件不存在: {self.path}")
+            self._mtime = None
+            return False
+
+        start = time.perf_counter()
+        try:
+            if self.path.endswith(".mmdb"):
+                database = MmdbDatabase(self.path)
+            else:
+                database = CsvDatabase(self.path)
+        except Exception as e:
+            logger.error(f"加载IP地理位置数据失败 {self.path}: {e}")
+            self._mtime = mtime
+            return False
+
+        # 旧数据不主动关闭，可能仍有查询在使用，由垃圾回收释放
+        with self._lock:
+            self._database = database
+            self._mtime = mtime
+            self._cache.clear()
+        logger.info(f"IP地理位置数据已加载: {self.path}，{len(database)} 条，"
+                    f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+        return True
+
+    def lookup(self, ip: str) -> Optional[dict]:
+        """
+        查询IP所在位置，返回结果字典
+        私有/保留地址、无效IP、数据中没有的IP以及数据文件缺失时返回None
+        """
+        self._maybe_reload()
+
+        with self._lock:
+            if ip in self._cache:
+                self._cache.move_to_end(ip)
+                result = self._cache[ip]
+                return dict(result) if result else None
+            database = self._database
+
+        result = None
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except ValueError:
+            address = None
+        if address is not None and address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if address is not None and address.is_global and database is not None:
+            result = database.lookup(address)
+
+        if database is not None and self.cache_size > 0:
+            with self._lock:
+                self._cache[ip] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return dict(result) if result else None
+
+    def _maybe_reload(self):
+        """按间隔检查数据文件的修改时间，变化时在后台线程重新加载，期间继续使用旧数据"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.ip_geo_reload_check_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return
+            self._reload_thread = threading.Thread(target=self.load, name="ip-geo-reload", daemon=True)
+            self._reload_thread.start()
+
+
+def _parse_ip(value: str) -> Tuple[int, int]:
+    """解析IP（点分/冒号格式或整数），返回 (版本, 整数值)"""
+    value = value.strip().strip('"')
+    if value.isdigit():
+        number = int(value)
+        return (4 if number <= 0xFFFFFFFF else 6), number
+    address = ipaddress.ip_address(value)
+    return address.version, int(address)
+
+
+def _localized_name(record: dict) -> str:
+    names = record.get("names") or {}
+    return names.get("zh-CN") or names.get("en") or ""
+
+
+# 创建全局IP地理位置服务实例（数据在进程内共享）
+ip_geo_service = IpGeoService()
+
+def get_ip_geo_service() -> IpGeoService:
+    """获取IP地理位置服务实例"""
+    return ip_geo_service
@@ -0,0 +1,179 @@
+"""
+第三方登录状态服务
+扫码/授权登录的state保存在Redis中（带TTL），回调完成时写入结果并通过pub/sub通知；
+状态查询接口可以长轮询等待结果，代替前端每隔几秒查询一次。
+每个进程只建立一个模式订阅连接，收到通知后唤醒本进程内等待同一state的请求。
+登录成功后的访问令牌单独保存，状态查询接口用 GETDEL 领取，只返回一次；之后只能查到状态。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+from config import settings
+from redis_client import RECONNECT_COOLDOWN_SECONDS, get_redis
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "login_state:{}:{}"
+TOKEN_KEY = "login_token:{}:{}"
+CHANNEL_PREFIX = "login_state_events:"
+
+PENDING = "pending"
+SUCCESS = "success"
+FAILED = "failed"
+EXPIRED = "expired"
+
+PENDING_MESSAGES = {
+    "wechat": "等待扫码",
+    "auth0": "等待授权",
+}
+
+
+class LoginStateService:
+    """登录状态存储与通知"""
+
+    def __init__(self, redis=None, pubsub: bool = True):
+        self.redis = redis or get_redis()
+        self.pubsub = pubsub
+        # 频道 -> 本进程内等待该state的请求
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def create(self, provider: str, state: str) -> bool:
+        """登记新的登录state，状态为pending"""
+        return self._save(provider, state, {
+            "status": PENDING,
+            "message": PENDING_MESSAGES.get(provider, "等待登录"),
+            "created_at": time.time(),
+        }, nx=True)
+
+    def get(self, provider: str, state: str) -> Dict[str, Any]:
+        """获取登录状态，state不存在或已过期时返回expired"""
+        info = self.redis.get(STATE_KEY.format(provider, state))
+        if not isinstance(info, dict):
+            return {"status": EXPIRED, "message": "登录已过期，请刷新二维码"}
+        return info
+
+    def set(self, provider: str, state: str, status: str, user_id: int = None,
+            message: str = "", access_token: str = None) -> bool:
+        """
+        写入登录结果并通知等待中的请求
+        只更新已登记且未过期的state，未知或已过期的state返回False
+        """
+        info = {"status": status, "message": message, "updated_at": time.time()}
+        if user_id is not None:
+            info["user_id"] = user_id
+        token_key = TOKEN_KEY.format(provider, state)
+        # 令牌先于状态写入，等待者被唤醒时一定能领取到
+        if access_token and not self.redis.set(token_key, access_token, ex=settings.login_state_ttl_seconds):
+            return False
+        if not self._save(provider, state, info, xx=True):
+            if access_token:
+                self.redis.delete(token_key)
+            return False
+
+        channel = self._channel(provider, state)
+        self._notify(channel)
+        self.redis.publish(channel, status)
+        return True
+
+    def claim_token(self, provider: str, state: str) -> Optional[str]:
+        """领取登录成功后的访问令牌，每个state只能领取一次"""
+        return self.redis.getdel(TOKEN_KEY.format(provider, state))
+
+    async def wait(self, provider: str, state: str, timeout: float) -> Dict[str, Any]:
+        """
+        等待状态离开pending，最多timeout秒，返回最新状态
+        收到通知后立即返回；订阅连接断开或通知丢失时，按 login_state_recheck_seconds 兜底查询
+        """
+        info = self.get(provider, state)
+        if info["status"] != PENDING or timeout <= 0:
+            return info
+
+        channel = self._channel(provider, state)
+        event = asyncio.Event()
+        self._waiters.setdefault(channel, set()).add(event)
+        self._ensure_listener()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return info
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, settings.login_state_recheck_seconds))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                info = self.get(provider, state)
+                if info["status"] != PENDING:
+                    return info
+        finally:
+            waiters = self._waiters.get(channel)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[channel]
+
+    async def close(self):
+        """停止订阅任务（应用关闭时调用）"""
+        if self._listener is not None and not self._listener.done():
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        self._listener = None
+
+    def _save(self, provider: str, state: str, info: dict, nx: bool = False, xx: bool = False) -> bool:
+        return self.redis.set(STATE_KEY.format(provider, state), info,
+                              ex=settings.login_state_ttl_seconds, nx=nx, xx=xx)
+
+    @staticmethod
+    def _channel(provider: str, state: str) -> str:
+        return f"{CHANNEL_PREFIX}{provider}:{state}"
+
+    def _notify(self, channel: str):
+        for event in self._waiters.get(channel, ()):
+            event.set()
+
+    def _ensure_listener(self):
+        """在当前事件循环中启动订阅任务（已在运行则跳过）"""
+        if not self.pubsub:
+            return
+        loop = asyncio.get_running_loop()
+        if self._listener is not None and not self._listener.done() and self._listener.get_loop() is loop:
+            return
+        self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        """订阅所有登录状态频道，把通知分发给本进程内的等待者"""
+        import redis.asyncio as aioredis
+
+        while True:
+            client = aioredis.from_url(settings.redis_url, decode_responses=True, socket_connect_timeout=2)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._notify(message["channel"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"登录状态订阅断开，{RECONNECT_COOLDOWN_SECONDS}秒后重连: {e}")
+                await asyncio.sleep(RECONNECT_COOLDOWN_SECONDS)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+# 创建全局登录状态服务实例（订阅连接在进程内共享）
+login_state_service = LoginStateService()
+
+def get_login_state_service() -> LoginStateService:
+    """获取登录状态服务实例"""
+    return login_state_service
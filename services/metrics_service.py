@@ -0,0 +1,171 @@
+"""
+Prometheus指标服务
+转换热路径各阶段耗时、字节数、缓存命中、配额拒绝、失败次数和进行中的转换数
+未安装prometheus_client时所有指标为空操作，/metrics返回503
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from services.codec_service import get_codec_registry
+from services.tracing_service import span
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    logger.warning("prometheus_client未安装，指标采集已禁用")
+
+# 阶段耗时直方图的桶（秒），覆盖图标到5000万像素大图
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 图片尺寸分档（百万像素上限, 标签）
+SIZE_BUCKETS = (
+    (0.25, "lt_0.25mp"),
+    (1.0, "0.25_1mp"),
+    (4.0, "1_4mp"),
+    (16.0, "4_16mp"),
+)
+LARGEST_SIZE_BUCKET = "gt_16mp"
+
+# 不在编解码器注册表中的格式（来自客户端的扩展名或表单字段）统一归为该标签
+OTHER_FORMAT = "other"
+
+
+def size_bucket(size: Optional[Tuple[int, int]]) -> str:
+    """按像素数把图片尺寸归入有限的几个分档，避免标签基数过高"""
+    if not size:
+        return "unknown"
+    megapixels = size[0] * size[1] / 1_000_000
+    for limit, label in SIZE_BUCKETS:
+        if megapixels < limit:
+            return label
+    return LARGEST_SIZE_BUCKET
+
+
+def format_label(fmt: Optional[str]) -> str:
+    """格式标签只取注册表中的已知格式，避免客户端输入产生无限多的时间序列"""
+    spec = get_codec_registry().get_spec(fmt)
+    return spec["format"] if spec else OTHER_FORMAT
+
+
+class _NoopMetric:
+    """prometheus_client不可用时的空指标"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+class MetricsService:
+    """指标服务"""
+
+    def __init__(self, registry=None):
+        if not PROMETHEUS_AVAILABLE:
+            noop = _NoopMetric()
+            self.registry = None
+            self.stage_seconds = self.bytes_total = self.cache_requests = noop
+            self.quota_rejections = self.failures = self.in_progress = noop
+            return
+
+        self.registry = registry or CollectorRegistry()
+        self.stage_seconds = Histogram(
+            "image_conversion_stage_seconds", "图片转换各阶段耗时",
+            ["stage", "source_format", "target_format", "size_bucket"],
+            buckets=STAGE_BUCKETS, registry=self.registry,
+        )
+        self.bytes_total = Counter(
+            "image_conversion_bytes_total", "图片转换输入/输出字节数",
+            ["direction", "format"], registry=self.registry,
+        )
+        self.cache_requests = Counter(
+            "cache_requests_total", "缓存查询次数",
+            ["cache", "result"], registry=self.registry,
+        )
+        self.quota_rejections = Counter(
+            "quota_rejections_total", "因每日配额用完被拒绝的请求数",
+            ["role"], registry=self.registry,
+        )
+        self.failures = Counter(
+            "image_conversion_failures_total", "图片转换失败次数",
+            ["source_format", "target_format"], registry=self.registry,
+        )
+        self.in_progress = Gauge(
+            "image_conversions_in_progress", "正在执行（含等待CPU）的转换数",
+            registry=self.registry,
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.registry is not None
+
+    def observe_conversion(self, source_format: str, target_format: str,
+                           size: Optional[Tuple[int, int]], stages: Dict[str, float]):
+        """记录一次转换的各阶段耗时（秒）"""
+        bucket = size_bucket(size)
+        source_format, target_format = format_label(source_format), format_label(target_format)
+        for stage, seconds in stages.items():
+            self.stage_seconds.labels(stage, source_format, target_format, bucket).observe(seconds)
+
+    def record_bytes(self, direction: str, fmt: str, size: int):
+        self.bytes_total.labels(direction, format_label(fmt)).inc(size)
+
+    def record_cache(self, cache: str, hit: bool):
+        self.cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+    def record_quota_rejection(self, role: str):
+        self.quota_rejections.labels(role).inc()
+
+    def record_failure(self, source_format: str, target_format: str):
+        self.failures.labels(format_label(source_format), format_label(target_format)).inc()
+
+    def render(self) -> bytes:
+        """Prometheus文本格式"""
+        if not self.available:
+            return b""
+        return generate_latest(self.registry)
+
+
+class StageTimer:
+    """
+    累计单次转换中各阶段的耗时，动图逐帧处理时同一阶段会累加
+    每个阶段同时记录为请求追踪中的 image.<阶段> span
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with span(f"image.{name}"):
+                yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+# 创建全局指标服务实例
+metrics_service = MetricsService()
+
+def get_metrics_service() -> MetricsService:
+    """获取指标服务实例"""
+    return metrics_service
@@ -0,0 +1,162 @@
+"""
+支付回调处理服务
+支付网关会重复推送回调（超时、未按格式应答都会重试），处理流程：
+    1. 按 订单号+交易号 在Redis中登记，已处理完的重复通知直接应答成功，正在处理的让网关稍后重试
+    2. 支付状态流转和会员等级升级在一个事务里用条件UPDATE完成（只有待支付的订单会被更新），
+       Redis不可用时重复通知也只会匹配0行
+    3. 立即应答网关，吊销旧令牌等副作用放到后台任务中执行
+"""
+import logging
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import PaymentRecord, PaymentStatus, User
+from redis_client import get_redis
+from services.metrics_service import get_metrics_service
+from services.session_service import get_session_service
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_KEY = "payment_callback:{}:{}"
+
+# 登记状态
+PROCESSING = "processing"
+DONE = "done"
+
+# 处理结果
+APPLIED = "applied"
+DUPLICATE = "duplicate"
+IN_PROGRESS = "in_progress"
+
+# 可以流转为支付成功的状态（失败后用户重新支付，网关仍可能推送成功通知）
+PAYABLE_STATUSES = (PaymentStatus.PENDING, PaymentStatus.FAILED)
+
+
+class PaymentCallbackService:
+    """支付回调的去重与状态流转"""
+
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+
+    def handle_success(self, db: Session, order_id: str, transaction_id: str) -> str:
+        """
+        处理支付成功通知
+        返回 applied（本次完成了状态流转）、duplicate（已处理过）或 in_progress（另一个通知正在处理）
+        """
+        state = self._claim(order_id, transaction_id)
+        get_metrics_service().record_cache("payment_callback", state is not None)
+        if state == DONE:
+            return DUPLICATE
+        if state == PROCESSING:
+            return IN_PROGRESS
+
+        try:
+            applied = self.apply_success(db, order_id, transaction_id)
+        except Exception:
+            db.rollback()
+            # 释放登记，网关重试时可以重新处理
+            self.redis.delete(self._key(order_id, transaction_id))
+            raise
+
+        self.redis.set(self._key(order_id, transaction_id), DONE,
+                       ex=settings.payment_callback_dedupe_ttl_seconds)
+        return APPLIED if applied else DUPLICATE
+
+    def apply_success(self, db: Session, order_id: str, transaction_id: str) -> bool:
+        """
+        条件UPDATE：订单为待支付时改为成功并升级用户等级，一个事务提交
+        返回是否发生了状态流转（订单不存在或已成功时返回False）
+        """
+        payment_filter = (
+            PaymentRecord.order_id == order_id,
+            PaymentRecord.status.in_(PAYABLE_STATUSES),
+        )
+        if db.get_bind().dialect.name == "mysql":
+            # MySQL支持多表UPDATE，订单和用户在同一条语句中更新
+            result = db.execute(
+                update(PaymentRecord)
+                .where(PaymentRecord.user_id == User.id, *payment_filter)
+                .values({
+                    PaymentRecord.status: PaymentStatus.SUCCESS,
+                    PaymentRecord.transaction_id: transaction_id,
+                    User.role: PaymentRecord.target_role,
+                })
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            result = db.execute(
+                update(PaymentRecord)
+                .where(*payment_filter)
+                .values(status=PaymentStatus.SUCCESS, transaction_id=transaction_id)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                payment = select(PaymentRecord).where(PaymentRecord.order_id == order_id).subquery()
+                db.execute(
+                    update(User)
+                    .where(User.id == select(payment.c.user_id).scalar_subquery())
+                    .values(role=select(payment.c.target_role).scalar_subquery())
+                    .execution_options(synchronize_session=False)
+                )
+        db.commit()
+        return result.rowcount > 0
+
+    def apply_failure(self, db: Session, order_id: str, status: PaymentStatus = PaymentStatus.FAILED) -> bool:
+        """
+        条件UPDATE：只把待支付的订单标记为失败（或对账时关闭为cancelled），
+        已成功的订单不受迟到的失败通知影响
+        """
+        result = db.execute(
+            update(PaymentRecord)
+            .where(PaymentRecord.order_id == order_id, PaymentRecord.status == PaymentStatus.PENDING)
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount > 0
+
+    def finish_success(self, order_id: str):
+        """
+        支付成功后的副作用（在后台任务中执行）：
+        旧令牌按原等级签发，吊销后用户重新登录即获得新等级
+        """
+        from tools.database.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            user = db.execute(
+                select(User.id, User.username)
+                .join(PaymentRecord, PaymentRecord.user_id == User.id)
+                .where(PaymentRecord.order_id == order_id)
+            ).first()
+        except Exception as e:
+            logger.error(f"支付回调后续处理失败 {order_id}: {e}")
+            return
+        finally:
+            db.close()
+
+        if user is not None:
+            get_session_service().revoke_user_sessions(user.username, str(user.id))
+        logger.info(f"订单支付成功: {order_id}")
+
+    def _claim(self, order_id: str, transaction_id: str):
+        """登记通知，成功登记返回None，已登记时返回已有状态"""
+        key = self._key(order_id, transaction_id)
+        if self.redis.set(key, PROCESSING, ex=settings.payment_callback_processing_ttl_seconds, nx=True):
+            return None
+        # 登记失败可能是已存在，也可能是Redis不可用（此时get也返回None，交给条件UPDATE兜底）
+        return self.redis.get(key)
+
+    @staticmethod
+    def _key(order_id: str, transaction_id: str) -> str:
+        return CALLBACK_KEY.format(order_id, transaction_id or "")
+
+
+# 创建全局支付回调服务实例
+payment_callback_service = PaymentCallbackService()
+
+def get_payment_callback_service() -> PaymentCallbackService:
+    """获取支付回调服务实例"""
+    return payment_callback_service
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from models import User, UserRole
 from services.user_service import UserService
+from services.metrics_service import get_metrics_service
+from services.tracing_service import traced
 from config import settings
 
 class PermissionService:
@@ -8,6 +10,7 @@ class PermissionService:
         self.db = db
         self.user_service = UserService(db)
     
+    @traced("permission.check_conversion")
     def check_conversion_permission(self, user_id: int) -> tuple[bool, str]:
         """
         检查用户是否有权限进行图片转换
@@ -24,6 +27,7 @@ class PermissionService:
         # 检查每日使用限制
         if not self.user_service.can_use_service(user_id):
             stats = self.user_service.get_usage_stats(user_id)
+            get_metrics_service().record_quota_rejection(stats.role.value)
             return False, f"今日使用次数已达上限({stats.daily_limit}次)，请升级会员或明天再试"
         
         return True, ""
@@ -40,8 +44,9 @@ class PermissionService:
             "can_use": stats.remaining_usage > 0
         }
     
-    def get_role_benefits(self, role: UserRole) -> dict:
-        """获取角色权益信息"""
+    @staticmethod
+    def get_role_benefits(role: UserRole) -> dict:
+        """获取角色权益信息（只取决于配置，接口通过 static_response_service 返回预计算结果）"""
         benefits = {
             UserRole.FREE: {
                 "daily_limit": settings.free_user_daily_limit,
@@ -105,31 +110,23 @@ class PermissionService:
         required_roles = feature_permissions.get(feature, [])
         return user.role in required_roles
     
-    def get_upgrade_options(self, current_role: UserRole) -> list:
+    @staticmethod
+    def get_upgrade_options(current_role: UserRole) -> list:
         """获取升级选项"""
-        upgrade_options = []
+        targets = {
+            UserRole.FREE: [UserRole.VIP, UserRole.SVIP],
+            UserRole.VIP: [UserRole.SVIP],
+        }.get(current_role, [])
+        prices = {UserRole.VIP: settings.vip_price, UserRole.SVIP: settings.svip_price}
         
-        if current_role == UserRole.FREE:
-            upgrade_options.extend([
-                {
-                    "target_role": UserRole.VIP.value,
-                    "price": settings.vip_price,
-                    "benefits": self.get_role_benefits(UserRole.VIP)["features"],
-                    "daily_limit": settings.vip_user_daily_limit
-                },
-                {
-                    "target_role": UserRole.SVIP.value,
-                    "price": settings.svip_price,
-                    "benefits": self.get_role_benefits(UserRole.SVIP)["features"],
-                    "daily_limit": settings.svip_user_daily_limit
-                }
-            ])
-        elif current_role == UserRole.VIP:
+        upgrade_options = []
+        for target_role in targets:
+            benefits = PermissionService.get_role_benefits(target_role)
             upgrade_options.append({
-                "target_role": UserRole.SVIP.value,
-                "price": settings.svip_price,
-                "benefits": self.get_role_benefits(UserRole.SVIP)["features"],
-                "daily_limit": settings.svip_user_daily_limit
+                "target_role": target_role.value,
+                "price": prices[target_role],
+                "benefits": benefits["features"],
+                "daily_limit": benefits["daily_limit"]
             })
         
         return upgrade_options
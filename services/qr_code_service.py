@@ -0,0 +1,82 @@
+"""
+二维码渲染服务
+按内容（登录URL）缓存渲染好的PNG，同一二维码的JSON内联和图片接口只渲染一次；
+渲染在线程池中执行，不阻塞事件循环。
+"""
+import base64
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import qrcode
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from services.metrics_service import get_metrics_service
+from services.tracing_service import span
+
+
+class QRCodeService:
+    """二维码渲染服务"""
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache_size = settings.qr_cache_size if cache_size is None else cache_size
+        # 内容 -> PNG字节
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_cached(self, data: str) -> Optional[bytes]:
+        """查询缓存，命中时返回PNG"""
+        with self._lock:
+            png = self._cache.get(data)
+            if png is not None:
+                self._cache.move_to_end(data)
+        get_metrics_service().record_cache("qr_code", png is not None)
+        return png
+
+    def render_png(self, data: str) -> bytes:
+        """渲染二维码PNG（同步，优先使用缓存）"""
+        png = self.get_cached(data)
+        if png is not None:
+            return png
+        return self._render(data)
+
+    async def render_png_async(self, data: str) -> bytes:
+        """异步渲染：命中缓存直接返回，否则在线程池中渲染"""
+        png = self.get_cached(data)
+        if png is not None:
+            return png
+        return await run_in_threadpool(self._render, data)
+
+    def _render(self, data: str) -> bytes:
+        """渲染并写入缓存"""
+        with span("qr.render"):
+            qr = qrcode.QRCode(version=1, box_size=10, border=5)
+            qr.add_data(data)
+            qr.make(fit=True)
+            img = qr.make_image(fill_color="black", back_color="white")
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+            png = buffer.getvalue()
+
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[data] = png
+                self._cache.move_to_end(data)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return png
+
+    @staticmethod
+    def to_data_uri(png: bytes) -> str:
+        """PNG转为可直接用于<img src>的data URI"""
+        return f"data:image/png;base64,{base64.b64encode(png).decode()}"
+
+
+# 创建全局二维码服务实例（缓存跨请求共享）
+qr_code_service = QRCodeService()
+
+def get_qr_code_service() -> QRCodeService:
+    """获取二维码服务实例"""
+    return qr_code_service
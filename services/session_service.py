@@ -0,0 +1,168 @@
+"""
+会话服务
+访问令牌携带jti，签发时登记到用户的会话集合；登出、会员等级变更时吊销令牌。
+吊销记录保存在Redis有序集合中，分值为令牌的过期时间，过期的记录会被清理，整个键也带TTL。
+每个进程在内存中维护吊销jti的布隆过滤器：未吊销的令牌（绝大多数请求）不访问Redis，
+只有命中过滤器的令牌才到Redis精确确认。其他进程的吊销最多在 token_revocation_sync_seconds 后生效。
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from typing import Optional
+
+from config import settings
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 已吊销的jti -> 令牌过期时间
+REVOKED_TOKENS_KEY = "revoked_tokens"
+# 每次吊销递增，各进程据此判断是否需要重建布隆过滤器
+REVOKED_VERSION_KEY = "revoked_tokens:version"
+# 用户的有效令牌 jti -> 令牌过期时间
+USER_SESSIONS_KEY = "user_sessions:{}"
+
+
+class BloomFilter:
+    """布隆过滤器：回答"一定不在集合中"或"可能在集合中" """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # 双重哈希：一次blake2b得到两个64位值，组合出hash_count个位置
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SessionService:
+    """会话与令牌吊销服务"""
+
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+        self._lock = threading.Lock()
+        self._filter = self._new_filter(0)
+        self._version = None
+        self._synced_at = float("-inf")
+
+    @staticmethod
+    def new_token_id() -> str:
+        return uuid.uuid4().hex
+
+    def register(self, subject: Optional[str], jti: str, expires_at: float):
+        """登记新签发的令牌，用于之后按用户吊销全部会话"""
+        if not subject:
+            return
+        key = USER_SESSIONS_KEY.format(subject)
+        self.redis.zremrangebyscore(key, "-inf", time.time())
+        self.redis.zadd(key, {jti: expires_at})
+        self._extend_ttl(key, expires_at)
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        """吊销单个令牌，令牌已过期时无需记录"""
+        now = time.time()
+        if not jti or expires_at <= now:
+            return False
+
+        with self._lock:
+            self.redis.zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+            self._extend_ttl(REVOKED_TOKENS_KEY, expires_at)
+            self.redis.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+            self.redis.incr(REVOKED_VERSION_KEY)
+            # 本进程立即生效，不等下一次同步
+            self._filter.add(jti)
+        return True
+
+    def revoke_token(self, payload: dict) -> bool:
+        """吊销已校验令牌（登出）"""
+        jti, exp = payload.get("jti"), payload.get("exp")
+        if not jti or exp is None:
+            return False
+        if payload.get("sub"):
+            self.redis.zrem(USER_SESSIONS_KEY.format(payload["sub"]), jti)
+        return self.revoke(jti, float(exp))
+
+    def revoke_user_sessions(self, *subjects: str) -> int:
+        """吊销用户的全部有效令牌（会员等级变更等），返回吊销数量"""
+        revoked = 0
+        for subject in subjects:
+            key = USER_SESSIONS_KEY.format(subject)
+            for jti, expires_at in self.redis.zrangebyscore(key, time.time(), "+inf", withscores=True):
+                revoked += self.revoke(jti, float(expires_at))
+            self.redis.delete(key)
+        if revoked:
+            logger.info(f"已吊销用户 {'/'.join(subjects)} 的 {revoked} 个令牌")
+        return revoked
+
+    def is_revoked(self, payload: dict) -> bool:
+        """
+        令牌是否已吊销
+        未命中布隆过滤器时直接返回False；命中时到Redis确认（排除误判）。
+        Redis不可用时按未吊销处理，与其他缓存的降级策略一致。
+        """
+        jti = payload.get("jti")
+        if not jti:
+            # 引入jti之前签发的令牌无法单独吊销，到期后自然失效
+            return False
+
+        self._sync()
+        if jti not in self._filter:
+            return False
+        expires_at = self.redis.zscore(REVOKED_TOKENS_KEY, jti)
+        return expires_at is not None and float(expires_at) > time.time()
+
+    def _sync(self):
+        """按间隔检查吊销版本号，变化时从Redis重建布隆过滤器"""
+        now = time.monotonic()
+        if now - self._synced_at < settings.token_revocation_sync_seconds:
+            return
+
+        with self._lock:
+            if now - self._synced_at < settings.token_revocation_sync_seconds:
+                return
+            self._synced_at = now
+            version = self.redis.get(REVOKED_VERSION_KEY)
+            if version is None or version == self._version:
+                return
+
+            members = self.redis.zrangebyscore(REVOKED_TOKENS_KEY, time.time(), "+inf")
+            bloom = self._new_filter(len(members))
+            for jti in members:
+                bloom.add(jti)
+            self._filter, self._version = bloom, version
+
+    def _new_filter(self, count: int) -> BloomFilter:
+        # 吊销数量超过配置容量时按实际数量扩容，保持误判率
+        capacity = max(settings.token_revocation_bloom_capacity, count * 2)
+        return BloomFilter(capacity, settings.token_revocation_bloom_error_rate)
+
+    def _extend_ttl(self, key: str, expires_at: float):
+        """键的TTL只延长不缩短，保证覆盖其中最晚过期的令牌"""
+        seconds = int(math.ceil(expires_at - time.time())) + 1
+        if self.redis.ttl(key) < seconds:
+            self.redis.expire(key, seconds)
+
+
+# 创建全局会话服务实例（布隆过滤器在进程内共享）
+session_service = SessionService()
+
+def get_session_service() -> SessionService:
+    """获取会话服务实例"""
+    return session_service
@@ -0,0 +1,96 @@
+"""
+预计算响应服务
+角色权益、升级选项、支持的格式等内容只取决于配置，启动时（以及配置重新加载后调用reload）
+构建一次并序列化为JSON字节，带ETag和Cache-Control返回；客户端带If-None-Match时直接返回304。
+与用户有关的内容（同一URL按角色返回不同内容）使用 private, no-cache：浏览器每次都带ETag回源确认，
+角色变化或切换账号后立即拿到新内容，未变化时仍只返回304。
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from config import settings
+from models import UserRole
+from services.codec_service import get_codec_registry
+from services.permission_service import PermissionService
+
+logger = logging.getLogger(__name__)
+
+
+class StaticResponse:
+    """预先序列化好的响应"""
+
+    def __init__(self, payload: Any, cache_control: str):
+        self.body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control}
+
+    def to_response(self, request: Optional[Request] = None) -> Response:
+        if request is not None and self._not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+        return Response(self.body, media_type="application/json", headers=self.headers)
+
+    def _not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+
+class StaticResponseService:
+    """按名称登记构建函数，统一构建和提供预计算响应"""
+
+    def __init__(self):
+        # 名称 -> (构建函数, 是否因用户而异)
+        self._builders: Dict[str, tuple] = {}
+        self._responses: Dict[str, StaticResponse] = {}
+        self._built = False
+        self._lock = threading.Lock()
+
+    def register(self, name: str, builder: Callable[[], Any], private: bool = False):
+        """登记构建函数；private表示内容与当前用户有关，浏览器每次使用前都要回源确认"""
+        self._builders[name] = (builder, private)
+        self._built = False
+
+    def reload(self):
+        """重新构建全部响应（启动时、修改价格/限额等配置后调用）"""
+        max_age = settings.static_response_max_age_seconds
+        responses = {}
+        for name, (builder, private) in self._builders.items():
+            cache_control = "private, no-cache" if private else f"public, max-age={max_age}"
+            responses[name] = StaticResponse(builder(), cache_control)
+        with self._lock:
+            self._responses = responses
+            self._built = True
+        logger.info(f"预计算响应已构建: {len(responses)} 个")
+
+    def get(self, name: str) -> StaticResponse:
+        if not self._built:
+            self.reload()
+        return self._responses[name]
+
+    def response(self, name: str, request: Optional[Request] = None) -> Response:
+        """返回预计算响应，ETag匹配时返回304"""
+        return self.get(name).to_response(request)
+
+
+def _register_defaults(service: StaticResponseService):
+    for role in UserRole:
+        service.register(f"role_benefits:{role.value}",
+                         lambda role=role: PermissionService.get_role_benefits(role), private=True)
+        service.register(f"upgrade_options:{role.value}",
+                         lambda role=role: PermissionService.get_upgrade_options(role), private=True)
+    service.register("image_formats", lambda: get_codec_registry().list_formats())
+
+
+# 创建全局预计算响应服务实例（构建结果在进程内共享）
+static_response_service = StaticResponseService()
+_register_defaults(static_response_service)
+
+def get_static_response_service() -> StaticResponseService:
+    """获取预计算响应服务实例"""
+    return static_response_service
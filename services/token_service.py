@@ -0,0 +1,240 @@
+"""
+访问令牌服务
+签发与校验JWT：已校验令牌的载荷按令牌摘要缓存在有界LRU中（遵守exp），
+HS*算法默认使用基于标准库hmac的精简校验，支持通过 kid 头轮换签名密钥。
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import settings
+
+
+class TokenError(Exception):
+    """令牌无效"""
+
+    def __init__(self, message: str = "无效的访问令牌"):
+        super().__init__(message)
+        self.message = message
+
+
+class TokenExpiredError(TokenError):
+    """令牌已过期"""
+
+    def __init__(self, message: str = "访问令牌已过期"):
+        super().__init__(message)
+
+
+class JoseBackend:
+    """python-jose实现（默认依赖）"""
+
+    name = "jose"
+
+    def __init__(self):
+        from jose import ExpiredSignatureError, JWTError, jwt
+        self._jwt = jwt
+        self._expired_error = ExpiredSignatureError
+        self._error = JWTError
+
+    def encode(self, claims: dict, key: str, algorithm: str, headers: dict) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._expired_error:
+            raise TokenExpiredError()
+        except self._error:
+            raise TokenError()
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._error:
+            raise TokenError()
+
+
+class HmacBackend:
+    """
+    只支持HS256/HS384/HS512的精简校验实现（标准库hmac+json）
+    签发仍交给python-jose；校验时固定使用配置的算法，不信任令牌头中的alg
+    """
+
+    name = "hmac"
+
+    DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self):
+        self._jose = JoseBackend()
+
+    def encode(self, claims: dict, key: str, algorithm: str, headers: dict) -> str:
+        return self._jose.encode(claims, key, algorithm, headers)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        digest = self.DIGESTS.get(algorithm)
+        if digest is None:
+            raise TokenError(f"不支持的签名算法: {algorithm}")
+        try:
+            signing_input, _, signature = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+            header = json.loads(_b64decode(header_segment))
+            expected = hmac.new(key.encode("utf-8"), signing_input.encode("ascii"), digest).digest()
+            if header.get("alg") != algorithm or not hmac.compare_digest(expected, _b64decode(signature)):
+                raise TokenError()
+            claims = json.loads(_b64decode(payload_segment))
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            raise TokenError()
+        if not isinstance(claims, dict):
+            raise TokenError()
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise TokenError()
+            if exp <= now:
+                raise TokenExpiredError()
+        nbf = claims.get("nbf")
+        if isinstance(nbf, (int, float)) and nbf > now:
+            raise TokenError()
+        return claims
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            header = json.loads(_b64decode(token.partition(".")[0]))
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            raise TokenError()
+        if not isinstance(header, dict):
+            raise TokenError()
+        return header
+
+
+def _b64decode(segment: str) -> bytes:
+    """JWT使用的无填充base64url解码"""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+BACKENDS = {
+    HmacBackend.name: HmacBackend,
+    JoseBackend.name: JoseBackend,
+}
+
+
+def create_backend(name: str = "auto"):
+    """创建JWT后端，auto时HS*算法使用精简的hmac实现，其他算法使用python-jose"""
+    if name == "auto":
+        name = HmacBackend.name if settings.algorithm in HmacBackend.DIGESTS else JoseBackend.name
+
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"未知的JWT后端: {name}，可选: auto, {', '.join(BACKENDS)}")
+    return backend_class()
+
+
+def key_id(secret: str) -> str:
+    """密钥标识，写入令牌头的kid字段（不泄露密钥本身）"""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:12]
+
+
+class TokenService:
+    """令牌服务"""
+
+    def __init__(self, backend=None, cache_size: Optional[int] = None):
+        self.backend = backend or create_backend(settings.jwt_backend)
+        self.cache_size = settings.jwt_cache_size if cache_size is None else cache_size
+        # 令牌摘要 -> (载荷, 过期时间戳, kid)
+        self._cache: "OrderedDict[bytes, Tuple[dict, Optional[float], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # 按配置缓存的密钥表，配置变化（轮换）时重建
+        self._keys: Dict[str, str] = {}
+        self._keys_config = None
+
+    def signing_keys(self) -> Dict[str, str]:
+        """当前有效的密钥 {kid: 密钥}，第一个为签发密钥，其余为轮换期内仍接受的旧密钥"""
+        config = (settings.secret_key, tuple(settings.jwt_previous_secret_keys))
+        if self._keys_config != config:
+            keys = {key_id(settings.secret_key): settings.secret_key}
+            for secret in settings.jwt_previous_secret_keys:
+                keys.setdefault(key_id(secret), secret)
+            self._keys, self._keys_config = keys, config
+        return self._keys
+
+    def create_token(self, claims: dict) -> str:
+        """用当前密钥签发令牌"""
+        kid = key_id(settings.secret_key)
+        return self.backend.encode(claims, settings.secret_key, settings.algorithm, {"kid": kid})
+
+    def verify(self, token: str) -> dict:
+        """
+        校验令牌并返回载荷
+        无效时抛出TokenError，过期时抛出TokenExpiredError
+        """
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        keys = self.signing_keys()
+
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                claims, expires_at, kid = entry
+                if kid in keys and (expires_at is None or expires_at > time.time()):
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    return dict(claims)
+                # 已过期或签名密钥已下线
+                del self._cache[digest]
+                if kid in keys:
+                    raise TokenExpiredError()
+
+        claims, kid = self._decode(token, keys)
+
+        with self._lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                exp = claims.get("exp")
+                self._cache[digest] = (claims, float(exp) if exp is not None else None, kid)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return dict(claims)
+
+    def invalidate(self, token: str):
+        """从缓存中移除令牌（吊销后调用）"""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            self._cache.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _decode(self, token: str, keys: Dict[str, str]) -> Tuple[dict, str]:
+        kid = self.backend.get_unverified_header(token).get("kid")
+        if kid is not None:
+            if kid not in keys:
+                raise TokenError()
+            return self.backend.decode(token, keys[kid], settings.algorithm), kid
+
+        # 轮换前签发的令牌没有kid，依次尝试所有有效密钥
+        for candidate_kid, secret in keys.items():
+            try:
+                return self.backend.decode(token, secret, settings.algorithm), candidate_kid
+            except TokenExpiredError:
+                raise
+            except TokenError:
+                continue
+        raise TokenError()
+
+
+# 创建全局令牌服务实例（缓存跨请求共享）
+token_service = TokenService()
+
+def get_token_service() -> TokenService:
+    """获取令牌服务实例"""
+    return token_service
@@ -0,0 +1,156 @@
+"""
+请求链路追踪服务
+基于contextvar的轻量span，记录一次请求内上传读取、写盘、Pillow处理、数据库提交等阶段的耗时，
+由 TracingMiddleware 输出为 Server-Timing 响应头，并把超过阈值的慢请求按采样率写入日志。
+开启 tracing_otel_export 且安装了opentelemetry时，同时创建OpenTelemetry span。
+"""
+import functools
+import json
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 慢请求单独使用一个logger，便于部署时输出到独立文件
+slow_request_logger = logging.getLogger("slow_request")
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ("name", "start", "duration", "parent")
+
+    def __init__(self, name: str, start: float, parent: Optional["Span"] = None):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.parent = parent
+
+
+class Trace:
+    """单个请求的全部span"""
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.current: Optional[Span] = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def summary(self) -> Dict[str, Dict]:
+        """按名称汇总耗时（毫秒）和次数，保持首次出现的顺序"""
+        result = {}
+        for span in self.spans:
+            item = result.setdefault(span.name, {"dur": 0.0, "count": 0})
+            item["dur"] += span.duration * 1000
+            item["count"] += 1
+        return result
+
+    def server_timing(self, total_ms: Optional[float] = None) -> str:
+        """生成 Server-Timing 头的值，如 upload.read;dur=1.2, image.encode;dur=35.0, total;dur=40.1"""
+        entries = [f"{_metric_name(name)};dur={item['dur']:.1f}" for name, item in self.summary().items()]
+        entries.append(f"total;dur={self.elapsed_ms() if total_ms is None else total_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def _metric_name(name: str) -> str:
+    """Server-Timing的指标名必须是token，把其他字符替换为下划线"""
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]", "_", name)
+
+
+@contextmanager
+def trace_request(method: str = "", path: str = "") -> Iterator[Trace]:
+    """
+    追踪一个请求，Trace在with块内的当前上下文及其子任务/线程池中可见，退出时恢复原来的值
+    用法: with trace_request("GET", "/x") as trace: ...
+    """
+    trace = Trace(method, path)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def get_current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """
+    记录一个span；当前没有请求追踪时只做一次contextvar读取
+    用法: with span("db.commit"): db.commit()
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    item = Span(name, time.perf_counter(), trace.current)
+    trace.current = item
+    otel_context = _start_otel_span(name)
+    try:
+        yield
+    finally:
+        item.duration = time.perf_counter() - item.start
+        trace.current = item.parent
+        trace.spans.append(item)
+        if otel_context is not None:
+            otel_context.__exit__(None, None, None)
+
+
+def traced(name: str):
+    """把整个函数调用记录为一个span的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_otel_span(name: str):
+    if otel_trace is None or not settings.tracing_otel_export:
+        return None
+    context = otel_trace.get_tracer(__name__).start_as_current_span(name)
+    context.__enter__()
+    return context
+
+
+def log_slow_request(trace: Trace, status_code: int, total_ms: float) -> bool:
+    """超过阈值的请求按采样率写入慢请求日志，返回是否写入"""
+    if total_ms < settings.slow_request_threshold_ms:
+        return False
+    if random.random() >= settings.slow_request_sample_rate:
+        return False
+
+    record = {
+        "method": trace.method,
+        "path": trace.path,
+        "status": status_code,
+        "total_ms": round(total_ms, 1),
+        "spans": {name: {"dur_ms": round(item["dur"], 1), "count": item["count"]}
+                  for name, item in trace.summary().items()},
+    }
+    slow_request_logger.warning(json.dumps(record, ensure_ascii=False))
+    return True
@@ -1,11 +1,13 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from datetime import datetime, date
+from sqlalchemy.exc import IntegrityError
+from datetime import date
 from typing import Optional
 from models import User, DailyUsage, UserRole
 from framework.schemas import UserCreate, UserUpdate, UsageStatsResponse
 from auth import get_password_hash, verify_password
 from config import settings
+from services.session_service import get_session_service
+from services.tracing_service import traced
 
 class UserService:
     def __init__(self, db: Session):
@@ -95,6 +97,7 @@ class UserService:
         self.db.refresh(user)
         return user
     
+    @traced("user.update_user_role")
     def update_user_role(self, user_id: int, new_role: UserRole) -> bool:
         """更新用户会员等级"""
         user = self.get_user_by_id(user_id)
@@ -103,33 +106,43 @@ class UserService:
         
         user.role = new_role
         self.db.commit()
+        # 旧令牌按原等级签发，等级变更后全部吊销，要求重新登录
+        # 令牌的sub可能是用户名（微信/Auth0登录）或用户ID（账号密码登录）
+        get_session_service().revoke_user_sessions(user.username, str(user.id))
         return True
     
+    @traced("user.get_daily_usage")
     def get_daily_usage(self, user_id: int, usage_date: date = None) -> DailyUsage:
         """获取用户每日使用情况"""
         if usage_date is None:
             usage_date = date.today()
         
-        daily_usage = self.db.query(DailyUsage).filter(
-            and_(
-                DailyUsage.user_id == user_id,
-                func.date(DailyUsage.usage_date) == usage_date
-            )
-        ).first()
+        # 直接比较DATE列，命中 (user_id, usage_date) 唯一索引
+        query = self.db.query(DailyUsage).filter(
+            DailyUsage.user_id == user_id,
+            DailyUsage.usage_date == usage_date
+        )
+        daily_usage = query.first()
         
         if not daily_usage:
             # 创建新的每日使用记录
             daily_usage = DailyUsage(
                 user_id=user_id,
-                usage_date=datetime.combine(usage_date, datetime.min.time()),
+                usage_date=usage_date,
                 usage_count=0
             )
             self.db.add(daily_usage)
-            self.db.commit()
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # 并发请求已创建当天记录
+                self.db.rollback()
+                return query.one()
             self.db.refresh(daily_usage)
         
         return daily_usage
     
+    @traced("user.increment_daily_usage")
     def increment_daily_usage(self, user_id: int) -> bool:
         """增加每日使用次数"""
         daily_usage = self.get_daily_usage(user_id)
@@ -137,6 +150,7 @@ class UserService:
         self.db.commit()
         return True
     
+    @traced("user.get_usage_stats")
     def get_usage_stats(self, user_id: int) -> UsageStatsResponse:
         """获取用户使用统计"""
         user = self.get_user_by_id(user_id)
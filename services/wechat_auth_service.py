@@ -1,4 +1,3 @@
-import httpx
 import json
 import hashlib
 import hmac
@@ -9,6 +8,8 @@ from urllib.parse import urlencode, parse_qs
 from config import settings
 from sqlalchemy.orm import Session
 from models import User
+from services.http_client_service import get_http_client
+from services.login_state_service import get_login_state_service
 from services.user_service import UserService
 
 class WeChatAuthService:
@@ -29,6 +30,15 @@ class WeChatAuthService:
         if not state:
             state = str(uuid.uuid4())
         
+        auth_url = self.build_auth_url(state)
+        
+        # 登记state，供登录页查询扫码结果
+        get_login_state_service().create("wechat", state)
+        
+        return auth_url, state
+    
+    def build_auth_url(self, state: str) -> str:
+        """拼接指定state的扫码登录URL（不登记state）"""
         params = {
             "appid": settings.wechat_open_app_id,
             "redirect_uri": settings.wechat_open_redirect_uri,
@@ -38,9 +48,7 @@ class WeChatAuthService:
         }
         
         # 添加#wechat_redirect后缀
-        auth_url = f"{self.wechat_auth_url}?{urlencode(params)}#wechat_redirect"
-        
-        return auth_url, state
+        return f"{self.wechat_auth_url}?{urlencode(params)}#wechat_redirect"
     
     async def get_access_token(self, code: str) -> Optional[Dict[str, Any]]:
         """通过授权码获取access_token"""
@@ -52,16 +60,15 @@ class WeChatAuthService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.wechat_token_url, params=params)
-                result = response.json()
+            response = await get_http_client("wechat_open").get(self.wechat_token_url, params=params)
+            result = response.json()
+            
+            if "access_token" in result:
+                return result
+            else:
+                print(f"获取access_token失败: {result}")
+                return None
                 
-                if "access_token" in result:
-                    return result
-                else:
-                    print(f"获取access_token失败: {result}")
-                    return None
-                    
         except Exception as e:
             print(f"请求access_token异常: {e}")
             return None
@@ -74,16 +81,15 @@ class WeChatAuthService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.wechat_userinfo_url, params=params)
-                result = response.json()
+            response = await get_http_client("wechat_open").get(self.wechat_userinfo_url, params=params)
+            result = response.json()
+            
+            if "openid" in result:
+                return result
+            else:
+                print(f"获取用户信息失败: {result}")
+                return None
                 
-                if "openid" in result:
-                    return result
-                else:
-                    print(f"获取用户信息失败: {result}")
-                    return None
-                    
         except Exception as e:
             print(f"请求用户信息异常: {e}")
             return None
@@ -97,16 +103,15 @@ class WeChatAuthService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.wechat_refresh_token_url, params=params)
-                result = response.json()
+            response = await get_http_client("wechat_open").get(self.wechat_refresh_token_url, params=params)
+            result = response.json()
+            
+            if "access_token" in result:
+                return result
+            else:
+                print(f"刷新access_token失败: {result}")
+                return None
                 
-                if "access_token" in result:
-                    return result
-                else:
-                    print(f"刷新access_token失败: {result}")
-                    return None
-                    
         except Exception as e:
             print(f"刷新access_token异常: {e}")
             return None
@@ -223,15 +228,17 @@ class WeChatAuthService:
     
     def get_wechat_login_status(self, state: str) -> Dict[str, Any]:
         """获取微信登录状态"""
-        # 这里可以从Redis或数据库获取登录状态
-        # 简化实现
-        return {
-            "status": "pending",
-            "message": "等待扫码"
-        }
+        return get_login_state_service().get("wechat", state)
+    
+    def claim_wechat_login_token(self, state: str) -> Optional[str]:
+        """领取微信登录成功后的访问令牌（只能领取一次）"""
+        return get_login_state_service().claim_token("wechat", state)
+    
+    async def wait_wechat_login_status(self, state: str, timeout: float) -> Dict[str, Any]:
+        """等待微信登录结果（长轮询），超时返回当前状态"""
+        return await get_login_state_service().wait("wechat", state, timeout)
     
-    def set_wechat_login_status(self, state: str, status: str, user_id: int = None, message: str = ""):
+    def set_wechat_login_status(self, state: str, status: str, user_id: int = None, message: str = "",
+                               access_token: str = None):
         """设置微信登录状态"""
-        # 这里可以存储到Redis或数据库
-        # 简化实现
-        pass
+        get_login_state_service().set("wechat", state, status, user_id, message, access_token)
@@ -1,12 +1,127 @@
+"""
+微信支付服务（V2 XML接口）
+请求通过共享的 wechat_pay 上游客户端异步发送；XML的生成/解析和签名计算是模块级函数，
+下单请求、响应校验和支付回调共用同一套实现，本地联调和测试可使用 tools/benchmark/wechat_pay_stub.py。
+"""
 import hashlib
 import hmac
-import xml.etree.ElementTree as ET
+import re
 import time
 import uuid
-import requests
-from typing import Dict, Any, Optional
+from typing import Any, Dict, Union
+from xml.parsers import expat
+
 from config import settings
-import json
+from services.http_client_service import get_http_client
+
+# 微信支付的请求/回调都是几百字节，超过上限直接拒绝
+MAX_XML_BYTES = 64 * 1024
+
+_TAG_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def dict_to_xml(params: Dict[str, Any]) -> str:
+    """字典转微信支付XML，值放在CDATA中（值里的 ]]> 会拆成两段CDATA）"""
+    parts = ["<xml>"]
+    for key, value in params.items():
+        if not _TAG_PATTERN.match(key):
+            raise ValueError(f"无效的XML字段名: {key}")
+        if value is None:
+            continue
+        text = str(value).replace("]]>", "]]]]><![CDATA[>")
+        parts.append(f"<{key}><![CDATA[{text}]]></{key}>")
+    parts.append("</xml>")
+    return "".join(parts)
+
+
+class XmlDictParser:
+    """
+    增量解析微信支付XML（<xml><字段>值</字段>...</xml>），只取根节点下一层字段
+    可以边接收边feed；拒绝DTD和实体声明（避免实体膨胀/外部实体），超过max_bytes时报错
+    """
+
+    def __init__(self, max_bytes: int = MAX_XML_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.result: Dict[str, str] = {}
+        self._depth = 0
+        self._text = []
+        self._parser = expat.ParserCreate("utf-8")
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._characters
+        self._parser.StartDoctypeDeclHandler = self._forbid
+        self._parser.EntityDeclHandler = self._forbid
+        self._parser.ExternalEntityRefHandler = self._forbid
+
+    def feed(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise ValueError(f"XML数据超过 {self.max_bytes} 字节")
+        self._parse(data, False)
+
+    def close(self) -> Dict[str, str]:
+        self._parse(b"", True)
+        return self.result
+
+    def _parse(self, data: bytes, final: bool):
+        try:
+            self._parser.Parse(data, final)
+        except expat.ExpatError as e:
+            raise ValueError(f"XML格式错误: {e}") from e
+
+    def _start(self, name, attrs):
+        self._depth += 1
+        if self._depth == 2:
+            self._text = []
+
+    def _end(self, name):
+        if self._depth == 2:
+            self.result[name] = "".join(self._text)
+        self._depth -= 1
+
+    def _characters(self, data):
+        if self._depth == 2:
+            self._text.append(data)
+
+    def _forbid(self, *args):
+        raise ValueError("XML中不允许DTD或实体声明")
+
+
+def xml_to_dict(data: Union[str, bytes], max_bytes: int = MAX_XML_BYTES) -> Dict[str, str]:
+    """解析微信支付XML为字典"""
+    parser = XmlDictParser(max_bytes)
+    parser.feed(data)
+    return parser.close()
+
+
+def sign_params(params: Dict[str, Any], api_key: str, sign_type: str = None) -> str:
+    """
+    计算签名：去掉sign和空值，按键名排序拼接后加 &key=API密钥，
+    sign_type为 HMAC-SHA256 时用HMAC-SHA256，否则MD5，结果大写
+    """
+    sign_type = sign_type or params.get("sign_type") or params.get("signType") or "MD5"
+    string_a = "&".join(
+        f"{k}={v}" for k, v in sorted(params.items())
+        if k != "sign" and v is not None and v != ""
+    )
+    string_sign_temp = f"{string_a}&key={api_key}"
+    if sign_type == "HMAC-SHA256":
+        digest = hmac.new(api_key.encode("utf-8"), string_sign_temp.encode("utf-8"), hashlib.sha256)
+    else:
+        digest = hashlib.md5(string_sign_temp.encode("utf-8"))
+    return digest.hexdigest().upper()
+
+
+def verify_sign(params: Dict[str, Any], api_key: str) -> bool:
+    """校验签名（不修改params），使用常量时间比较"""
+    sign = params.get("sign")
+    if not sign:
+        return False
+    return hmac.compare_digest(str(sign).upper(), sign_params(params, api_key))
+
 
 class WeChatPayService:
     """微信支付服务"""
@@ -17,13 +132,14 @@ class WeChatPayService:
         self.api_key = settings.wechat_api_key
         self.notify_url = settings.wechat_notify_url
         
-        # 微信支付API地址
-        self.unified_order_url = "https://api.mch.weixin.qq.com/pay/unifiedorder"
-        self.query_order_url = "https://api.mch.weixin.qq.com/pay/orderquery"
-        self.close_order_url = "https://api.mch.weixin.qq.com/pay/closeorder"
-        self.refund_url = "https://api.mch.weixin.qq.com/secapi/pay/refund"
+        # 微信支付API地址（本地联调时可指向 wechat_pay_stub）
+        api_base = settings.wechat_pay_api_base.rstrip("/")
+        self.unified_order_url = f"{api_base}/pay/unifiedorder"
+        self.query_order_url = f"{api_base}/pay/orderquery"
+        self.close_order_url = f"{api_base}/pay/closeorder"
+        self.refund_url = f"{api_base}/secapi/pay/refund"
     
-    def create_unified_order(self, 
+    async def create_unified_order(self, 
                            out_trade_no: str, 
                            total_fee: int, 
                            body: str, 
@@ -54,18 +170,8 @@ class WeChatPayService:
             "trade_type": trade_type
         }
         
-        # 生成签名
-        params["sign"] = self._generate_sign(params)
-        
-        # 转换为XML
-        xml_data = self._dict_to_xml(params)
-        
         try:
-            response = requests.post(self.unified_order_url, data=xml_data, timeout=30)
-            response.raise_for_status()
-            
-            # 解析响应
-            result = self._xml_to_dict(response.text)
+            result = await self._request(self.unified_order_url, params)
             
             if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
                 return {
@@ -88,7 +194,7 @@ class WeChatPayService:
                 "error": f"请求失败: {str(e)}"
             }
     
-    def query_order(self, out_trade_no: str = None, transaction_id: str = None) -> Dict[str, Any]:
+    async def query_order(self, out_trade_no: str = None, transaction_id: str = None) -> Dict[str, Any]:
         """
         查询订单
         
@@ -112,18 +218,8 @@ class WeChatPayService:
         else:
             return {"success": False, "error": "订单号不能为空"}
         
-        # 生成签名
-        params["sign"] = self._generate_sign(params)
-        
-        # 转换为XML
-        xml_data = self._dict_to_xml(params)
-        
         try:
-            response = requests.post(self.query_order_url, data=xml_data, timeout=30)
-            response.raise_for_status()
-            
-            # 解析响应
-            result = self._xml_to_dict(response.text)
+            result = await self._request(self.query_order_url, params)
             
             if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
                 return {
@@ -137,7 +233,8 @@ class WeChatPayService:
             else:
                 return {
                     "success": False,
-                    "error": result.get("err_code_des", "查询订单失败")
+                    "error": result.get("err_code_des", "查询订单失败"),
+                    "err_code": result.get("err_code")
                 }
                 
         except Exception as e:
@@ -146,7 +243,7 @@ class WeChatPayService:
                 "error": f"查询失败: {str(e)}"
             }
     
-    def close_order(self, out_trade_no: str) -> Dict[str, Any]:
+    async def close_order(self, out_trade_no: str) -> Dict[str, Any]:
         """
         关闭订单
         
@@ -163,18 +260,8 @@ class WeChatPayService:
             "nonce_str": self._generate_nonce_str()
         }
         
-        # 生成签名
-        params["sign"] = self._generate_sign(params)
-        
-        # 转换为XML
-        xml_data = self._dict_to_xml(params)
-        
         try:
-            response = requests.post(self.close_order_url, data=xml_data, timeout=30)
-            response.raise_for_status()
-            
-            # 解析响应
-            result = self._xml_to_dict(response.text)
+            result = await self._request(self.close_order_url, params)
             
             if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
                 return {"success": True}
@@ -190,7 +277,7 @@ class WeChatPayService:
                 "error": f"关闭订单失败: {str(e)}"
             }
     
-    def verify_notify(self, xml_data: str) -> Dict[str, Any]:
+    def verify_notify(self, xml_data: Union[str, bytes]) -> Dict[str, Any]:
         """
         验证支付回调
         
@@ -203,34 +290,51 @@ class WeChatPayService:
         try:
             # 解析XML
             result = self._xml_to_dict(xml_data)
-            
-            # 验证签名
-            if not self._verify_sign(result):
-                return {
-                    "success": False,
-                    "error": "签名验证失败"
-                }
-            
-            # 检查支付结果
-            if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
-                return {
-                    "success": True,
-                    "transaction_id": result.get("transaction_id"),
-                    "out_trade_no": result.get("out_trade_no"),
-                    "total_fee": int(result.get("total_fee", 0)),
-                    "time_end": result.get("time_end"),
-                    "openid": result.get("openid")
-                }
-            else:
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"解析回调数据失败: {str(e)}"
+            }
+        return self.verify_notify_params(result)
+    
+    def verify_notify_params(self, result: Dict[str, str]) -> Dict[str, Any]:
+        """
+        验证已解析的支付回调（回调接口边接收边解析时使用）
+        
+        Args:
+            result: 回调XML解析后的字段
+        
+        Returns:
+            验证结果和订单信息
+        """
+        # 验证签名
+        if not self._verify_sign(result):
+            return {
+                "success": False,
+                "error": "签名验证失败"
+            }
+        
+        # 检查支付结果
+        if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
+            try:
+                total_fee = int(result.get("total_fee", 0))
+            except ValueError:
                 return {
                     "success": False,
-                    "error": result.get("err_code_des", "支付失败")
+                    "error": "回调金额格式错误"
                 }
-                
-        except Exception as e:
+            return {
+                "success": True,
+                "transaction_id": result.get("transaction_id"),
+                "out_trade_no": result.get("out_trade_no"),
+                "total_fee": total_fee,
+                "time_end": result.get("time_end"),
+                "openid": result.get("openid")
+            }
+        else:
             return {
                 "success": False,
-                "error": f"解析回调数据失败: {str(e)}"
+                "error": result.get("err_code_des", "支付失败")
             }
     
     def create_jsapi_pay_params(self, prepay_id: str) -> Dict[str, str]:
@@ -262,41 +366,34 @@ class WeChatPayService:
     
     def _generate_sign(self, params: Dict[str, Any]) -> str:
         """生成签名"""
-        # 过滤空值并排序
-        filtered_params = {k: v for k, v in params.items() if v is not None and v != ""}
-        sorted_params = sorted(filtered_params.items())
-        
-        # 拼接字符串
-        string_a = "&".join([f"{k}={v}" for k, v in sorted_params])
-        string_sign_temp = f"{string_a}&key={self.api_key}"
-        
-        # MD5加密并转大写
-        sign = hashlib.md5(string_sign_temp.encode('utf-8')).hexdigest().upper()
-        return sign
+        return sign_params(params, self.api_key)
     
     def _verify_sign(self, params: Dict[str, Any]) -> bool:
         """验证签名"""
-        sign = params.pop("sign", "")
-        calculated_sign = self._generate_sign(params)
-        return sign == calculated_sign
+        return verify_sign(params, self.api_key)
     
     def _dict_to_xml(self, params: Dict[str, Any]) -> str:
         """字典转XML"""
-        xml = "<xml>"
-        for k, v in params.items():
-            xml += f"<{k}><![CDATA[{v}]]></{k}>"
-        xml += "</xml>"
-        return xml
+        return dict_to_xml(params)
     
-    def _xml_to_dict(self, xml_data: str) -> Dict[str, str]:
+    def _xml_to_dict(self, xml_data: Union[str, bytes]) -> Dict[str, str]:
         """XML转字典"""
-        root = ET.fromstring(xml_data)
-        result = {}
-        for child in root:
-            result[child.tag] = child.text
+        return xml_to_dict(xml_data)
+    
+    async def _request(self, url: str, params: Dict[str, Any], upstream: str = "wechat_pay") -> Dict[str, str]:
+        """签名并发送请求，返回解析后的响应；带签名的成功响应会校验签名"""
+        params["sign"] = self._generate_sign(params)
+        xml_data = self._dict_to_xml(params)
+        
+        response = await get_http_client(upstream).post(url, content=xml_data.encode("utf-8"))
+        response.raise_for_status()
+        
+        result = self._xml_to_dict(response.content)
+        if result.get("return_code") == "SUCCESS" and "sign" in result and not self._verify_sign(result):
+            raise ValueError("响应签名验证失败")
         return result
     
-    def create_refund(self, 
+    async def create_refund(self, 
                      out_trade_no: str, 
                      out_refund_no: str, 
                      total_fee: int, 
@@ -326,12 +423,6 @@ class WeChatPayService:
             "refund_desc": refund_desc
         }
         
-        # 生成签名
-        params["sign"] = self._generate_sign(params)
-        
-        # 转换为XML
-        xml_data = self._dict_to_xml(params)
-        
         try:
             # 退款需要证书
             if not settings.wechat_cert_path or not settings.wechat_key_path:
@@ -340,16 +431,7 @@ class WeChatPayService:
                     "error": "退款需要配置商户证书"
                 }
             
-            response = requests.post(
-                self.refund_url, 
-                data=xml_data, 
-                cert=(settings.wechat_cert_path, settings.wechat_key_path),
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            # 解析响应
-            result = self._xml_to_dict(response.text)
+            result = await self._request(self.refund_url, params, upstream="wechat_pay_cert")
             
             if result.get("return_code") == "SUCCESS" and result.get("result_code") == "SUCCESS":
                 return {
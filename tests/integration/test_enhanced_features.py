@@ -158,7 +158,7 @@ class EnhancedImageTester:
         response = self.session.get(f"{self.base_url}/api/image/records?limit=5")
         
         if response.status_code == 200:
-            records = response.json()
+            records = response.json()["items"]
             print(f"✅ 获取到 {len(records)} 条记录")
             
             for i, record in enumerate(records, 1):
@@ -0,0 +1,32 @@
+"""
+alembic 迁移链单元测试：只有一个根迁移，其余迁移依次衔接
+（本地 alembic/ 目录会遮蔽 alembic 包，这里直接解析迁移文件）
+"""
+import ast
+from pathlib import Path
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+
+def read_revisions():
+    revisions = {}
+    for path in sorted(VERSIONS_DIR.glob("*.py")):
+        values = {}
+        for node in ast.parse(path.read_text(encoding="utf-8")).body:
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                if node.targets[0].id in ("revision", "down_revision"):
+                    values[node.targets[0].id] = ast.literal_eval(node.value)
+        revisions[values["revision"]] = values["down_revision"]
+    return revisions
+
+
+def test_revisions_form_a_single_chain_from_initial_schema():
+    revisions = read_revisions()
+
+    assert [revision for revision, down in revisions.items() if down is None] == ["0000"]
+    chain, current = [], "0000"
+    children = {down: revision for revision, down in revisions.items()}
+    while current:
+        chain.append(current)
+        current = children.get(current)
+    assert chain == sorted(revisions)
@@ -0,0 +1,87 @@
+"""
+AuthMiddleware 单元测试
+"""
+from datetime import timedelta
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from auth import create_access_token
+from framework.middleware.auth_middleware import AuthMiddleware, PrefixTrie
+
+
+@pytest.fixture
+def client():
+    async def echo(request):
+        return JSONResponse({"payload": request.scope.get("state", {}).get("token_payload")})
+
+    app = Starlette(routes=[
+        Route("/api/image/formats", echo),
+        Route("/api/image/usage", echo),
+        Route("/static/{name}", echo),
+    ])
+    return TestClient(AuthMiddleware(app))
+
+
+def test_prefix_trie_matches_whole_segments_only():
+    trie = PrefixTrie(["/static/", "/api/image/download/"])
+
+    assert trie.match("/static/a.png")
+    assert trie.match("/api/image/download/x/y.jpg")
+    assert not trie.match("/static")
+    assert not trie.match("/staticfiles/a.png")
+    assert not trie.match("/api/image/usage")
+
+
+def test_public_paths_skip_token_check(client):
+    assert client.get("/api/image/formats").json() == {"payload": None}
+    assert client.get("/static/a.png").status_code == 200
+
+
+def test_protected_path_requires_valid_token(client):
+    response = client.get("/api/image/usage")
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+    assert client.get("/api/image/usage", headers={"Authorization": "Bearer garbage"}).status_code == 401
+
+    expired = create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1))
+    response = client.get("/api/image/usage", headers={"Authorization": f"Bearer {expired}"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "访问令牌已过期"
+
+
+def test_valid_token_payload_is_passed_downstream(client):
+    token = create_access_token({"sub": "alice"})
+
+    response = client.get("/api/image/usage", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["payload"]["sub"] == "alice"
+
+
+def test_preflight_requests_are_not_blocked(client):
+    assert client.options("/api/image/usage").status_code != 401
+
+
+def test_revoked_token_is_rejected(client, monkeypatch):
+    from auth import revoke_access_token
+    from redis_client import RedisClient
+    from services.session_service import get_session_service
+    from tools.benchmark.load_test import make_fake_redis
+
+    redis = RedisClient()
+    redis.redis_client = make_fake_redis()
+    monkeypatch.setattr(get_session_service(), "redis", redis)
+
+    token = create_access_token({"sub": "alice"})
+    assert client.get("/api/image/usage", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    assert revoke_access_token(token)
+
+    response = client.get("/api/image/usage", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "访问令牌已失效"
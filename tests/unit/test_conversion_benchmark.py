@@ -0,0 +1,41 @@
+"""
+图片转换基准测试工具的单元测试
+"""
+from config import settings
+from tools.benchmark.conversion_benchmark import compare_results, percentile, run_benchmark
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_compare_results_flags_only_metrics_over_threshold():
+    baseline = {"scenarios": [{"name": "a", "p50_ms": 10.0, "output_bytes": 1000}]}
+    current = {"scenarios": [
+        {"name": "a", "p50_ms": 13.0, "output_bytes": 1010},
+        {"name": "new", "p50_ms": 99.0, "output_bytes": 1},
+    ]}
+
+    regressions = compare_results(current, baseline, {"p50_ms": 1.2, "output_bytes": 1.05})
+
+    assert [(r["scenario"], r["metric"]) for r in regressions] == [("a", "p50_ms")]
+    assert regressions[0]["ratio"] == 1.3
+
+
+def test_run_benchmark_records_metrics_per_scenario(tmp_path):
+    upload_dir = settings.upload_dir
+
+    result = run_benchmark("quick", str(tmp_path / "corpus"), only="icon_64/png_rgba", isolate=False)
+
+    assert settings.upload_dir == upload_dir
+
+    names = [item["name"] for item in result["scenarios"]]
+    assert names == ["icon_64/png_rgba->jpeg", "icon_64/png_rgba->webp"]
+    for item in result["scenarios"]:
+        assert item["iterations"] == 50
+        assert item["output_bytes"] > 0
+        assert 0 < item["p50_ms"] <= item["p99_ms"]
+        assert item["peak_rss_mb"] > 0
@@ -0,0 +1,88 @@
+"""
+转换历史游标分页单元测试（SQLite）
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from framework.schemas import ConversionRecordPage, ConversionRecordSummaryPage
+from models import ConversionRecord, User
+from services.conversion_history_service import ConversionHistoryService, encode_cursor
+from tools.database import database
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    owner = User(username="owner", email="owner@example.com")
+    other = User(username="other", email="other@example.com")
+    session.add_all([owner, other])
+    session.flush()
+    # 每两条记录共用一个时间戳，验证同一时间的记录不会在翻页时重复或遗漏
+    for i in range(7):
+        session.add(ConversionRecord(
+            user_id=owner.id, original_filename=f"{i}.png", original_format="png", target_format="webp",
+            file_size=100 + i, conversion_time=0.1, status="failed" if i == 0 else "success",
+            error_message="boom" if i == 0 else None, created_at=START + timedelta(minutes=i // 2),
+        ))
+    session.add(ConversionRecord(
+        user_id=other.id, original_filename="other.png", original_format="png", target_format="webp",
+        file_size=1, conversion_time=0.1, created_at=START,
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_pages_cover_all_records_in_order(db):
+    service = ConversionHistoryService(db)
+    owner_id = db.query(User.id).filter(User.username == "owner").scalar()
+
+    seen, cursor = [], None
+    while True:
+        page = service.list_records(owner_id, limit=3, cursor=cursor)
+        seen.extend(page["items"])
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            break
+        cursor = page["next_cursor"]
+
+    assert [record.original_filename for record in seen] == [f"{i}.png" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_summary_page_omits_error_message(db):
+    service = ConversionHistoryService(db)
+    owner_id = db.query(User.id).filter(User.username == "owner").scalar()
+
+    page = ConversionRecordSummaryPage.model_validate(
+        service.list_records(owner_id, limit=10, summary=True), from_attributes=True
+    )
+    full = ConversionRecordPage.model_validate(service.list_records(owner_id, limit=10), from_attributes=True)
+
+    assert len(page.items) == 7 and not page.has_more
+    assert "error_message" not in page.items[-1].model_dump()
+    assert full.items[-1].error_message == "boom"
+
+
+def test_invalid_cursor_raises_value_error(db):
+    service = ConversionHistoryService(db)
+
+    for cursor in ("not-a-cursor", encode_cursor(START, 1)[:-3]):
+        with pytest.raises(ValueError):
+            service.list_records(1, cursor=cursor)
+
+
+def test_delete_only_own_record(db):
+    service = ConversionHistoryService(db)
+    owner_id = db.query(User.id).filter(User.username == "owner").scalar()
+    other_record_id = db.query(ConversionRecord.id).filter(ConversionRecord.user_id != owner_id).scalar()
+
+    assert service.delete_record(other_record_id, owner_id) is False
+    assert service.delete_record(other_record_id, owner_id + 1) is True
+    assert db.query(ConversionRecord).filter(ConversionRecord.id == other_record_id).first() is None
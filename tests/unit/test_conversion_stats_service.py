@@ -0,0 +1,71 @@
+"""
+转换统计日汇总单元测试（SQLite）
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from framework.schemas import ConversionStatsResponse
+from models import ConversionRecord, ConversionStatsDaily, User
+from services.conversion_stats_service import ConversionStatsService
+from services.image_service import ImageService
+from tools.database import database
+
+TODAY = date(2026, 1, 10)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(username="a", email="a@example.com"), User(username="b", email="b@example.com")])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_record_accumulates_into_one_row_per_day_and_format(db):
+    service = ConversionStatsService(db)
+
+    service.record(1, "webp", 0.5, True, bytes_in=1000, bytes_out=400, stat_date=TODAY)
+    service.record(1, "WEBP", 0.3, True, bytes_in=500, bytes_out=300, stat_date=TODAY)
+    service.record(1, "webp", 0.2, False, bytes_in=999, stat_date=TODAY)
+    db.commit()
+
+    row = db.query(ConversionStatsDaily).one()
+    assert (row.target_format, row.conversion_count, row.failure_count) == ("WEBP", 3, 1)
+    assert (row.bytes_in, row.bytes_out) == (1500, 700)
+    assert row.total_time == pytest.approx(1.0)
+
+
+def test_stats_group_by_format_within_window(db):
+    service = ConversionStatsService(db)
+    service.record(1, "webp", 1.0, True, bytes_in=1000, bytes_out=400, stat_date=TODAY)
+    service.record(1, "png", 3.0, True, bytes_in=1000, bytes_out=1200, stat_date=TODAY - timedelta(days=6))
+    service.record(1, "png", 5.0, True, bytes_in=1000, bytes_out=100, stat_date=TODAY - timedelta(days=7))
+    service.record(2, "webp", 1.0, True, bytes_in=50, bytes_out=10, stat_date=TODAY)
+    db.commit()
+
+    stats = ConversionStatsResponse.model_validate(service.get_stats(1, days=7, today=TODAY))
+
+    assert stats.since == TODAY - timedelta(days=6)
+    assert [(item.target_format, item.bytes_saved) for item in stats.by_format] == [("PNG", -200), ("WEBP", 600)]
+    assert stats.total.conversion_count == 2
+    assert stats.total.average_time == pytest.approx(2.0)
+    assert service.get_stats(None, days=1, today=TODAY)["total"]["bytes_saved"] == 640
+    assert service.get_stats(1, days=1, today=TODAY - timedelta(days=1))["by_format"] == []
+
+
+def test_conversion_recorder_updates_rollup_in_same_commit(db):
+    image_service = ImageService(db)
+
+    image_service._record_conversion(1, "a.png", "PNG", "WEBP", 300, 0.25, "success", source_size=1000)
+    image_service._record_conversion(1, "b.png", "PNG", "WEBP", 0, 0.05, "failed", "boom", source_size=2000)
+    image_service._record_conversion(None, "c.png", "PNG", "WEBP", 300, 0.25, "success", source_size=1000)
+
+    assert db.query(ConversionRecord).count() == 2
+    total = ConversionStatsService(db).get_stats(1, days=1)["total"]
+    assert (total["conversion_count"], total["failure_count"], total["bytes_saved"]) == (2, 1, 700)
@@ -0,0 +1,119 @@
+"""
+外部HTTP客户端（重试、熔断）单元测试，使用httpx.MockTransport代替网络
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from services.http_client_service import CircuitOpenError, UpstreamClient, UpstreamConfig
+
+
+def make_client(handler, **config) -> UpstreamClient:
+    config.setdefault("backoff", 0.0)
+    return UpstreamClient("test", UpstreamConfig(**config), transport=httpx.MockTransport(handler))
+
+
+def scripted(*outcomes):
+    """按顺序返回状态码或抛出异常的handler，并记录调用次数"""
+    calls = []
+
+    def handler(request):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(request.method)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"ok": outcome == 200})
+
+    return handler, calls
+
+
+def test_get_is_retried_on_gateway_errors():
+    handler, calls = scripted(503, 502, 200)
+    client = make_client(handler, retries=2)
+
+    response = asyncio.run(client.get("https://upstream/x"))
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+def test_post_is_only_retried_when_not_sent():
+    handler, calls = scripted(503)
+    assert asyncio.run(make_client(handler, retries=2).post("https://upstream/x")).status_code == 503
+    assert len(calls) == 1
+
+    handler, calls = scripted(httpx.ConnectError("refused"), 200)
+    assert asyncio.run(make_client(handler, retries=2).post("https://upstream/x")).status_code == 200
+    assert len(calls) == 2
+
+    handler, calls = scripted(httpx.ReadTimeout("slow"), 200)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(make_client(handler, retries=2).post("https://upstream/x"))
+    assert len(calls) == 1
+
+
+def test_circuit_opens_and_recovers():
+    handler, calls = scripted(httpx.ConnectError("down"), httpx.ConnectError("down"), 200)
+    client = make_client(handler, retries=0, failure_threshold=2, reset_seconds=60)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://upstream/x")
+        with pytest.raises(CircuitOpenError):
+            await client.get("https://upstream/x")
+        assert client.breaker.state == "open"
+        assert len(calls) == 2
+
+        # 冷却结束后放行一个试探请求，成功则关闭
+        client.breaker.opened_at -= 60
+        assert (await client.get("https://upstream/x")).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/down":
+            raise httpx.ConnectError("down")
+        if request.url.path == "/hang":
+            await asyncio.sleep(60)
+        return httpx.Response(200)
+
+    client = make_client(handler, retries=0, failure_threshold=1, reset_seconds=60)
+
+    async def scenario():
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://upstream/down")
+        client.breaker.opened_at -= 60
+
+        probe = asyncio.create_task(client.get("https://upstream/hang"))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # 试探被取消后仍是半开状态，下一个请求可以再次试探
+        assert client.breaker.state == "half_open"
+        assert (await client.get("https://upstream/ok")).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+    assert calls == ["/down", "/hang", "/ok"]
+
+
+def test_client_is_shared_within_event_loop():
+    client = make_client(scripted(200)[0])
+
+    async def scenario():
+        first = client.client
+        await client.get("https://upstream/x")
+        assert client.client is first
+        await client.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+"""
+图片操作后端一致性测试：numpy实现与pillow实现的结果误差应在很小范围内
+"""
+import pytest
+from PIL import Image, ImageChops
+
+from services.image_ops_service import get_image_ops_backend, set_image_ops_backend
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module")
+def images():
+    size = (64, 48)
+    rgb = Image.merge("RGB", [Image.effect_noise(size, 60).convert("L") for _ in range(3)])
+    rgba = rgb.copy()
+    rgba.putalpha(Image.linear_gradient("L").resize(size))
+    return rgba, rgb
+
+
+def max_difference(a, b):
+    assert a.mode == b.mode and a.size == b.size
+    return max(high for _, high in ImageChops.difference(a, b).getextrema()) if a.mode != "L" \
+        else ImageChops.difference(a, b).getextrema()[1]
+
+
+@pytest.mark.parametrize("operation,tolerance", [
+    (lambda ops, rgba, rgb: ops.adjust_brightness_contrast(rgb, 1.2, 0.8), 2),
+    (lambda ops, rgba, rgb: ops.sharpen(rgb).crop((1, 1, 63, 47)), 1),
+])
+def test_numpy_backend_matches_pillow(images, operation, tolerance):
+    rgba, rgb = images
+    expected = operation(get_image_ops_backend("pillow"), rgba, rgb)
+    actual = operation(get_image_ops_backend("numpy"), rgba, rgb)
+
+    assert max_difference(expected, actual) <= tolerance
+
+
+@pytest.mark.parametrize("method", ["flatten_alpha", "grayscale"])
+def test_numpy_backend_uses_pillow_for_single_pass_operations(method):
+    from services.image_ops_service import NumpyOpsBackend, PillowOpsBackend
+
+    assert getattr(NumpyOpsBackend, method) is getattr(PillowOpsBackend, method)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        set_image_ops_backend("opencl")
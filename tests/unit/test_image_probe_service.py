@@ -0,0 +1,108 @@
+"""
+ImageProbeService 单元测试
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from services.image_probe_service import ImageProbeService, PROBE_HEADER_BYTES
+
+
+class FakeCacheService:
+    def __init__(self):
+        self.store = {}
+
+    def cache_image_info(self, file_hash, image_info, expire_seconds=3600):
+        self.store[file_hash] = {"file_hash": file_hash, "image_info": image_info}
+        return True
+
+    def get_image_info(self, file_hash):
+        return self.store.get(file_hash)
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def encode(img, fmt, **params):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("fmt,mode", [
+    ("PNG", "RGBA"), ("JPEG", "RGB"), ("WEBP", "RGB"), ("GIF", "P"), ("TIFF", "RGB"), ("BMP", "RGB")
+])
+def test_probe_reports_dimensions_format_and_mode(fmt, mode):
+    source = Image.new("RGBA" if mode == "RGBA" else "RGB", (321, 123), (10, 20, 30))
+    data = encode(source, fmt)
+
+    info = ImageProbeService().probe_file(io.BytesIO(data), len(data))
+
+    assert info["format"] == fmt
+    assert info["mode"] == mode
+    assert (info["width"], info["height"]) == (321, 123)
+    assert info["file_size"] == len(data)
+    assert info["is_animated"] is False
+
+
+def test_probe_reads_only_header_of_large_file():
+    source = Image.effect_noise((1500, 1500), 80).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    data = encode(source, "PNG", exif=exif)
+    assert len(data) > 4 * PROBE_HEADER_BYTES
+
+    reader = CountingReader(data)
+    info = ImageProbeService().probe_file(reader, len(data))
+
+    assert info["orientation"] == 6
+    assert reader.bytes_read == PROBE_HEADER_BYTES
+
+
+def test_probe_counts_frames_of_animated_gif():
+    frames = [Image.new("RGB", (40, 40), (i * 60, 0, 0)) for i in range(4)]
+    data = encode(frames[0], "GIF", save_all=True, append_images=frames[1:])
+
+    info = ImageProbeService().probe_file(io.BytesIO(data), len(data))
+
+    assert info["frame_count"] == 4
+    assert info["is_animated"] is True
+
+
+def test_probe_result_is_cached_by_content_hash():
+    cache = FakeCacheService()
+    data = encode(Image.new("RGB", (8, 8)), "PNG")
+    service = ImageProbeService(cache)
+
+    first = service.probe_file(io.BytesIO(data), len(data))
+    cache.store[first["file_hash"]]["image_info"] = {"cached": True}
+
+    assert service.probe_file(io.BytesIO(data), len(data)) == {"cached": True}
+
+
+
+def test_cache_key_covers_whole_file():
+    cache = FakeCacheService()
+    service = ImageProbeService(cache)
+    data = encode(Image.effect_noise((600, 600), 80).convert("RGB"), "PNG")
+    assert len(data) > 2 * PROBE_HEADER_BYTES
+    # 头部和文件大小相同，只有头部之后的内容不同
+    changed = bytearray(data)
+    changed[-PROBE_HEADER_BYTES] ^= 0xFF
+    changed = bytes(changed)
+
+    first = service.probe_file(io.BytesIO(data), len(data))
+    cache.store[first["file_hash"]]["image_info"] = {"cached": True}
+    second = service.probe_file(io.BytesIO(changed), len(changed))
+
+    assert second["file_hash"] != first["file_hash"]
+    assert second["width"] == 600
@@ -0,0 +1,161 @@
+"""
+ImageService 单元测试（离线，无需启动服务）
+"""
+import pytest
+from PIL import Image
+
+from config import settings
+from framework.schemas import ImageConvertRequest
+from services.image_service import ImageService
+
+
+@pytest.fixture
+def image_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+    return ImageService(None)
+
+
+@pytest.fixture
+def animated_gif(tmp_path):
+    path = tmp_path / "animated.gif"
+    frames = [Image.new("RGB", (120, 80), (i * 40, 0, 255 - i * 40)) for i in range(5)]
+    frames[0].save(
+        path, save_all=True, append_images=frames[1:],
+        duration=[40, 50, 60, 70, 80], loop=2
+    )
+    return str(path)
+
+
+@pytest.mark.parametrize("target_format", ["GIF", "WEBP"])
+def test_animated_conversion_keeps_frames_durations_and_loop(image_service, animated_gif, target_format):
+    request = ImageConvertRequest(target_format=target_format, resize={"width": 60})
+    success, output_path, error = image_service.convert_image(animated_gif, target_format, None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.size == (60, 40)
+        assert result.n_frames == 5
+        assert result.info.get("loop") == 2
+        durations = []
+        for index in range(result.n_frames):
+            result.seek(index)
+            result.load()
+            durations.append(result.info.get("duration"))
+        assert durations == [40, 50, 60, 70, 80]
+
+
+def test_animated_source_to_static_format_uses_first_frame(image_service, animated_gif):
+    request = ImageConvertRequest(target_format="PNG")
+    success, output_path, error = image_service.convert_image(animated_gif, "PNG", None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.mode == "RGB"
+        assert getattr(result, "n_frames", 1) == 1
+
+
+@pytest.fixture
+def rotated_jpeg(tmp_path):
+    from PIL import ImageCms
+
+    path = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 需顺时针旋转90度
+    exif[0x010F] = "TestCamera"
+    icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    Image.new("RGB", (80, 40), (200, 10, 10)).save(path, exif=exif, icc_profile=icc_profile)
+    return str(path)
+
+
+def test_exif_orientation_is_applied_and_metadata_kept(image_service, rotated_jpeg):
+    request = ImageConvertRequest(target_format="JPEG")
+    success, output_path, error = image_service.convert_image(rotated_jpeg, "JPEG", None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.size == (40, 80)
+        exif = result.getexif()
+        assert exif.get(0x0112) is None
+        assert exif.get(0x010F) == "TestCamera"
+        assert result.info.get("icc_profile")
+
+
+def test_strip_metadata_removes_exif_and_icc(image_service, rotated_jpeg):
+    request = ImageConvertRequest(target_format="WEBP", strip_metadata=True)
+    success, output_path, error = image_service.convert_image(rotated_jpeg, "WEBP", None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.size == (40, 80)
+        assert not result.info.get("exif")
+        assert not result.info.get("icc_profile")
+
+
+def test_unusable_icc_profile_skips_color_conversion(image_service, tmp_path):
+    from PIL import ImageCms
+
+    # Lab配置文件配RGB数据，无法构建到sRGB的转换
+    path = tmp_path / "lab_profile.png"
+    icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("LAB")).tobytes()
+    Image.new("RGB", (20, 20), (10, 200, 10)).save(path, icc_profile=icc_profile)
+
+    request = ImageConvertRequest(target_format="JPEG")
+    for _ in range(2):
+        success, output_path, error = image_service.convert_image(str(path), "JPEG", None, request)
+        assert success, error
+        with Image.open(output_path) as result:
+            assert result.size == (20, 20)
+
+
+def test_auto_target_picks_smallest_available_format(image_service, tmp_path):
+    from services.codec_service import get_codec_registry
+
+    source = tmp_path / "photo.png"
+    Image.effect_noise((200, 150), 30).convert("RGB").save(source)
+    request = ImageConvertRequest(target_format="auto", quality=70)
+    success, output_path, error = image_service.convert_image(str(source), "auto", None, request)
+
+    assert success, error
+    chosen_format = output_path.rsplit(".", 1)[-1]
+    registry = get_codec_registry()
+    assert registry.format_for_extension(chosen_format) in registry.auto_candidates()
+
+
+@pytest.fixture
+def transparent_png(tmp_path):
+    path = tmp_path / "logo.png"
+    img = Image.effect_noise((120, 90), 30).convert("RGB")
+    img.putalpha(Image.linear_gradient("L").resize((120, 90)))
+    img.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("target_format", ["PNG", "auto"])
+def test_alpha_is_kept_for_formats_that_support_it(image_service, transparent_png, target_format):
+    request = ImageConvertRequest(target_format=target_format, watermark=True)
+    success, output_path, error = image_service.convert_image(transparent_png, target_format, None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.format != "JPEG"
+        assert result.mode == "RGBA"
+        assert result.getchannel("A").getextrema()[0] < 255
+
+
+def test_alpha_is_flattened_for_jpeg(image_service, transparent_png):
+    request = ImageConvertRequest(target_format="JPEG", watermark=True)
+    success, output_path, error = image_service.convert_image(transparent_png, "JPEG", None, request)
+
+    assert success, error
+    with Image.open(output_path) as result:
+        assert result.mode == "RGB"
+
+
+def test_supported_formats_report_capabilities(image_service):
+    formats = {item["format"]: item for item in image_service.get_supported_formats()}
+
+    assert formats["JPEG"]["available"] is True
+    assert formats["JPEG"]["alpha"] is False
+    assert formats["WEBP"]["animation"] is True
+    assert formats["PNG"]["lossless"] is True
+    assert "AVIF" in formats
@@ -0,0 +1,106 @@
+"""
+IpGeoService 与IP库生成脚本的单元测试
+"""
+import os
+
+import pytest
+
+from config import settings
+from services.ip_geo_service import IpGeoService
+from tools.scripts.build_ip_geo_db import merge_ranges, parse_delegated, write_csv
+
+DELEGATED = """2|apnic|20240101|3|19830613|20240101|+1000
+apnic|*|ipv4|*|3|summary
+apnic|CN|ipv4|1.0.1.0|256|20110414|allocated
+apnic|CN|ipv4|1.0.2.0|512|20110414|allocated
+apnic|JP|ipv4|1.0.16.0|4096|20110412|allocated
+apnic|CN|ipv6|2400:3200::|32|20100617|allocated
+apnic||ipv4|1.0.32.0|256||available
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "ip_geo.csv")
+    write_csv(merge_ranges(parse_delegated(DELEGATED.splitlines())), path)
+    return path
+
+
+def test_build_merges_adjacent_ranges(db_path):
+    with open(db_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    assert lines == [
+        "start_ip,end_ip,country_code",
+        "1.0.1.0,1.0.3.255,CN",
+        "1.0.16.0,1.0.31.255,JP",
+        "2400:3200::,2400:3200:ffff:ffff:ffff:ffff:ffff:ffff,CN",
+    ]
+
+
+def test_lookup(db_path):
+    service = IpGeoService(db_path)
+    assert service.load()
+
+    assert service.lookup("1.0.2.7")["is_china"]
+    assert service.lookup("1.0.16.1")["login_method"] == "auth0"
+    assert service.lookup("2400:3200::1")["country_code"] == "CN"
+    assert service.lookup("::ffff:1.0.1.1")["country_code"] == "CN"
+    assert service.lookup("1.0.4.0") is None
+    assert service.lookup("192.168.1.1") is None
+    assert service.lookup("无法获取") is None
+
+
+def test_results_are_cached_and_copied(db_path):
+    service = IpGeoService(db_path, cache_size=1)
+    service.load()
+
+    first = service.lookup("1.0.1.1")
+    first["country_code"] = "XX"
+
+    assert service.lookup("1.0.1.1")["country_code"] == "CN"
+    service.lookup("1.0.16.1")
+    assert list(service._cache) == ["1.0.16.1"]
+
+
+def test_reload_when_file_changes(db_path, monkeypatch):
+    monkeypatch.setattr(settings, "ip_geo_reload_check_seconds", 0.0)
+    service = IpGeoService(db_path)
+    service.load()
+    assert service.lookup("8.8.8.8") is None
+
+    with open(db_path, "a", encoding="utf-8") as f:
+        f.write("8.8.8.0,8.8.8.255,US,United States,California,Mountain View\n")
+    stat = os.stat(db_path)
+    os.utime(db_path, (stat.st_atime, stat.st_mtime + 10))
+
+    # 重新加载在后台线程中进行，期间仍返回旧数据的结果
+    assert service.lookup("8.8.8.8") is None
+    service._reload_thread.join(5)
+    assert service.lookup("8.8.8.8")["city"] == "Mountain View"
+
+
+def test_missing_file(tmp_path):
+    service = IpGeoService(str(tmp_path / "missing.csv"))
+
+    assert not service.load()
+    assert not service.available
+    assert service.lookup("1.0.1.1") is None
+
+
+def test_remote_api_used_without_local_database(tmp_path, monkeypatch):
+    import asyncio
+
+    from routers import smart_auth
+
+    calls = []
+
+    async def fake_remote(ip_address):
+        calls.append(ip_address)
+        return {"country_code": "CN", "is_china": True, "login_method": "wechat"}
+
+    monkeypatch.setattr(smart_auth, "detect_ip_location_remote", fake_remote)
+    monkeypatch.setattr(smart_auth, "get_ip_geo_service", lambda: IpGeoService(str(tmp_path / "missing.csv")))
+
+    assert asyncio.run(smart_auth.detect_ip_location("1.0.1.1"))["login_method"] == "wechat"
+    assert calls == ["1.0.1.1"]
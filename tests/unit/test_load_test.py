@@ -0,0 +1,53 @@
+"""
+压测工具的单元测试（使用独立的小应用，不修改全局配置）
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tools.benchmark.load_test import histogram, parse_mix, run_load
+
+
+class StaticGenerator:
+    def build(self, kind):
+        return {"method": "GET", "url": f"/{kind}"}
+
+
+def test_parse_mix_validates_route_names():
+    assert parse_mix("convert=3,info") == {"convert": 3, "info": 1}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+def test_histogram_buckets_latencies():
+    assert histogram([0.5, 3, 4, 20000]) == {"<=1ms": 1, "<=5ms": 2, ">10000ms": 1}
+
+
+def test_run_load_reports_per_route_rps_and_errors():
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await run_load(client, StaticGenerator(), {"ok": 3, "broken": 1},
+                                  concurrency=4, total_requests=80)
+
+    report = asyncio.run(run())
+
+    assert report["total_requests"] == 80
+    routes = report["routes"]
+    assert routes["ok"]["requests"] + routes["broken"]["requests"] == 80
+    assert routes["ok"]["error_rate"] == 0
+    assert routes["broken"]["error_rate"] == 1
+    assert routes["broken"]["status_codes"] == {"500": routes["broken"]["requests"]}
+    assert sum(routes["ok"]["histogram"].values()) == routes["ok"]["requests"]
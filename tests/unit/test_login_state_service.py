@@ -0,0 +1,111 @@
+"""
+LoginStateService 单元测试（使用fakeredis，不启动pub/sub订阅）
+"""
+import asyncio
+
+import pytest
+
+from config import settings
+from redis_client import RedisClient
+from services.login_state_service import LoginStateService
+from tools.benchmark.load_test import make_fake_redis
+
+
+@pytest.fixture
+def service():
+    client = RedisClient()
+    client.redis_client = make_fake_redis()
+    return LoginStateService(client, pubsub=False)
+
+
+def test_unknown_state_is_expired(service):
+    assert service.get("wechat", "missing")["status"] == "expired"
+
+
+def test_create_and_set(service):
+    assert service.create("wechat", "s1")
+    assert not service.create("wechat", "s1")
+    assert service.get("wechat", "s1")["status"] == "pending"
+
+    assert service.set("wechat", "s1", "success", user_id=7, message="登录成功", access_token="tok")
+
+    info = service.get("wechat", "s1")
+    assert (info["status"], info["user_id"]) == ("success", 7)
+    assert "access_token" not in info
+    assert service.get("auth0", "s1")["status"] == "expired"
+
+
+def test_token_is_released_only_once(service):
+    service.create("wechat", "s1")
+    service.set("wechat", "s1", "success", user_id=7, access_token="tok")
+
+    assert service.claim_token("wechat", "s1") == "tok"
+    assert service.claim_token("wechat", "s1") is None
+    assert service.get("wechat", "s1")["status"] == "success"
+
+
+def test_set_ignores_unknown_state(service):
+    assert not service.set("wechat", "never-issued", "success", user_id=7, access_token="tok")
+
+    assert service.get("wechat", "never-issued")["status"] == "expired"
+    assert service.claim_token("wechat", "never-issued") is None
+
+
+def test_wait_wakes_up_when_callback_completes(service):
+    service.create("wechat", "s1")
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, service.set, "wechat", "s1", "success", 7)
+        start = loop.time()
+        info = await service.wait("wechat", "s1", timeout=5)
+        return info, loop.time() - start
+
+    info, elapsed = asyncio.run(scenario())
+
+    assert info["status"] == "success"
+    assert elapsed < 1
+    assert service._waiters == {}
+
+
+def test_wait_times_out_with_pending(service, monkeypatch):
+    monkeypatch.setattr(settings, "login_state_recheck_seconds", 0.02)
+    service.create("auth0", "s1")
+
+    info = asyncio.run(service.wait("auth0", "s1", timeout=0.1))
+
+    assert info["status"] == "pending"
+
+
+def test_status_endpoint_returns_token_once(service, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from framework.fastapi_app import create_app
+    from services import login_state_service
+
+    monkeypatch.setattr(login_state_service, "login_state_service", service)
+    service.create("wechat", "s1")
+    service.set("wechat", "s1", "success", message="登录成功", access_token="tok")
+    client = TestClient(create_app())
+
+    first = client.get("/api/auth/wechat/status/s1").json()
+    second = client.get("/api/auth/wechat/status/s1").json()
+
+    assert (first["status"], first["access_token"]) == ("success", "tok")
+    assert second["status"] == "success" and not second["access_token"]
+
+
+def test_expired_qr_code_returns_404_detail(service, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from framework.fastapi_app import create_app
+    from services import login_state_service
+
+    monkeypatch.setattr(login_state_service, "login_state_service", service)
+    client = TestClient(create_app())
+
+    response = client.get("/api/auth/wechat/qr/missing")
+    unknown = client.get("/static/no-such-file.js")
+
+    assert (response.status_code, response.json()) == (404, {"detail": "二维码已过期"})
+    assert (unknown.status_code, unknown.json()) == (404, {"message": "接口不存在", "success": False})
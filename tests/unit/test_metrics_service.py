@@ -0,0 +1,96 @@
+"""
+MetricsService 单元测试
+"""
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from config import settings
+from framework.fastapi_app import create_app
+from framework.schemas import ImageConvertRequest
+from services.image_service import ImageService
+from services.metrics_service import (
+    PROMETHEUS_AVAILABLE, StageTimer, format_label, get_metrics_service, size_bucket
+)
+
+pytestmark = pytest.mark.skipif(not PROMETHEUS_AVAILABLE, reason="prometheus_client未安装")
+
+
+def sample(name, **labels):
+    return get_metrics_service().registry.get_sample_value(name, labels) or 0
+
+
+def test_size_bucket_boundaries():
+    assert size_bucket((64, 64)) == "lt_0.25mp"
+    assert size_bucket((1920, 1080)) == "1_4mp"
+    assert size_bucket((8660, 5774)) == "gt_16mp"
+    assert size_bucket(None) == "unknown"
+
+
+def test_format_label_limits_cardinality():
+    assert format_label("jpg") == "JPEG"
+    assert format_label("WEBP") == "WEBP"
+    assert format_label("../../etc/passwd") == "other"
+    assert format_label(None) == "other"
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    for _ in range(3):
+        with timer.stage("resize"):
+            pass
+    assert set(timer.stages) == {"resize"}
+    assert timer.stages["resize"] >= 0
+
+
+def test_conversion_records_stage_histograms_and_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+    source = tmp_path / "metrics.png"
+    Image.new("RGB", (300, 200), (1, 2, 3)).save(source)
+    labels = {"source_format": "PNG", "target_format": "JPEG", "size_bucket": "lt_0.25mp"}
+    before = {stage: sample("image_conversion_stage_seconds_count", stage=stage, **labels)
+              for stage in ("decode", "resize", "encode", "total")}
+    bytes_in = sample("image_conversion_bytes_total", direction="in", format="PNG")
+
+    request = ImageConvertRequest(target_format="JPEG", resize={"width": 100})
+    success, _, error = ImageService(None).convert_image(str(source), "JPEG", None, request)
+
+    assert success, error
+    for stage, count in before.items():
+        assert sample("image_conversion_stage_seconds_count", stage=stage, **labels) == count + 1
+    assert sample("image_conversion_bytes_total", direction="in", format="PNG") == bytes_in + source.stat().st_size
+    assert sample("image_conversions_in_progress") == 0
+
+
+def test_failed_conversion_is_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+    source = tmp_path / "broken.png"
+    source.write_bytes(b"not an image")
+    before = sample("image_conversion_failures_total", source_format="PNG", target_format="WEBP")
+
+    success, _, _ = ImageService(None).convert_image(str(source), "WEBP", None, ImageConvertRequest(target_format="WEBP"))
+
+    assert not success
+    assert sample("image_conversion_failures_total", source_format="PNG", target_format="WEBP") == before + 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    response = TestClient(create_app()).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "image_conversions_in_progress" in response.text
+
+
+def test_unknown_target_format_failure_uses_other_label(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+    source = tmp_path / "ok.png"
+    Image.new("RGB", (10, 10)).save(source)
+    before = sample("image_conversion_failures_total", source_format="PNG", target_format="other")
+
+    success, _, _ = ImageService(None).convert_image(str(source), "x-random-123", None,
+                                                      ImageConvertRequest(target_format="x-random-123"))
+
+    assert not success
+    assert sample("image_conversion_failures_total", source_format="PNG", target_format="other") == before + 1
+    assert sample("image_conversion_failures_total", source_format="PNG", target_format="X-RANDOM-123") == 0
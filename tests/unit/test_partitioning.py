@@ -0,0 +1,73 @@
+"""
+conversion_records 月分区维护单元测试（分区规划 + SQLite上的保留期清理）
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from models import ConversionRecord, User
+from tools import scheduler
+from tools.database import database
+from tools.database.partitioning import (
+    add_months, ensure_future_partitions, month_range, partition_by_clause,
+    plan_expired_partitions, plan_future_partitions
+)
+
+
+def test_month_arithmetic_crosses_years():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert month_range(datetime(2025, 12, 15, 8), date(2026, 2, 1)) == [date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)]
+
+
+def test_partition_by_clause():
+    clause = partition_by_clause([date(2025, 12, 1), date(2026, 1, 1)])
+
+    assert clause == (
+        "PARTITION BY RANGE COLUMNS(created_at) ("
+        "PARTITION p202512 VALUES LESS THAN ('2026-01-01'), "
+        "PARTITION p202601 VALUES LESS THAN ('2026-02-01'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+
+
+def test_plan_future_partitions_fills_gap_up_to_horizon():
+    partitions = ["p202601", "p202602", "pmax"]
+
+    assert plan_future_partitions(partitions, date(2026, 2, 20), 2) == [date(2026, 3, 1), date(2026, 4, 1)]
+    assert plan_future_partitions(partitions, date(2025, 12, 20), 2) == []
+    assert plan_future_partitions(["pmax"], date(2026, 2, 20), 0) == [date(2026, 2, 1)]
+
+
+def test_plan_expired_partitions_only_whole_months():
+    partitions = ["p202511", "p202512", "p202601", "pmax"]
+
+    assert plan_expired_partitions(partitions, datetime(2026, 1, 1, 0, 0)) == ["p202511", "p202512"]
+    assert plan_expired_partitions(partitions, datetime(2025, 12, 31, 23, 59)) == ["p202511"]
+
+
+def test_cleanup_on_unpartitioned_database_deletes_rows(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+
+    db = factory()
+    db.add(User(username="a", email="a@example.com"))
+    db.flush()
+    now = datetime.now()
+    for days in (1, settings.conversion_record_retention_days + 1):
+        db.add(ConversionRecord(user_id=1, original_filename="a.png", original_format="PNG", target_format="WEBP",
+                                file_size=1, conversion_time=0.1, created_at=now - timedelta(days=days)))
+    db.commit()
+
+    scheduler.cleanup_old_records()
+    scheduler.maintain_conversion_partitions()
+
+    assert db.query(ConversionRecord).count() == 1
+    with engine.connect() as conn:
+        assert ensure_future_partitions(conn, 3) == []
+    db.close()
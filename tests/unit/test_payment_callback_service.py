@@ -0,0 +1,100 @@
+"""
+PaymentCallbackService 单元测试（SQLite + fakeredis）
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from models import PaymentMethod, PaymentRecord, PaymentStatus, User, UserRole
+from redis_client import RedisClient
+from services.payment_callback_service import (
+    APPLIED, DUPLICATE, IN_PROGRESS, PROCESSING, PaymentCallbackService,
+)
+from tools.benchmark.load_test import make_fake_redis
+from tools.database.database import Base
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    db = sessionmaker(bind=engine)()
+    user = User(username="payer", email="payer@example.com", role=UserRole.FREE)
+    db.add(user)
+    db.flush()
+    db.add(PaymentRecord(user_id=user.id, order_id="ORDER1", amount=29.9,
+                         payment_method=PaymentMethod.WECHAT, target_role=UserRole.VIP))
+    db.commit()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def service():
+    client = RedisClient()
+    client.redis_client = make_fake_redis()
+    return PaymentCallbackService(client)
+
+
+def count_updates(engine) -> list:
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            statements.append(statement)
+
+    return statements
+
+
+def test_success_upgrades_role_once(engine, db, service):
+    updates = count_updates(engine)
+
+    results = [service.handle_success(db, "ORDER1", "TX1") for _ in range(5)]
+
+    assert results == [APPLIED] + [DUPLICATE] * 4
+    # 重复通知在Redis层被拦截，不再访问数据库
+    assert len(updates) == 2
+    db.expire_all()
+    payment = db.query(PaymentRecord).filter_by(order_id="ORDER1").one()
+    assert payment.status == PaymentStatus.SUCCESS
+    assert payment.transaction_id == "TX1"
+    assert db.query(User).filter_by(username="payer").one().role == UserRole.VIP
+
+
+def test_notification_being_processed_asks_gateway_to_retry(db, service):
+    service.redis.set("payment_callback:ORDER1:TX1", PROCESSING, ex=60)
+
+    assert service.handle_success(db, "ORDER1", "TX1") == IN_PROGRESS
+
+
+def test_conditional_update_is_idempotent_without_redis(db, service):
+    # Redis不可用时每个通知都会走到数据库，条件UPDATE只匹配第一次
+    assert service.apply_success(db, "ORDER1", "TX1") is True
+    assert service.apply_success(db, "ORDER1", "TX1") is False
+    assert service.apply_success(db, "MISSING", "TX2") is False
+
+
+def test_late_failure_does_not_override_success(db, service):
+    service.handle_success(db, "ORDER1", "TX1")
+
+    assert service.apply_failure(db, "ORDER1") is False
+    db.expire_all()
+    assert db.query(PaymentRecord).filter_by(order_id="ORDER1").one().status == PaymentStatus.SUCCESS
+
+
+def test_failed_processing_releases_claim(db, service, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(service, "apply_success", broken)
+    with pytest.raises(RuntimeError):
+        service.handle_success(db, "ORDER1", "TX1")
+    monkeypatch.undo()
+
+    assert service.handle_success(db, "ORDER1", "TX1") == APPLIED
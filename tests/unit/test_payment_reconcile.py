@@ -0,0 +1,119 @@
+"""
+待支付订单对账任务单元测试（SQLite + fakeredis + 本地支付网关桩）
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from models import PaymentMethod, PaymentRecord, PaymentStatus, User, UserRole
+from redis_client import get_redis
+from services import http_client_service
+from services.http_client_service import HttpClientRegistry, UpstreamConfig
+from tools import scheduler
+from tools.benchmark.load_test import make_fake_redis
+from tools.benchmark.wechat_pay_stub import WeChatPayStub
+from tools.database import database
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    monkeypatch.setattr(get_redis(), "redis_client", make_fake_redis())
+    monkeypatch.setattr(get_redis(), "_unavailable_until", 0.0)
+    return factory
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    for name, value in (("wechat_api_key", "test-key"), ("wechat_app_id", "wx-app"), ("wechat_mch_id", "1900000001")):
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(settings, "payment_reconcile_batch_size", 2)
+    stub = WeChatPayStub()
+    registry = HttpClientRegistry(upstreams={})
+    registry.register("wechat_pay", UpstreamConfig(retries=0), transport=httpx.ASGITransport(app=stub.app))
+    monkeypatch.setattr(http_client_service, "http_client_registry", registry)
+    return stub
+
+
+def seed(factory, stub):
+    """订单号 -> (创建于多久之前, 支付方式, 网关上的状态)"""
+    orders = {
+        "PAID": (timedelta(minutes=10), PaymentMethod.WECHAT, "paid"),
+        "STALE": (timedelta(hours=3), PaymentMethod.WECHAT, "notpay"),
+        "WAITING": (timedelta(minutes=10), PaymentMethod.WECHAT, "notpay"),
+        "MISSING": (timedelta(hours=3), PaymentMethod.WECHAT, None),
+        "FRESH": (timedelta(minutes=1), PaymentMethod.WECHAT, "notpay"),
+        "ALIPAY": (timedelta(hours=3), PaymentMethod.ALIPAY, None),
+    }
+    db = factory()
+    user = User(username="payer", email="payer@example.com", role=UserRole.FREE)
+    db.add(user)
+    db.flush()
+    for order_id, (age, method, gateway_state) in orders.items():
+        db.add(PaymentRecord(user_id=user.id, order_id=order_id, amount=29.9, payment_method=method,
+                             target_role=UserRole.VIP, created_at=NOW - age))
+        if gateway_state:
+            stub.unified_order({"out_trade_no": order_id, "total_fee": "2990"})
+        if gateway_state == "paid":
+            stub.pay(order_id)
+    db.commit()
+    db.close()
+
+
+def test_reconcile_converges_pending_orders(session_factory, stub):
+    seed(session_factory, stub)
+
+    stats = asyncio.run(scheduler.reconcile_pending_payments_async(now=NOW))
+
+    assert stats == {"paid": 1, "cancelled": 2, "pending": 1}
+    db = session_factory()
+    statuses = {p.order_id: p.status for p in db.query(PaymentRecord)}
+    assert statuses == {
+        "PAID": PaymentStatus.SUCCESS,
+        "STALE": PaymentStatus.CANCELLED,
+        "WAITING": PaymentStatus.PENDING,
+        "MISSING": PaymentStatus.CANCELLED,
+        "FRESH": PaymentStatus.PENDING,
+        "ALIPAY": PaymentStatus.PENDING,
+    }
+    assert db.query(User).one().role == UserRole.VIP
+    assert stub.orders["STALE"]["trade_state"] == "CLOSED"
+    db.close()
+
+    # 第二轮只剩仍在等待支付的订单
+    assert asyncio.run(scheduler.reconcile_pending_payments_async(now=NOW)) == {"pending": 1}
+
+
+def test_failing_order_does_not_block_later_orders(session_factory, stub, monkeypatch):
+    seed(session_factory, stub)
+    stub.pay("STALE")  # 最早的订单，每次更新都失败
+    callback_service = scheduler.get_payment_callback_service()
+    handle_success = callback_service.handle_success
+
+    def failing_handle_success(db, order_id, transaction_id):
+        if order_id == "STALE":
+            raise RuntimeError("db down")
+        return handle_success(db, order_id, transaction_id)
+
+    monkeypatch.setattr(callback_service, "handle_success", failing_handle_success)
+
+    stats = asyncio.run(scheduler.reconcile_pending_payments_async(now=NOW))
+
+    assert stats == {"error": 1, "paid": 1, "cancelled": 1, "pending": 1}
+    db = session_factory()
+    statuses = {p.order_id: p.status for p in db.query(PaymentRecord)}
+    assert statuses["STALE"] == PaymentStatus.PENDING
+    assert statuses["MISSING"] == PaymentStatus.CANCELLED
+    assert statuses["PAID"] == PaymentStatus.SUCCESS
+    db.close()
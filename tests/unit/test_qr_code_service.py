@@ -0,0 +1,37 @@
+"""
+QRCodeService 单元测试
+"""
+import asyncio
+import io
+
+from PIL import Image
+
+from services.qr_code_service import QRCodeService
+
+
+def test_render_is_cached_by_content():
+    service = QRCodeService(cache_size=4)
+
+    png = service.render_png("https://example.com/login?state=a")
+
+    assert Image.open(io.BytesIO(png)).format == "PNG"
+    assert service.render_png("https://example.com/login?state=a") is png
+    assert service.render_png("https://example.com/login?state=b") != png
+
+
+def test_cache_is_bounded():
+    service = QRCodeService(cache_size=2)
+    for state in "abc":
+        service.render_png(f"https://example.com/?state={state}")
+
+    assert service.get_cached("https://example.com/?state=a") is None
+    assert service.get_cached("https://example.com/?state=c") is not None
+
+
+def test_async_render_shares_cache():
+    service = QRCodeService(cache_size=4)
+
+    png = asyncio.run(service.render_png_async("https://example.com/?state=a"))
+
+    assert service.render_png("https://example.com/?state=a") is png
+    assert service.to_data_uri(png).startswith("data:image/png;base64,iVBOR")
@@ -0,0 +1,51 @@
+"""
+热点查询执行计划检查与每日用量查询单元测试（SQLite）
+"""
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from models import DailyUsage, User
+from services.user_service import UserService
+from tools.database import database
+from tools.database.query_plan_check import check_queries
+
+
+def make_engine():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_all_hot_queries_use_indexes():
+    results = check_queries(make_engine())
+
+    assert [result["name"] for result in results if result["full_scans"]] == []
+
+
+def test_missing_index_is_reported():
+    engine = make_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_payment_records_user_created_at"))
+
+    failed = {result["name"]: result["full_scans"] for result in check_queries(engine) if result["full_scans"]}
+
+    assert list(failed) == ["user_payments"]
+    assert failed["user_payments"][0].startswith("SCAN payment_records")
+
+
+def test_daily_usage_is_one_row_per_user_and_date():
+    db = sessionmaker(bind=make_engine())()
+    db.add(User(username="a", email="a@example.com"))
+    db.commit()
+    service = UserService(db)
+
+    service.increment_daily_usage(1)
+    service.increment_daily_usage(1)
+    yesterday = service.get_daily_usage(1, date(2020, 1, 1))
+
+    rows = db.query(DailyUsage).order_by(DailyUsage.usage_date).all()
+    assert [(row.usage_date, row.usage_count) for row in rows] == [(date(2020, 1, 1), 0), (date.today(), 2)]
+    assert yesterday.id == rows[0].id
+    db.close()
@@ -0,0 +1,70 @@
+"""
+ORJSONResponse / ORJSONRoute 单元测试
+"""
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from framework.responses import ORJSONResponse, ORJSONRoute
+
+
+class Item(BaseModel):
+    name: str
+    created_at: datetime
+
+
+def make_client(monkeypatch) -> tuple:
+    rendered = []
+    original = ORJSONResponse.render
+    monkeypatch.setattr(ORJSONResponse, "render", lambda self, content: rendered.append(content) or original(self, content))
+
+    router = APIRouter(route_class=ORJSONRoute)
+
+    @router.get("/dict")
+    async def as_dict():
+        return {"名称": "转换", "at": datetime(2026, 1, 1, tzinfo=timezone.utc)}
+
+    @router.get("/models", response_model=list[Item])
+    async def as_models():
+        return [Item(name="a", created_at=datetime(2026, 1, 1))]
+
+    @router.get("/text", response_class=PlainTextResponse)
+    async def as_text():
+        return "ok"
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app), rendered
+
+
+def test_dict_routes_use_orjson(monkeypatch):
+    client, rendered = make_client(monkeypatch)
+
+    response = client.get("/api/dict")
+
+    assert response.content == '{"名称":"转换","at":"2026-01-01T00:00:00+00:00"}'.encode()
+    assert len(rendered) == 1
+
+
+def test_response_model_routes_keep_pydantic_serialization(monkeypatch):
+    client, rendered = make_client(monkeypatch)
+
+    assert client.get("/api/models").json() == [{"name": "a", "created_at": "2026-01-01T00:00:00"}]
+    assert rendered == []
+
+
+def test_explicit_response_class_is_kept(monkeypatch):
+    client, _ = make_client(monkeypatch)
+
+    response = client.get("/api/text")
+
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_render_pydantic_model_directly():
+    body = ORJSONResponse(Item(name="b", created_at=datetime(2026, 1, 1))).body
+
+    assert body == b'{"name":"b","created_at":"2026-01-01T00:00:00"}'
@@ -0,0 +1,92 @@
+"""
+SessionService 单元测试（使用fakeredis）
+"""
+import time
+
+import fakeredis
+import pytest
+
+from config import settings
+from redis_client import RedisClient
+from services.session_service import REVOKED_TOKENS_KEY, BloomFilter, SessionService
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """记录zscore调用次数，用于确认未吊销的令牌不访问Redis"""
+
+    def __init__(self):
+        super().__init__(decode_responses=True)
+        self.zscore_calls = 0
+
+    def zscore(self, key, member):
+        self.zscore_calls += 1
+        return super().zscore(key, member)
+
+
+@pytest.fixture
+def backend():
+    return CountingRedis()
+
+
+def make_service(backend) -> SessionService:
+    client = RedisClient()
+    client.redis_client = backend
+    return SessionService(client)
+
+
+def payload(jti: str, sub: str = "alice", ttl: float = 600) -> dict:
+    return {"sub": sub, "jti": jti, "exp": int(time.time() + ttl)}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_not_revoked_tokens_skip_redis(backend):
+    service = make_service(backend)
+
+    assert not service.is_revoked(payload("a"))
+    assert not service.is_revoked({"sub": "alice", "exp": time.time() + 60})
+    assert backend.zscore_calls == 0
+
+
+def test_revoke_token_is_seen_by_other_processes(backend, monkeypatch):
+    monkeypatch.setattr(settings, "token_revocation_sync_seconds", 0.0)
+    service, other = make_service(backend), make_service(backend)
+    token = payload("a")
+
+    assert not other.is_revoked(token)
+    assert service.revoke_token(token)
+
+    assert service.is_revoked(token)
+    assert other.is_revoked(token)
+    assert not other.is_revoked(payload("b"))
+    assert 0 < backend.ttl(REVOKED_TOKENS_KEY) <= 601
+
+
+def test_expired_tokens_are_not_recorded(backend):
+    service = make_service(backend)
+
+    assert not service.revoke_token(payload("old", ttl=-1))
+    assert backend.zrangebyscore(REVOKED_TOKENS_KEY, "-inf", "+inf") == []
+
+
+def test_revoke_user_sessions(backend):
+    service = make_service(backend)
+    service.register("alice", "a1", time.time() + 600)
+    service.register("alice", "a2", time.time() + 600)
+    service.register("bob", "b1", time.time() + 600)
+
+    assert service.revoke_user_sessions("alice", "1") == 2
+
+    assert service.is_revoked(payload("a1"))
+    assert service.is_revoked(payload("a2"))
+    assert not service.is_revoked(payload("b1", sub="bob"))
+    assert service.revoke_user_sessions("alice") == 0
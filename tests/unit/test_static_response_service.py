@@ -0,0 +1,51 @@
+"""
+预计算响应服务单元测试
+"""
+import json
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from framework.fastapi_app import create_app
+from models import UserRole
+from services.permission_service import PermissionService
+from services.static_response_service import StaticResponseService, get_static_response_service
+
+
+def test_payloads_match_permission_service():
+    service = get_static_response_service()
+
+    for role in UserRole:
+        assert json.loads(service.get(f"role_benefits:{role.value}").body) == PermissionService.get_role_benefits(role)
+        assert json.loads(service.get(f"upgrade_options:{role.value}").body) == PermissionService.get_upgrade_options(role)
+    assert [option["target_role"] for option in PermissionService.get_upgrade_options(UserRole.FREE)] == ["vip", "svip"]
+    assert PermissionService.get_upgrade_options(UserRole.SVIP) == []
+
+
+def test_reload_picks_up_settings_changes(monkeypatch):
+    service = StaticResponseService()
+    service.register("price", lambda: {"vip": settings.vip_price}, private=True)
+    before = service.get("price")
+
+    monkeypatch.setattr(settings, "vip_price", settings.vip_price + 10)
+    assert service.get("price") is before
+    service.reload()
+
+    after = service.get("price")
+    assert after.etag != before.etag
+    assert after.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_formats_endpoint_serves_etag_and_not_modified():
+    client = TestClient(create_app())
+
+    response = client.get("/api/image/formats")
+    assert response.status_code == 200
+    assert response.content == get_static_response_service().get("image_formats").body
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+    cached = client.get("/api/image/formats", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
@@ -0,0 +1,84 @@
+"""
+TokenService 单元测试
+"""
+import time
+
+import pytest
+from jose import jwt as jose_jwt
+
+from config import settings
+from services.token_service import (
+    HmacBackend, JoseBackend, TokenError, TokenExpiredError, TokenService, key_id
+)
+
+
+@pytest.fixture(params=[HmacBackend, JoseBackend], ids=["hmac", "jose"])
+def service(request, monkeypatch):
+    monkeypatch.setattr(settings, "secret_key", "current-secret-key-for-tests-0001")
+    monkeypatch.setattr(settings, "jwt_previous_secret_keys", [])
+    return TokenService(request.param(), cache_size=2)
+
+
+def test_verify_caches_claims_until_exp(service, monkeypatch):
+    token = service.create_token({"sub": "alice", "exp": int(time.time()) + 60})
+
+    assert service.verify(token)["sub"] == "alice"
+    assert service.verify(token)["sub"] == "alice"
+    assert (service.misses, service.hits) == (1, 1)
+
+    # 缓存命中也要遵守exp
+    monkeypatch.setattr(time, "time", lambda: 4_000_000_000)
+    with pytest.raises(TokenExpiredError):
+        service.verify(token)
+
+
+def test_returned_claims_do_not_alias_cache(service):
+    token = service.create_token({"sub": "alice"})
+    service.verify(token)["sub"] = "mallory"
+    assert service.verify(token)["sub"] == "alice"
+
+
+def test_lru_is_bounded(service):
+    tokens = [service.create_token({"sub": f"u{i}"}) for i in range(3)]
+    for token in tokens:
+        service.verify(token)
+    assert len(service._cache) == 2
+
+
+def test_tampered_and_foreign_tokens_are_rejected(service):
+    token = service.create_token({"sub": "alice"})
+    header, payload, signature = token.split(".")
+    forged_payload = jose_jwt.encode({"sub": "admin"}, "x").split(".")[1]
+
+    for bad in (f"{header}.{forged_payload}.{signature}", "not-a-jwt", token + "x",
+                jose_jwt.encode({"sub": "alice"}, "some-other-secret", algorithm="HS256")):
+        with pytest.raises(TokenError):
+            service.verify(bad)
+
+
+def test_none_algorithm_is_rejected(service):
+    # 头部为 {"alg":"none"}，签名为空
+    unsigned = "eyJhbGciOiJub25lIn0." + service.create_token({"sub": "admin"}).split(".")[1] + "."
+    with pytest.raises(TokenError):
+        service.verify(unsigned)
+
+
+def test_key_rotation_accepts_previous_key_until_retired(service, monkeypatch):
+    old_token = service.create_token({"sub": "alice"})
+    legacy_token = jose_jwt.encode({"sub": "bob"}, settings.secret_key, algorithm="HS256")  # 无kid
+    assert service.verify(old_token)["sub"] == "alice"
+
+    monkeypatch.setattr(settings, "jwt_previous_secret_keys", [settings.secret_key])
+    monkeypatch.setattr(settings, "secret_key", "rotated-secret-key-for-tests-0002")
+    new_token = service.create_token({"sub": "carol"})
+
+    assert jose_jwt.get_unverified_header(new_token)["kid"] == key_id("rotated-secret-key-for-tests-0002")
+    assert service.verify(old_token)["sub"] == "alice"
+    assert service.verify(legacy_token)["sub"] == "bob"
+    assert service.verify(new_token)["sub"] == "carol"
+
+    # 旧密钥下线后，即使已缓存也立即失效
+    monkeypatch.setattr(settings, "jwt_previous_secret_keys", [])
+    with pytest.raises(TokenError):
+        service.verify(old_token)
+    assert service.verify(new_token)["sub"] == "carol"
@@ -0,0 +1,87 @@
+"""
+链路追踪服务与 Server-Timing 响应头的单元测试
+"""
+import contextvars
+import io
+import logging
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from config import settings
+from framework.fastapi_app import create_app
+from services.tracing_service import get_current_trace, log_slow_request, span, trace_request, traced
+
+
+def in_new_context(func):
+    """每个用例在独立的上下文中运行，避免追踪状态泄漏到其他用例"""
+    return lambda *args, **kwargs: contextvars.Context().run(func, *args, **kwargs)
+
+
+@in_new_context
+def test_span_is_noop_without_active_trace():
+    with span("outside"):
+        pass
+    assert get_current_trace() is None
+
+
+@in_new_context
+def test_spans_are_nested_and_summarized():
+    @traced("db.commit")
+    def commit():
+        return "ok"
+
+    with trace_request("POST", "/x") as trace:
+        with span("image.encode"):
+            assert commit() == "ok"
+        with span("image.encode"):
+            pass
+
+    summary = trace.summary()
+    assert list(summary) == ["db.commit", "image.encode"]
+    assert summary["image.encode"]["count"] == 2
+    assert trace.spans[0].parent.name == "image.encode"
+    header = trace.server_timing(total_ms=12.345)
+    assert header.startswith("db.commit;dur=")
+    assert header.endswith("total;dur=12.3")
+
+
+def test_trace_is_reset_when_request_finishes():
+    with trace_request("GET", "/outer") as outer:
+        with trace_request("GET", "/inner") as inner:
+            assert get_current_trace() is inner
+        assert get_current_trace() is outer
+    assert get_current_trace() is None
+
+
+def test_slow_request_log_respects_threshold_and_sampling(monkeypatch, caplog):
+    with trace_request("GET", "/slow") as trace:
+        pass
+    monkeypatch.setattr(settings, "slow_request_threshold_ms", 100.0)
+    monkeypatch.setattr(settings, "slow_request_sample_rate", 1.0)
+
+    with caplog.at_level(logging.WARNING, logger="slow_request"):
+        assert log_slow_request(trace, 200, 50) is False
+        assert log_slow_request(trace, 200, 150) is True
+    assert '"path": "/slow"' in caplog.text
+
+    monkeypatch.setattr(settings, "slow_request_sample_rate", 0.0)
+    assert log_slow_request(trace, 200, 150) is False
+
+
+def test_convert_response_has_server_timing_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (10, 20, 30)).save(buffer, format="PNG")
+
+    response = TestClient(create_app()).post(
+        "/api/image/convert",
+        files={"file": ("a.png", buffer.getvalue(), "image/png")},
+        data={"target_format": "webp", "resize_width": "32"},
+    )
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    for name in ("upload.read", "upload.write", "image.decode", "image.resize", "image.encode",
+                 "image.inspect", "response.build", "total"):
+        assert f"{name};dur=" in timing
@@ -0,0 +1,134 @@
+"""
+微信支付XML/签名工具和异步客户端单元测试，网关使用本地桩（ASGITransport，不经过网络）
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from services import http_client_service
+from services.http_client_service import HttpClientRegistry, UpstreamConfig
+from services.wechat_pay_service import (
+    WeChatPayService, XmlDictParser, dict_to_xml, sign_params, verify_sign, xml_to_dict,
+)
+from tools.benchmark.wechat_pay_stub import WeChatPayStub
+
+API_KEY = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = WeChatPayStub(api_key=API_KEY, app_id="wx-app", mch_id="1900000001")
+    registry = HttpClientRegistry(upstreams={})
+    for name in ("wechat_pay", "wechat_pay_cert"):
+        registry.register(name, UpstreamConfig(retries=0), transport=httpx.ASGITransport(app=stub.app))
+    monkeypatch.setattr(http_client_service, "http_client_registry", registry)
+    return stub
+
+
+@pytest.fixture
+def service():
+    service = WeChatPayService()
+    service.api_key = API_KEY
+    service.app_id = "wx-app"
+    service.mch_id = "1900000001"
+    return service
+
+
+def test_xml_round_trip_escapes_cdata_terminator():
+    params = {"body": "会员 <VIP> & ]]> 结尾", "total_fee": 2990, "empty": ""}
+
+    xml = dict_to_xml(params)
+
+    assert xml_to_dict(xml) == {"body": "会员 <VIP> & ]]> 结尾", "total_fee": "2990", "empty": ""}
+
+
+def test_dict_to_xml_rejects_invalid_tag():
+    with pytest.raises(ValueError):
+        dict_to_xml({"bad tag": "x"})
+
+
+def test_parser_rejects_entity_declarations():
+    xml = '<?xml version="1.0"?><!DOCTYPE xml [<!ENTITY a "aaaa">]><xml><body>&a;</body></xml>'
+
+    with pytest.raises(ValueError):
+        xml_to_dict(xml)
+
+
+def test_parser_accepts_chunks_and_enforces_size_limit():
+    xml = dict_to_xml({"out_trade_no": "ORDER1", "nested": "x"}).encode()
+    parser = XmlDictParser()
+    for i in range(0, len(xml), 7):
+        parser.feed(xml[i:i + 7])
+    assert parser.close()["out_trade_no"] == "ORDER1"
+
+    with pytest.raises(ValueError):
+        XmlDictParser(max_bytes=16).feed(xml)
+
+
+def test_sign_params_supports_md5_and_hmac_sha256():
+    params = {"appid": "wx-app", "nonce_str": "abc", "empty": "", "sign": "ignored"}
+    md5_sign = sign_params(params, API_KEY)
+    hmac_sign = sign_params({**params, "sign_type": "HMAC-SHA256"}, API_KEY)
+
+    assert len(md5_sign) == 32 and md5_sign.isupper()
+    assert len(hmac_sign) == 64
+    assert verify_sign({**params, "sign": md5_sign}, API_KEY)
+    assert not verify_sign({**params, "sign": md5_sign}, "other-key")
+    assert not verify_sign({"appid": "wx-app"}, API_KEY)
+
+
+def test_unified_order_query_and_close_against_stub(stub, service):
+    async def scenario():
+        created = await service.create_unified_order("ORDER1", 2990, "高级会员")
+        queried = await service.query_order("ORDER1")
+        closed = await service.close_order("ORDER1")
+        duplicate = await service.create_unified_order("ORDER1", 2990, "高级会员")
+        return created, queried, closed, duplicate
+
+    created, queried, closed, duplicate = asyncio.run(scenario())
+
+    assert created["success"] and created["code_url"].startswith("weixin://")
+    assert queried["success"] and queried["trade_state"] == "NOTPAY"
+    assert closed == {"success": True}
+    assert not duplicate["success"]
+    assert stub.orders["ORDER1"]["trade_state"] == "CLOSED"
+
+
+def test_gateway_rejects_wrong_signature(stub, service):
+    service.api_key = "wrong-key"
+
+    result = asyncio.run(service.create_unified_order("ORDER2", 100, "test"))
+
+    assert not result["success"]
+    assert result["return_msg"] == "签名错误"
+    assert "ORDER2" not in stub.orders
+
+
+def test_tampered_response_signature_is_rejected(stub, service):
+    asyncio.run(service.create_unified_order("ORDER3", 100, "test"))
+    original = stub._sign_xml
+    stub._sign_xml = lambda params: original(params).replace("NOTPAY", "SUCCESS")
+
+    result = asyncio.run(service.query_order("ORDER3"))
+
+    assert not result["success"]
+    assert "签名" in result["error"]
+
+
+def test_paid_notify_verifies_and_refund_succeeds(stub, service, monkeypatch):
+    monkeypatch.setattr("services.wechat_pay_service.settings.wechat_cert_path", "cert.pem")
+    monkeypatch.setattr("services.wechat_pay_service.settings.wechat_key_path", "key.pem")
+
+    async def scenario():
+        await service.create_unified_order("ORDER4", 2990, "高级会员")
+        notify_xml = stub.pay("ORDER4")
+        refund = await service.create_refund("ORDER4", "REFUND4", 2990, 2990)
+        return notify_xml, refund
+
+    notify_xml, refund = asyncio.run(scenario())
+    notify = service.verify_notify(notify_xml)
+
+    assert notify["success"] and notify["out_trade_no"] == "ORDER4" and notify["total_fee"] == 2990
+    assert refund["success"] and refund["out_refund_no"] == "REFUND4"
+    assert not service.verify_notify(notify_xml.replace("2990", "1"))["success"]
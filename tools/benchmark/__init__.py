@@ -0,0 +1,3 @@
+"""
+tools.benchmark模块 - 性能基准测试
+"""
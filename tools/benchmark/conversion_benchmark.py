@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+图片转换基准测试 - 离线直接调用 ImageService.convert_image
+
+在生成的测试图片集（从图标到5000万像素，JPEG/PNG/WEBP/GIF/TIFF，含/不含透明通道）上
+逐场景测量吞吐量、p50/p99延迟、峰值内存(RSS)和输出字节数，结果写入JSON，
+并可与已保存的基线对比，发现性能回退时以非零状态码退出（可用于CI门禁）。
+
+用法:
+    python tools/benchmark/conversion_benchmark.py                       # quick档位，结果写入 results/latest.json
+    python tools/benchmark/conversion_benchmark.py --profile full        # 包含1200万/5000万像素场景
+    python tools/benchmark/conversion_benchmark.py --baseline tools/benchmark/baseline.json
+    python tools/benchmark/conversion_benchmark.py --update-baseline     # 用本次结果覆盖基线
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from PIL import Image
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# 图片尺寸及每个场景的测量次数（大图次数少，避免单次运行过久）
+SIZES = {
+    "icon_64": {"size": (64, 64), "iterations": 50},
+    "thumb_512": {"size": (512, 512), "iterations": 20},
+    "fhd_1920x1080": {"size": (1920, 1080), "iterations": 5},
+    "photo_12mp": {"size": (4000, 3000), "iterations": 3},
+    "photo_50mp": {"size": (8660, 5774), "iterations": 2},
+}
+
+PROFILES = {
+    "quick": ["icon_64", "thumb_512", "fhd_1920x1080"],
+    "full": list(SIZES),
+}
+
+# 源图片: 名称 -> (格式, 扩展名, 是否带透明通道)
+SOURCES = {
+    "jpeg_rgb": ("JPEG", "jpg", False),
+    "png_rgb": ("PNG", "png", False),
+    "png_rgba": ("PNG", "png", True),
+    "webp_rgba": ("WEBP", "webp", True),
+    "gif_alpha": ("GIF", "gif", True),
+    "tiff_rgb": ("TIFF", "tiff", False),
+}
+
+# 每个源图片转换到的目标格式
+TARGET_FORMATS = ["JPEG", "WEBP"]
+
+# 回退判定阈值：当前值 / 基线值 超过该比例即视为回退
+DEFAULT_THRESHOLDS = {
+    "p50_ms": 1.20,
+    "p99_ms": 1.30,
+    "peak_rss_mb": 1.20,
+    "output_bytes": 1.05,
+}
+
+
+def build_scenarios(profile: str) -> List[Dict]:
+    """按档位生成场景列表"""
+    scenarios = []
+    for size_name in PROFILES[profile]:
+        for source_name in SOURCES:
+            for target_format in TARGET_FORMATS:
+                scenarios.append({
+                    "name": f"{size_name}/{source_name}->{target_format.lower()}",
+                    "size_name": size_name,
+                    "source": source_name,
+                    "target_format": target_format,
+                    "iterations": SIZES[size_name]["iterations"],
+                })
+    return scenarios
+
+
+def make_source_image(size, alpha: bool) -> Image.Image:
+    """生成带渐变和噪声的图片，比纯噪声更接近照片的可压缩性"""
+    base = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 24)
+    rgb = Image.merge("RGB", [base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+    if alpha:
+        mask = Image.radial_gradient("L").resize(size)
+        rgb.putalpha(Image.eval(mask, lambda value: 255 - value))
+    return rgb
+
+
+def generate_corpus(corpus_dir: str, size_names: List[str]) -> Dict[str, str]:
+    """生成测试图片集，已存在的文件直接复用，返回 {size/source: 路径}"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpus = {}
+    for size_name in size_names:
+        size = SIZES[size_name]["size"]
+        images = {}
+        for source_name, (fmt, extension, alpha) in SOURCES.items():
+            path = os.path.join(corpus_dir, f"{size_name}_{source_name}.{extension}")
+            corpus[f"{size_name}/{source_name}"] = path
+            if os.path.exists(path):
+                continue
+
+            if alpha not in images:
+                images[alpha] = make_source_image(size, alpha)
+            img = images[alpha]
+            if fmt == "GIF":
+                # GIF只有1位透明度：调色板量化后把半透明以下的像素设为透明色
+                paletted = img.convert("RGB").quantize(255)
+                paletted.paste(255, mask=img.getchannel("A").point(lambda value: 255 if value < 128 else 0))
+                paletted.save(path, transparency=255)
+            else:
+                img.save(path, format=fmt)
+    return corpus
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(scenario: Dict, input_path: str, work_dir: str) -> Dict:
+    """
+    在当前进程中执行单个场景
+    峰值RSS为进程级指标，因此由 run_benchmark 为每个场景启动独立子进程
+    """
+    from config import settings
+    from framework.schemas import ImageConvertRequest
+    from services.image_service import ImageService
+
+    service = ImageService(None)
+    target_format = scenario["target_format"]
+    request = ImageConvertRequest(target_format=target_format)
+
+    latencies = []
+    output_bytes = 0
+    # 小图先预热一次，排除首次导入插件等一次性开销
+    warmup = 1 if scenario["iterations"] >= 5 else 0
+    # 转换结果写到work_dir，结束后恢复配置（--no-isolate时在调用方进程内运行）
+    original_upload_dir = settings.upload_dir
+    settings.upload_dir = work_dir
+    try:
+        for index in range(warmup + scenario["iterations"]):
+            start = time.perf_counter()
+            success, output_path, error = service.convert_image(input_path, target_format, None, request)
+            elapsed = time.perf_counter() - start
+            if not success:
+                raise RuntimeError(f"{scenario['name']} 转换失败: {error}")
+
+            output_bytes = os.path.getsize(output_path)
+            os.remove(output_path)
+            if index >= warmup:
+                latencies.append(elapsed * 1000)
+    finally:
+        settings.upload_dir = original_upload_dir
+
+    with Image.open(input_path) as img:
+        megapixels = img.width * img.height / 1_000_000
+
+    total_seconds = sum(latencies) / 1000
+    return {
+        "name": scenario["name"],
+        "iterations": len(latencies),
+        "input_bytes": os.path.getsize(input_path),
+        "output_bytes": output_bytes,
+        "throughput_ips": round(len(latencies) / total_seconds, 3),
+        "throughput_mps": round(len(latencies) * megapixels / total_seconds, 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        # Linux下ru_maxrss单位为KB，macOS下为字节
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+    }
+
+
+def run_benchmark(profile: str = "quick", corpus_dir: Optional[str] = None,
+                  only: Optional[str] = None, isolate: bool = True) -> Dict:
+    """执行基准测试，返回完整结果（含环境信息）"""
+    scenarios = build_scenarios(profile)
+    if only:
+        scenarios = [s for s in scenarios if only in s["name"]]
+
+    corpus_dir = corpus_dir or os.path.join(tempfile.gettempdir(), "image_benchmark_corpus")
+    corpus = generate_corpus(corpus_dir, sorted({s["size_name"] for s in scenarios}))
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scenario in scenarios:
+            input_path = corpus[f"{scenario['size_name']}/{scenario['source']}"]
+            if isolate:
+                # 每个场景一个全新进程，保证峰值RSS互不影响
+                # （不用max_tasks_per_child，它需要Python 3.11）
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    result = executor.submit(run_scenario, scenario, input_path, work_dir).result()
+            else:
+                result = run_scenario(scenario, input_path, work_dir)
+            results.append(result)
+            print(f"  {result['name']:<40}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                  f"{result['throughput_ips']:>10.1f}{result['peak_rss_mb']:>10.1f}{result['output_bytes']:>12}")
+
+    import PIL
+    return {
+        "profile": profile,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scenarios": results,
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, thresholds: Dict[str, float] = None) -> List[Dict]:
+    """
+    与基线对比，返回回退列表
+    只比较两边都存在的场景，基线中缺失的新场景不算回退
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    baseline_scenarios = {item["name"]: item for item in baseline.get("scenarios", [])}
+
+    regressions = []
+    for item in current.get("scenarios", []):
+        reference = baseline_scenarios.get(item["name"])
+        if reference is None:
+            continue
+        for metric, limit in thresholds.items():
+            old, new = reference.get(metric), item.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio > limit:
+                regressions.append({
+                    "scenario": item["name"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "ratio": round(ratio, 3),
+                    "limit": limit,
+                })
+    return regressions
+
+
+def save_json(data: Dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="图片转换基准测试")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="场景档位")
+    parser.add_argument("--only", help="只运行名称包含该字符串的场景")
+    parser.add_argument("--corpus-dir", help="测试图片目录（默认系统临时目录，可复用）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--no-isolate", action="store_true", help="在当前进程中运行（峰值RSS不再逐场景独立）")
+    args = parser.parse_args(argv)
+
+    print(f"🚀 图片转换基准测试 (profile={args.profile})")
+    print(f"  {'场景':<38}{'p50(ms)':>10}{'p99(ms)':>10}{'img/s':>10}{'RSS(MB)':>10}{'输出字节':>10}")
+    current = run_benchmark(args.profile, args.corpus_dir, args.only, isolate=not args.no_isolate)
+    save_json(current, args.output)
+    print(f"📄 结果已写入 {args.output}")
+
+    if args.update_baseline:
+        save_json(current, args.baseline)
+        print(f"📌 基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ 基线不存在: {args.baseline}，跳过对比（可用 --update-baseline 生成）")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != current["environment"]:
+        print("⚠️ 基线与当前运行环境不同，延迟类指标仅供参考")
+
+    regressions = compare_results(current, baseline)
+    if not regressions:
+        print("✅ 未发现性能回退")
+        return 0
+
+    print(f"❌ 发现 {len(regressions)} 项性能回退:")
+    for item in regressions:
+        print(f"  {item['scenario']:<40}{item['metric']:<14}{item['baseline']:>12} -> {item['current']:<12}"
+              f"(x{item['ratio']}, 阈值 x{item['limit']})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
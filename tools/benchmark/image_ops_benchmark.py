@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+图片操作后端基准测试 - 对比 pillow 与 numpy 实现
+
+用法:
+    python tools/benchmark/image_ops_benchmark.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from PIL import Image
+
+from services.image_ops_service import BACKENDS, get_image_ops_backend
+
+# 代表性图片尺寸：缩略图、手机截图、1080p、1200万像素照片
+SIZES = {
+    "thumb_256": (256, 256),
+    "phone_1170x2532": (1170, 2532),
+    "fhd_1920x1080": (1920, 1080),
+    "photo_4000x3000": (4000, 3000),
+}
+
+OPERATIONS = {
+    "flatten_alpha": lambda ops, rgba, rgb: ops.flatten_alpha(rgba),
+    "brightness_contrast": lambda ops, rgba, rgb: ops.adjust_brightness_contrast(rgb, 1.2, 1.3),
+    "grayscale": lambda ops, rgba, rgb: ops.grayscale(rgb),
+    "sharpen": lambda ops, rgba, rgb: ops.sharpen(rgb),
+}
+
+
+def make_images(size):
+    """生成带噪声和渐变透明度的测试图片"""
+    rgb = Image.merge("RGB", [Image.effect_noise(size, 64).convert("L") for _ in range(3)])
+    rgba = rgb.copy()
+    rgba.putalpha(Image.linear_gradient("L").resize(size))
+    return rgba, rgb
+
+
+def measure(func, repeat):
+    """返回多次运行中的最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(repeat: int):
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = get_image_ops_backend(name)
+        except ImportError as e:
+            print(f"⚠️ 跳过后端 {name}: {e}")
+
+    header = f"{'图片':<18}{'操作':<22}" + "".join(f"{name + '(ms)':>14}" for name in backends)
+    if len(backends) > 1:
+        header += f"{'加速比':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for size_name, size in SIZES.items():
+        rgba, rgb = make_images(size)
+        for op_name, op in OPERATIONS.items():
+            timings = [measure(lambda: op(ops, rgba, rgb), repeat) for ops in backends.values()]
+            line = f"{size_name:<18}{op_name:<22}" + "".join(f"{t:>14.2f}" for t in timings)
+            if len(timings) > 1:
+                line += f"{timings[0] / timings[1]:>9.2f}x"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图片操作后端基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    print("🚀 图片操作后端基准测试")
+    run(args.repeat)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+JSON序列化基准 - 测量列表接口每个请求的CPU耗时
+
+直接以ASGI协议调用FastAPI应用（不经过HTTP和测试客户端），对比：
+    json     显式指定JSONResponse：response_model先转成dict再json.dumps，dict接口走jsonable_encoder + json.dumps
+    orjson   当前的ORJSONRoute：response_model由pydantic直接序列化为JSON字节，dict接口用orjson
+场景为转换记录列表、支付记录列表（response_model）、返回dict列表的接口和单个转换结果。
+
+用法:
+    python tools/benchmark/json_benchmark.py [--requests 3000] [--items 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from framework.responses import ORJSONRoute
+from framework.schemas import ConversionRecordResponse, ImageConversionResponse, PaymentResponse
+from models import PaymentMethod, PaymentStatus, UserRole
+from tools.benchmark.middleware_benchmark import call, make_scope
+
+
+def make_data(items: int) -> dict:
+    now = datetime.now(timezone.utc)
+    records = [
+        SimpleNamespace(id=i, user_id=1, original_filename=f"photo_{i}.png", original_format="png",
+                        target_format="webp", file_size=123456 + i, conversion_time=0.123, status="success",
+                        error_message=None, created_at=now - timedelta(minutes=i))
+        for i in range(items)
+    ]
+    payments = [
+        SimpleNamespace(id=i, order_id=f"IMG_1700000000_{i:08x}", amount=29.9, payment_method=PaymentMethod.WECHAT,
+                        status=PaymentStatus.SUCCESS, target_role=UserRole.VIP, created_at=now - timedelta(days=i))
+        for i in range(items)
+    ]
+    record_dicts = [{key: value for key, value in vars(record).items()} for record in records]
+    image = {"filename": "photo.webp", "format": "webp", "width": 1920, "height": 1080,
+             "file_size": 234567, "url": "/api/image/download/photo.webp"}
+    conversion = ImageConversionResponse(
+        original_image={**image, "filename": "photo.png", "format": "png"},
+        converted_image=image,
+        processing_params={"target_format": "webp", "quality": 80, "resize": None},
+        conversion_stats={"conversion_time": 0.123, "compression_ratio": 0.42},
+        download_url="/api/image/download/photo.webp",
+    )
+    return {"records": records, "payments": payments, "record_dicts": record_dicts, "conversion": conversion}
+
+
+def build_app(route_class, data: dict, response_class=None) -> FastAPI:
+    kwargs = {"response_class": response_class} if response_class else {}
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/records", response_model=list[ConversionRecordResponse], **kwargs)
+    async def records():
+        return data["records"]
+
+    @router.get("/orders", response_model=list[PaymentResponse], **kwargs)
+    async def orders():
+        return data["payments"]
+
+    @router.get("/records-dict", **kwargs)
+    async def records_dict():
+        return data["record_dicts"]
+
+    @router.get("/convert", response_model=ImageConversionResponse, **kwargs)
+    async def convert():
+        return data["conversion"]
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return app
+
+
+async def measure(app, scope: dict, requests: int) -> float:
+    """返回平均每请求CPU耗时（微秒）"""
+    for _ in range(min(200, requests)):
+        await call(app, dict(scope))
+    start = time.process_time()
+    for _ in range(requests):
+        await call(app, dict(scope))
+    return (time.process_time() - start) / requests * 1_000_000
+
+
+async def run(requests: int, items: int):
+    data = make_data(items)
+    variants = {
+        "json": build_app(APIRoute, data, response_class=JSONResponse),
+        "orjson": build_app(ORJSONRoute, data),
+    }
+    scenarios = {
+        f"records({items})": "/api/records",
+        f"orders({items})": "/api/orders",
+        f"records_dict({items})": "/api/records-dict",
+        "convert": "/api/convert",
+    }
+
+    print(f"{'场景':<20}" + "".join(f"{name + '(us)':>14}" for name in variants) + f"{'节省(us)':>12}{'节省':>8}")
+    for scenario_name, path in scenarios.items():
+        timings = {name: await measure(app, make_scope(path), requests) for name, app in variants.items()}
+        saved = timings["json"] - timings["orjson"]
+        print(f"{scenario_name:<20}" + "".join(f"{timings[name]:>14.1f}" for name in variants)
+              + f"{saved:>12.1f}{saved / timings['json']:>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON序列化基准")
+    parser.add_argument("--requests", type=int, default=3000, help="每个场景的请求数")
+    parser.add_argument("--items", type=int, default=50, help="列表接口返回的条数")
+    args = parser.parse_args()
+
+    print("🚀 JSON序列化基准")
+    asyncio.run(run(args.requests, args.items))
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+HTTP压测工具 - 端到端测量 framework.fastapi_app.create_app() 的吞吐量
+
+应用在进程内启动：数据库换成临时SQLite，Redis换成fakeredis，
+按权重混合发送 convert/compress/info/login/usage/records/支付回调 请求，
+按路由统计RPS、延迟分布和错误率，用于部署前对比不同的worker/连接池配置。
+
+依赖fakeredis（不在运行时依赖中）: pip install -r requirements-dev.txt
+
+用法:
+    python tools/benchmark/load_test.py --concurrency 16 --requests 2000
+    python tools/benchmark/load_test.py --transport uvicorn --duration 30 --db-pool-size 20
+    python tools/benchmark/load_test.py --mix convert=5,info=5,usage=1 --output load.json
+    # 对比多worker部署：先自行启动 uvicorn main:app --workers 4，再指定 --target
+    python tools/benchmark/load_test.py --target http://127.0.0.1:8000 --mix info=1
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from PIL import Image
+
+# 默认流量配比（权重）
+DEFAULT_MIX = {
+    "convert": 3,
+    "compress": 3,
+    "info": 3,
+    "login": 1,
+    "usage": 2,
+    "records": 2,
+    "payment_callback": 1,
+}
+
+# 延迟直方图的桶上限（毫秒）
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+LOADTEST_USERNAME = "loadtest"
+LOADTEST_PASSWORD = "loadtest-password"
+LOADTEST_WECHAT_KEY = "loadtest-wechat-api-key"
+
+# 预先创建的待支付订单数量，回调按顺序循环使用
+SEEDED_ORDERS = 200
+
+
+def make_fake_redis():
+    """进程内的Redis替身（fakeredis，命令语义与Redis一致）"""
+    import fakeredis
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def setup_environment(work_dir: str, db_pool_size: int = 5) -> Dict:
+    """
+    把应用依赖切换到本地资源并写入种子数据
+    返回压测需要的上下文（访问令牌、订单号等）
+    """
+    from sqlalchemy import create_engine
+
+    from auth import get_password_hash
+    from config import settings
+    from models import PaymentMethod, PaymentRecord, User, UserRole
+    from redis_client import get_redis
+    from services.token_service import get_token_service
+    from tools.database import database
+
+    settings.upload_dir = os.path.join(work_dir, "uploads")
+    settings.wechat_api_key = LOADTEST_WECHAT_KEY
+    for sub_dir in ("", "uploads", "converted", "temp"):
+        os.makedirs(os.path.join(settings.upload_dir, sub_dir), exist_ok=True)
+
+    # 会话工厂改绑到SQLite，get_db在调用时读取SessionLocal，无需重建路由
+    engine = create_engine(
+        f"sqlite:///{os.path.join(work_dir, 'loadtest.db')}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=db_pool_size,
+        max_overflow=db_pool_size,
+    )
+    database.Base.metadata.create_all(bind=engine)
+    database.SessionLocal.configure(bind=engine)
+
+    get_redis().redis_client = make_fake_redis()
+
+    db = database.SessionLocal()
+    try:
+        user = User(
+            username=LOADTEST_USERNAME,
+            email=f"{LOADTEST_USERNAME}@example.com",
+            hashed_password=get_password_hash(LOADTEST_PASSWORD),
+            role=UserRole.FREE,
+        )
+        db.add(user)
+        db.flush()
+        order_ids = [f"LOADTEST{index:06d}" for index in range(SEEDED_ORDERS)]
+        db.add_all([
+            PaymentRecord(user_id=user.id, order_id=order_id, amount=settings.vip_price,
+                          payment_method=PaymentMethod.WECHAT, target_role=UserRole.VIP)
+            for order_id in order_ids
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        # get_current_user按用户名查找用户
+        # 支付回调会升级会员等级并吊销用户已登记的令牌，压测令牌直接签发、不登记会话
+        "token": get_token_service().create_token({"sub": LOADTEST_USERNAME, "exp": int(time.time()) + 86400}),
+        "order_ids": order_ids,
+        "engine": engine,
+    }
+
+
+def build_app():
+    """创建应用（不触发lifespan，建表和目录已由 setup_environment 完成）"""
+    from framework.fastapi_app import create_app
+    return create_app()
+
+
+def make_payloads() -> Dict[str, bytes]:
+    """生成上传用的图片"""
+    base = Image.merge("RGB", [
+        Image.linear_gradient("L").resize((640, 480)),
+        Image.effect_noise((640, 480), 32).convert("L"),
+        Image.radial_gradient("L").resize((640, 480)),
+    ])
+    payloads = {}
+    for name, fmt in (("photo.jpg", "JPEG"), ("photo.png", "PNG")):
+        buffer = io.BytesIO()
+        base.save(buffer, format=fmt, quality=85)
+        payloads[name] = buffer.getvalue()
+    return payloads
+
+
+class TrafficGenerator:
+    """按路由类型生成请求参数"""
+
+    def __init__(self, context: Dict, payloads: Dict[str, bytes]):
+        self.token = context.get("token")
+        self.payloads = payloads
+        self._orders = itertools.cycle(context.get("order_ids") or ["LOADTEST000000"])
+        self._transactions = itertools.count()
+
+        from services.wechat_pay_service import WeChatPayService
+        self._wechat = WeChatPayService()
+
+    def _auth_headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def build(self, kind: str) -> Dict:
+        return getattr(self, f"_build_{kind}")()
+
+    def _build_convert(self):
+        return {"method": "POST", "url": "/api/image/convert",
+                "files": {"file": ("photo.png", self.payloads["photo.png"], "image/png")},
+                "data": {"target_format": "webp", "quality": "80"}}
+
+    def _build_compress(self):
+        return {"method": "POST", "url": "/api/image/compress",
+                "files": {"file": ("photo.jpg", self.payloads["photo.jpg"], "image/jpeg")},
+                "data": {"quality": "70"}}
+
+    def _build_info(self):
+        return {"method": "GET", "url": "/api/image/info",
+                "files": {"file": ("photo.jpg", self.payloads["photo.jpg"], "image/jpeg")}}
+
+    def _build_login(self):
+        return {"method": "POST", "url": "/api/auth/login",
+                "json": {"username": LOADTEST_USERNAME, "password": LOADTEST_PASSWORD}}
+
+    def _build_usage(self):
+        return {"method": "GET", "url": "/api/image/usage", "headers": self._auth_headers()}
+
+    def _build_records(self):
+        return {"method": "GET", "url": "/api/image/records", "params": {"limit": 20},
+                "headers": self._auth_headers()}
+
+    def _build_payment_callback(self):
+        params = {
+            "return_code": "SUCCESS",
+            "result_code": "SUCCESS",
+            "out_trade_no": next(self._orders),
+            "transaction_id": f"LT{next(self._transactions):012d}",
+            "total_fee": "2990",
+            "nonce_str": self._wechat._generate_nonce_str(),
+        }
+        params["sign"] = self._wechat._generate_sign(params)
+        return {"method": "POST", "url": "/api/payment/wechat/callback",
+                "content": self._wechat._dict_to_xml(params).encode("utf-8"),
+                "headers": {"Content-Type": "text/xml"}}
+
+
+class RouteStats:
+    """单个路由的统计"""
+
+    def __init__(self):
+        self.latencies_ms = []
+        self.status_codes = Counter()
+        self.errors = 0
+
+    def record(self, latency_ms: float, status_code: Optional[int]):
+        self.latencies_ms.append(latency_ms)
+        if status_code is None:
+            self.errors += 1
+            self.status_codes["exception"] += 1
+            return
+        self.status_codes[str(status_code)] += 1
+        if status_code >= 400:
+            self.errors += 1
+
+
+def histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    """按 HISTOGRAM_BUCKETS_MS 统计延迟分布（非累积）"""
+    buckets = Counter()
+    for value in latencies_ms:
+        label = next((f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS if value <= b), f">{HISTOGRAM_BUCKETS_MS[-1]}ms")
+        buckets[label] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    return {label: buckets[label] for label in labels if buckets[label]}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))
+    return ordered[int(index)]
+
+
+def summarize(stats: Dict[str, RouteStats], elapsed: float) -> Dict:
+    """汇总为报告"""
+    routes = {}
+    all_latencies = []
+    total_errors = 0
+    for kind, route in sorted(stats.items()):
+        count = len(route.latencies_ms)
+        all_latencies.extend(route.latencies_ms)
+        total_errors += route.errors
+        routes[kind] = {
+            "requests": count,
+            "rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(route.errors / count, 4) if count else 0.0,
+            "status_codes": dict(route.status_codes),
+            "p50_ms": round(percentile(route.latencies_ms, 50), 2),
+            "p90_ms": round(percentile(route.latencies_ms, 90), 2),
+            "p99_ms": round(percentile(route.latencies_ms, 99), 2),
+            "max_ms": round(max(route.latencies_ms), 2) if count else 0.0,
+            "histogram": histogram(route.latencies_ms),
+        }
+
+    total = len(all_latencies)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total_requests": total,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(total_errors / total, 4) if total else 0.0,
+        "p50_ms": round(percentile(all_latencies, 50), 2),
+        "p99_ms": round(percentile(all_latencies, 99), 2),
+        "routes": routes,
+    }
+
+
+async def run_load(client: httpx.AsyncClient, generator: TrafficGenerator, mix: Dict[str, int],
+                   concurrency: int, total_requests: Optional[int] = None,
+                   duration: Optional[float] = None, seed: int = 0) -> Dict:
+    """
+    以固定并发发送请求，直到达到请求总数或持续时间
+    返回 summarize() 的报告
+    """
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    stats = {kind: RouteStats() for kind in kinds}
+    issued = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    async def worker():
+        while True:
+            if total_requests is not None and next(issued) >= total_requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            kind = rng.choices(kinds, weights)[0]
+            request = generator.build(kind)
+            sent = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                status_code = response.status_code
+            except Exception:
+                status_code = None
+            stats[kind].record((time.perf_counter() - sent) * 1000, status_code)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(stats, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def serve_with_uvicorn(app, http: str = "auto", limit_concurrency: Optional[int] = None):
+    """在后台线程中用真实uvicorn服务应用，返回基础URL"""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning",
+                            access_log=False, http=http, limit_concurrency=limit_concurrency)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn启动失败")
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """解析 'convert=3,info=1' 形式的流量配比"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"未知的请求类型: {name}，可选: {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def print_report(report: Dict):
+    print(f"\n总计: {report['total_requests']} 请求, {report['elapsed_seconds']}s, "
+          f"{report['rps']} req/s, 错误率 {report['error_rate']:.2%}, "
+          f"p50 {report['p50_ms']}ms, p99 {report['p99_ms']}ms")
+    print(f"{'路由':<20}{'请求数':>8}{'RPS':>10}{'错误率':>9}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}  状态码")
+    for kind, route in report["routes"].items():
+        print(f"{kind:<20}{route['requests']:>8}{route['rps']:>10}{route['error_rate']:>9.2%}"
+              f"{route['p50_ms']:>10}{route['p90_ms']:>10}{route['p99_ms']:>10}  {route['status_codes']}")
+
+
+async def _run(args, base_url: str, app=None, context: Dict = None) -> Dict:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False) if app is not None else None
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        generator = TrafficGenerator(context or {}, make_payloads())
+        return await run_load(client, generator, args.mix, args.concurrency,
+                              total_requests=None if args.duration else args.requests,
+                              duration=args.duration, seed=args.seed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FastAPI应用压测工具")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi",
+                        help="asgi: 进程内直接调用ASGI应用; uvicorn: 后台线程启动真实HTTP服务")
+    parser.add_argument("--target", help="压测已部署的服务（如多worker的uvicorn），此时不启动本地应用")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--requests", type=int, default=500, help="请求总数")
+    parser.add_argument("--duration", type=float, help="持续时间（秒），指定后忽略 --requests")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX), help="流量配比，如 convert=3,info=1")
+    parser.add_argument("--db-pool-size", type=int, default=5, help="SQLAlchemy连接池大小")
+    parser.add_argument("--http", default="auto", help="uvicorn HTTP实现: auto/h11/httptools")
+    parser.add_argument("--limit-concurrency", type=int, help="uvicorn最大并发连接数")
+    parser.add_argument("--seed", type=int, default=0, help="流量随机种子")
+    parser.add_argument("--output", help="报告JSON路径")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(f"🚀 压测开始: transport={args.target or args.transport}, concurrency={args.concurrency}, mix={args.mix}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 应用每个请求都会打印日志，压测期间屏蔽标准输出
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if args.target:
+                report = asyncio.run(_run(args, args.target))
+            else:
+                context = setup_environment(work_dir, args.db_pool_size)
+                app = build_app()
+                if args.transport == "uvicorn":
+                    with serve_with_uvicorn(app, args.http, args.limit_concurrency) as base_url:
+                        report = asyncio.run(_run(args, base_url, context=context))
+                else:
+                    report = asyncio.run(_run(args, "http://loadtest", app=app, context=context))
+                context["engine"].dispose()
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 报告已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+认证中间件微基准 - 测量每个请求的中间件额外开销
+
+直接以ASGI协议调用一个最小应用（不经过HTTP和测试客户端），对比：
+    none        不加中间件
+    base_http   旧实现的等价物：BaseHTTPMiddleware + 逐个前缀startswith + 每请求print
+    asgi        当前的纯ASGI AuthMiddleware
+场景包括公开接口、带令牌的受保护接口和1MB文件下载（流式响应）。
+
+用法:
+    python tools/benchmark/middleware_benchmark.py [--requests 5000]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+
+from auth import create_access_token
+from framework.middleware.auth_middleware import PUBLIC_PATHS, PUBLIC_PREFIXES, AuthMiddleware
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    """旧版AuthMiddleware的行为：每请求三次print中的一次、线性前缀扫描、不做校验"""
+
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        print(f"🔍 中间件处理请求: {path}")
+        if path in PUBLIC_PATHS or any(path.startswith(prefix) for prefix in PUBLIC_PREFIXES):
+            return await call_next(request)
+        return await call_next(request)
+
+
+def build_app(download_path: str) -> Starlette:
+    async def ok(request):
+        return JSONResponse({"ok": True})
+
+    async def download(request):
+        return FileResponse(download_path)
+
+    return Starlette(routes=[
+        Route("/api/image/formats", ok),
+        Route("/api/image/usage", ok),
+        Route("/api/image/download/{name}", download),
+    ])
+
+
+def make_scope(path: str, token: str = None) -> dict:
+    headers = [(b"host", b"bench")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+
+async def call(app, scope: dict) -> int:
+    """执行一次请求，返回状态码（响应体读完即丢弃）"""
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, scope: dict, requests: int) -> float:
+    """返回平均每请求耗时（微秒）"""
+    for _ in range(min(200, requests)):
+        await call(app, dict(scope))
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, dict(scope))
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def run(requests: int):
+    token = create_access_token({"sub": "bench"})
+    with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+        f.write(os.urandom(1024 * 1024))
+        download_path = f.name
+
+    try:
+        base = build_app(download_path)
+        variants = {
+            "none": base,
+            "base_http": LegacyAuthMiddleware(base),
+            "asgi": AuthMiddleware(base),
+        }
+        scenarios = {
+            "public": make_scope("/api/image/formats"),
+            "protected": make_scope("/api/image/usage", token),
+            "download_1mb": make_scope("/api/image/download/file.bin"),
+        }
+
+        print(f"{'场景':<16}" + "".join(f"{name + '(us)':>16}" for name in variants)
+              + f"{'base_http开销':>16}{'asgi开销':>12}")
+        for scenario_name, scope in scenarios.items():
+            timings = {}
+            for variant_name, app in variants.items():
+                # 旧实现的print输出到/dev/null，只保留其格式化与写入成本
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    timings[variant_name] = await measure(app, scope, requests)
+            line = f"{scenario_name:<16}" + "".join(f"{timings[name]:>16.1f}" for name in variants)
+            line += f"{timings['base_http'] - timings['none']:>16.1f}{timings['asgi'] - timings['none']:>12.1f}"
+            print(line)
+    finally:
+        os.remove(download_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="认证中间件微基准")
+    parser.add_argument("--requests", type=int, default=5000, help="每个场景的请求数")
+    args = parser.parse_args()
+
+    print("🚀 认证中间件微基准")
+    asyncio.run(run(args.requests))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+令牌校验基准 - 对比各JWT后端（python-jose、hmac）无缓存/LRU缓存命中的TokenService，
+以及PyJWT直接解码（仅作参考，未安装时跳过）
+
+用法:
+    python tools/benchmark/token_benchmark.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from auth import create_access_token
+from config import settings
+from services.token_service import BACKENDS, TokenService
+
+
+def measure(func, iterations: int) -> float:
+    """返回平均每次耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def run(iterations: int):
+    token = create_access_token({"sub": "benchmark"})
+    print(f"{'方式':<28}{'us/次':>10}")
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class()
+        except ImportError as e:
+            print(f"⚠️ 跳过后端 {name}: {e}")
+            continue
+
+        uncached = TokenService(backend, cache_size=0)
+        cached = TokenService(backend)
+        cached.verify(token)
+        print(f"{name + ' 无缓存':<28}{measure(lambda: uncached.verify(token), iterations):>10.2f}")
+        print(f"{name + ' LRU缓存命中':<28}{measure(lambda: cached.verify(token), iterations):>10.2f}")
+
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        print("⚠️ 跳过PyJWT直接解码: 未安装PyJWT")
+        return
+    elapsed = measure(lambda: pyjwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]), iterations)
+    print(f"{'PyJWT 直接解码':<28}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="令牌校验基准")
+    parser.add_argument("--iterations", type=int, default=20000, help="每种方式的校验次数")
+    args = parser.parse_args()
+
+    print("🚀 令牌校验基准")
+    run(args.iterations)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+本地微信支付网关桩 - 模拟V2 XML接口（统一下单、查询、关闭、退款），用于测试和本地联调
+
+请求签名用同一个API密钥校验，响应同样签名；订单保存在内存中，
+pay() 把订单标记为已支付并返回签好名的回调XML，可直接POST给 /api/payment/wechat/callback。
+--delay 可模拟慢网关，验证支付请求不会阻塞其他接口。
+
+测试中不经过网络：
+    stub = WeChatPayStub(api_key="test-key")
+    registry.register("wechat_pay", UpstreamConfig(), transport=httpx.ASGITransport(app=stub.app))
+
+单独运行（配合 WECHAT_PAY_API_BASE=http://127.0.0.1:9010）:
+    python tools/benchmark/wechat_pay_stub.py [--port 9010] [--delay 0.5]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+import uuid
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from services.wechat_pay_service import XmlDictParser, dict_to_xml, sign_params, verify_sign
+
+
+class WeChatPayStub:
+    """内存中的微信支付网关"""
+
+    def __init__(self, api_key: str = None, app_id: str = None, mch_id: str = None, delay: float = 0.0):
+        self.api_key = settings.wechat_api_key if api_key is None else api_key
+        self.app_id = settings.wechat_app_id if app_id is None else app_id
+        self.mch_id = settings.wechat_mch_id if mch_id is None else mch_id
+        self.delay = delay
+        # 商户订单号 -> 订单
+        self.orders: Dict[str, dict] = {}
+        self.refunds: Dict[str, dict] = {}
+        self.requests = []
+        self._transactions = itertools.count(1)
+        self.app = Starlette(routes=[
+            Route("/pay/unifiedorder", self._handler(self.unified_order), methods=["POST"]),
+            Route("/pay/orderquery", self._handler(self.order_query), methods=["POST"]),
+            Route("/pay/closeorder", self._handler(self.close_order), methods=["POST"]),
+            Route("/secapi/pay/refund", self._handler(self.refund), methods=["POST"]),
+        ])
+
+    def pay(self, out_trade_no: str, result_code: str = "SUCCESS") -> str:
+        """把订单标记为已支付，返回对应的回调XML"""
+        order = self.orders[out_trade_no]
+        order["trade_state"] = "SUCCESS" if result_code == "SUCCESS" else "PAYERROR"
+        order["time_end"] = time.strftime("%Y%m%d%H%M%S")
+        return self._sign_xml({
+            "return_code": "SUCCESS",
+            "result_code": result_code,
+            "appid": self.app_id,
+            "mch_id": self.mch_id,
+            "nonce_str": uuid.uuid4().hex,
+            "openid": "stub-openid",
+            "trade_type": order["trade_type"],
+            "total_fee": order["total_fee"],
+            "transaction_id": order["transaction_id"],
+            "out_trade_no": out_trade_no,
+            "time_end": order["time_end"],
+        })
+
+    def unified_order(self, params: dict) -> dict:
+        out_trade_no = params.get("out_trade_no", "")
+        if out_trade_no in self.orders:
+            return self._business_error("ORDERPAID" if self.orders[out_trade_no]["trade_state"] == "SUCCESS"
+                                        else "OUT_TRADE_NO_USED", "商户订单号重复")
+        prepay_id = f"wx{uuid.uuid4().hex[:28]}"
+        self.orders[out_trade_no] = {
+            "total_fee": params.get("total_fee", ""),
+            "trade_type": params.get("trade_type", "NATIVE"),
+            "trade_state": "NOTPAY",
+            "transaction_id": f"4200{next(self._transactions):024d}",
+            "prepay_id": prepay_id,
+            "time_end": "",
+        }
+        return {
+            "result_code": "SUCCESS",
+            "trade_type": params.get("trade_type", "NATIVE"),
+            "prepay_id": prepay_id,
+            "code_url": f"weixin://wxpay/bizpayurl?pr={prepay_id[-8:]}",
+        }
+
+    def order_query(self, params: dict) -> dict:
+        order = self._find_order(params)
+        if order is None:
+            return self._business_error("ORDERNOTEXIST", "订单不存在")
+        out_trade_no, order = order
+        return {
+            "result_code": "SUCCESS",
+            "trade_state": order["trade_state"],
+            "transaction_id": order["transaction_id"] if order["trade_state"] == "SUCCESS" else "",
+            "out_trade_no": out_trade_no,
+            "total_fee": order["total_fee"],
+            "time_end": order["time_end"],
+        }
+
+    def close_order(self, params: dict) -> dict:
+        order = self.orders.get(params.get("out_trade_no", ""))
+        if order is None:
+            return self._business_error("ORDERNOTEXIST", "订单不存在")
+        if order["trade_state"] == "SUCCESS":
+            return self._business_error("ORDERPAID", "订单已支付，不能关闭")
+        order["trade_state"] = "CLOSED"
+        return {"result_code": "SUCCESS"}
+
+    def refund(self, params: dict) -> dict:
+        order = self.orders.get(params.get("out_trade_no", ""))
+        if order is None or order["trade_state"] != "SUCCESS":
+            return self._business_error("TRADE_STATE_ERROR", "订单状态错误")
+        out_refund_no = params.get("out_refund_no", "")
+        refund = self.refunds.setdefault(out_refund_no, {
+            "refund_id": f"5030{next(self._transactions):024d}",
+            "refund_fee": params.get("refund_fee", ""),
+        })
+        order["trade_state"] = "REFUND"
+        return {"result_code": "SUCCESS", "out_refund_no": out_refund_no, **refund}
+
+    def _handler(self, action):
+        async def endpoint(request: Request) -> Response:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            parser = XmlDictParser()
+            try:
+                async for chunk in request.stream():
+                    parser.feed(chunk)
+                params = parser.close()
+            except ValueError as e:
+                return self._response({"return_code": "FAIL", "return_msg": str(e)}, sign=False)
+            self.requests.append((request.url.path, params))
+
+            if not verify_sign(params, self.api_key):
+                return self._response({"return_code": "FAIL", "return_msg": "签名错误"}, sign=False)
+            if params.get("mch_id") != self.mch_id:
+                return self._response({"return_code": "FAIL", "return_msg": "商户号不匹配"}, sign=False)
+
+            result = {
+                "return_code": "SUCCESS",
+                "return_msg": "OK",
+                "appid": self.app_id,
+                "mch_id": self.mch_id,
+                "nonce_str": uuid.uuid4().hex,
+                **action(params),
+            }
+            return self._response(result)
+        return endpoint
+
+    def _find_order(self, params: dict):
+        out_trade_no = params.get("out_trade_no")
+        if out_trade_no:
+            order = self.orders.get(out_trade_no)
+            return (out_trade_no, order) if order else None
+        for out_trade_no, order in self.orders.items():
+            if order["transaction_id"] == params.get("transaction_id"):
+                return out_trade_no, order
+        return None
+
+    @staticmethod
+    def _business_error(code: str, message: str) -> dict:
+        return {"result_code": "FAIL", "err_code": code, "err_code_des": message}
+
+    def _sign_xml(self, params: dict) -> str:
+        params["sign"] = sign_params(params, self.api_key)
+        return dict_to_xml(params)
+
+    def _response(self, params: dict, sign: bool = True) -> Response:
+        content = self._sign_xml(params) if sign else dict_to_xml(params)
+        return Response(content, media_type="application/xml")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地微信支付网关桩")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9010)
+    parser.add_argument("--delay", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = WeChatPayStub(delay=args.delay)
+    print(f"🧪 微信支付网关桩: http://{args.host}:{args.port}（设置 WECHAT_PAY_API_BASE 指向此地址）")
+    uvicorn.run(stub.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+-- 转换历史游标分页使用的索引
+-- 列表按 user_id 过滤并按 (created_at, id) 倒序翻页，每页直接从游标位置开始读取，不再随OFFSET增大而变慢
+
+CREATE INDEX idx_conversion_records_user_created_id ON conversion_records(user_id, created_at, id);
+
+-- 显示索引确认
+SHOW INDEX FROM conversion_records;
@@ -0,0 +1,20 @@
+-- 转换统计日汇总表
+-- 每个用户每天每种目标格式一行，转换时以 INSERT ... ON DUPLICATE KEY UPDATE 累加；
+-- 统计接口只读这张表，不再聚合扫描 conversion_records
+
+CREATE TABLE IF NOT EXISTS conversion_stats_daily (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    stat_date DATE NOT NULL,
+    target_format VARCHAR(10) NOT NULL,
+    conversion_count INT NOT NULL DEFAULT 0,
+    failure_count INT NOT NULL DEFAULT 0,
+    bytes_in BIGINT NOT NULL DEFAULT 0,
+    bytes_out BIGINT NOT NULL DEFAULT 0,
+    total_time DOUBLE NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_conversion_stats_daily_user_date_format (user_id, stat_date, target_format),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- 显示表结构确认
+DESCRIBE conversion_stats_daily;
@@ -0,0 +1,117 @@
+"""
+conversion_records 按月范围分区（仅MySQL）
+
+分区按 created_at 划分，每月一个分区 pYYYYMM（VALUES LESS THAN 下月1日），
+最后是兜底分区 pmax（VALUES LESS THAN MAXVALUE）：
+    - 预建：把空的 pmax 拆出未来几个月的分区（REORGANIZE空分区只改元数据）
+    - 保留期清理：整月都已过期的分区直接 DROP PARTITION，不再逐行删除
+其他数据库（如本地SQLite）不分区，这里的函数对它们不做任何操作。
+"""
+import re
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARTITIONED_TABLE = "conversion_records"
+PARTITION_COLUMN = "created_at"
+CATCH_ALL_PARTITION = "pmax"
+
+_MONTH_PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def month_start(value: date) -> date:
+    """所在月的1日"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """月份加减（返回月初）"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """从分区名解析月份，兜底分区等返回None"""
+    match = _MONTH_PARTITION.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def month_range(first: date, last: date) -> List[date]:
+    """first到last（含）之间的每个月初"""
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_definition(month: date) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def catch_all_definition() -> str:
+    return f"PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+
+def partition_by_clause(months: List[date]) -> str:
+    """建立分区用的 PARTITION BY 子句（第一个分区同时容纳更早的记录）"""
+    definitions = [partition_definition(month) for month in months] + [catch_all_definition()]
+    return f"PARTITION BY RANGE COLUMNS({PARTITION_COLUMN}) ({', '.join(definitions)})"
+
+
+def list_partitions(conn: Connection, table: str = PARTITIONED_TABLE) -> List[str]:
+    """表的分区名（按分区顺序），未分区或非MySQL返回空列表"""
+    if conn.dialect.name != "mysql":
+        return []
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": table})
+    return [row[0] for row in rows]
+
+
+def plan_future_partitions(partitions: List[str], today: date, months_ahead: int) -> List[date]:
+    """需要从兜底分区拆出的月份：最后一个月分区之后，直到当月+months_ahead"""
+    months = [month for month in map(partition_month, partitions) if month]
+    last_needed = add_months(month_start(today), months_ahead)
+    first_missing = add_months(max(months), 1) if months else month_start(today)
+    return month_range(first_missing, last_needed) if first_missing <= last_needed else []
+
+
+def plan_expired_partitions(partitions: List[str], before: datetime) -> List[str]:
+    """整月记录都早于before的分区"""
+    return [
+        name for name in partitions
+        if (month := partition_month(name)) and datetime.combine(add_months(month, 1), datetime.min.time()) <= before
+    ]
+
+
+def ensure_future_partitions(conn: Connection, months_ahead: int, today: Optional[date] = None,
+                             table: str = PARTITIONED_TABLE) -> List[str]:
+    """预建未来月份的分区，返回新建的分区名"""
+    partitions = list_partitions(conn, table)
+    if CATCH_ALL_PARTITION not in partitions:
+        return []
+    months = plan_future_partitions(partitions, today or date.today(), months_ahead)
+    if not months:
+        return []
+    definitions = [partition_definition(month) for month in months] + [catch_all_definition()]
+    conn.execute(text(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO ({', '.join(definitions)})"
+    ))
+    return [partition_name(month) for month in months]
+
+
+def drop_expired_partitions(conn: Connection, before: datetime, table: str = PARTITIONED_TABLE) -> List[str]:
+    """删除整月都早于before的分区，返回删除的分区名"""
+    expired = plan_expired_partitions(list_partitions(conn, table), before)
+    if expired:
+        conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}"))
+    return expired
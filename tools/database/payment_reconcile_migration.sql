@@ -0,0 +1,7 @@
+-- 待支付订单对账任务使用的索引
+-- 对账按 status = 'PENDING' 扫描并按 created_at 分批，避免全表扫描 payment_records
+
+CREATE INDEX idx_payment_records_status_created_at ON payment_records(status, created_at);
+
+-- 显示索引确认
+SHOW INDEX FROM payment_records;
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+热点查询执行计划检查 - 对每个登记的热点查询执行EXPLAIN，出现全表扫描时以非0状态退出
+
+支持MySQL（EXPLAIN，type为ALL/index视为全扫描）和SQLite（EXPLAIN QUERY PLAN，SCAN视为全扫描）。
+查询与各服务中的写法保持一致，新增热点查询时在 HOT_QUERIES 中登记。
+
+用法:
+    python tools/database/query_plan_check.py                        # 检查配置中的数据库
+    python tools/database/query_plan_check.py --database-url sqlite:// --create-all   # 按当前模型建空库检查
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, or_, select, tuple_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import Select
+
+from models import ConversionRecord, ConversionStatsDaily, DailyUsage, PaymentRecord, PaymentStatus, User
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+# 名称 -> 构造查询语句（参数取代表性的值）
+HOT_QUERIES: Dict[str, Callable[[], Select]] = {
+    # routers/auth_simple.py 用户名或邮箱登录
+    "login_by_username_or_email": lambda: select(User).where(
+        or_(User.username == "alice", User.email == "alice")
+    ).limit(1),
+    # UserService.get_daily_usage 当天用量
+    "daily_usage_today": lambda: select(DailyUsage).where(
+        DailyUsage.user_id == 1, DailyUsage.usage_date == date(2026, 1, 1)
+    ).limit(1),
+    # PaymentService.get_user_payments 用户支付记录
+    "user_payments": lambda: select(PaymentRecord).where(
+        PaymentRecord.user_id == 1
+    ).order_by(PaymentRecord.created_at.desc()).limit(10),
+    # 调度器对账：待支付订单按创建时间分批
+    "pending_payments_batch": lambda: select(PaymentRecord).where(
+        PaymentRecord.status == PaymentStatus.PENDING,
+        PaymentRecord.created_at < NOW,
+    ).order_by(PaymentRecord.created_at, PaymentRecord.id).limit(200),
+    # ConversionHistoryService.list_records 游标分页
+    "conversion_history_page": lambda: select(ConversionRecord).where(
+        ConversionRecord.user_id == 1,
+        tuple_(ConversionRecord.created_at, ConversionRecord.id) < (NOW, 100),
+    ).order_by(ConversionRecord.created_at.desc(), ConversionRecord.id.desc()).limit(21),
+    # ConversionStatsService.get_stats 用户统计
+    "user_conversion_stats": lambda: select(ConversionStatsDaily).where(
+        ConversionStatsDaily.user_id == 1,
+        ConversionStatsDaily.stat_date >= date(2026, 1, 1) - timedelta(days=29),
+        ConversionStatsDaily.stat_date <= date(2026, 1, 1),
+    ),
+}
+
+
+def explain(conn: Connection, statement: Select) -> List[dict]:
+    """执行EXPLAIN，返回计划各行"""
+    compiled = statement.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    result = conn.exec_driver_sql(prefix + compiled.string, params)
+    return [dict(row._mapping) for row in result]
+
+
+def full_scans(dialect_name: str, plan: List[dict]) -> List[str]:
+    """计划中的全表/全索引扫描"""
+    if dialect_name == "sqlite":
+        return [row["detail"] for row in plan if row["detail"].startswith("SCAN ")]
+    return [f"{row['table']}: type={row['type']}" for row in plan if row.get("type") in ("ALL", "index")]
+
+
+def describe(dialect_name: str, plan: List[dict]) -> str:
+    if dialect_name == "sqlite":
+        return "; ".join(row["detail"] for row in plan)
+    return "; ".join(f"{row['table']}:{row['type']}:{row.get('key')}" for row in plan)
+
+
+def check_queries(engine: Engine) -> List[dict]:
+    """检查所有热点查询，返回 [{"name", "plan", "full_scans"}]"""
+    results = []
+    with engine.connect() as conn:
+        for name, build in HOT_QUERIES.items():
+            plan = explain(conn, build())
+            results.append({
+                "name": name,
+                "plan": describe(conn.dialect.name, plan),
+                "full_scans": full_scans(conn.dialect.name, plan),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="热点查询执行计划检查")
+    parser.add_argument("--database-url", help="数据库连接串，默认使用配置中的 database_url")
+    parser.add_argument("--create-all", action="store_true", help="检查前按当前模型建表（用于空的本地库）")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from tools.database.database import engine
+
+    if args.create_all:
+        from tools.database.database import Base
+        Base.metadata.create_all(bind=engine)
+
+    failed = 0
+    for result in check_queries(engine):
+        ok = not result["full_scans"]
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {result['name']:<28} {result['plan']}")
+
+    if failed:
+        print(f"❌ {failed} 个查询存在全表扫描")
+        sys.exit(1)
+    print("✅ 所有热点查询都命中索引")
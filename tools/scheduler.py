@@ -4,8 +4,11 @@
 """
 import schedule
 import time
+import asyncio
 import logging
+from collections import Counter
 from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 import sys
 import os
@@ -14,7 +17,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tools.database.database import get_db
-from models import ConversionRecord
+from tools.database.partitioning import drop_expired_partitions, ensure_future_partitions
+from config import settings
+from models import ConversionRecord, PaymentMethod, PaymentRecord, PaymentStatus
+from services.http_client_service import get_http_client
+from services.payment_callback_service import APPLIED, get_payment_callback_service
+from services.wechat_pay_service import WeChatPayService
 import threading
 
 # 设置日志
@@ -54,26 +62,28 @@ def cleanup_anonymous_records():
             db.close()
 
 def cleanup_old_records():
-    """清理所有超过30天的转换记录"""
+    """
+    清理超过保留期的转换记录
+    MySQL分区表先整月DROP过期分区，剩下不满一个月的过期记录再批量删除（只落在最早的分区内）
+    """
     try:
         db = next(get_db())
         
-        # 删除30天前的所有记录
-        cutoff_date = datetime.now() - timedelta(days=30)
+        cutoff_date = datetime.now() - timedelta(days=settings.conversion_record_retention_days)
         
-        # 查询要删除的记录
-        records_to_delete = db.query(ConversionRecord).filter(
+        with db.get_bind().begin() as conn:
+            dropped = drop_expired_partitions(conn, cutoff_date)
+        if dropped:
+            logger.info(f"✅ 删除过期分区: {', '.join(dropped)}")
+        
+        deleted = db.query(ConversionRecord).filter(
             ConversionRecord.created_at < cutoff_date
-        ).all()
+        ).delete(synchronize_session=False)
+        db.commit()
         
-        if records_to_delete:
-            # 删除记录
-            for record in records_to_delete:
-                db.delete(record)
-            
-            db.commit()
-            logger.info(f"✅ 清理完成：删除了 {len(records_to_delete)} 条超过30天的转换记录")
-        else:
+        if deleted:
+            logger.info(f"✅ 清理完成：删除了 {deleted} 条超过{settings.conversion_record_retention_days}天的转换记录")
+        elif not dropped:
             logger.info("ℹ️ 没有需要清理的旧记录")
             
     except Exception as e:
@@ -84,6 +94,132 @@ def cleanup_old_records():
         if 'db' in locals():
             db.close()
 
+def maintain_conversion_partitions():
+    """MySQL分区表预建未来月份的分区（未分区的表不做任何操作）"""
+    try:
+        db = next(get_db())
+        with db.get_bind().begin() as conn:
+            created = ensure_future_partitions(conn, settings.conversion_partition_premake_months)
+        if created:
+            logger.info(f"✅ 预建转换记录分区: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"❌ 维护转换记录分区时出错: {e}")
+    finally:
+        if 'db' in locals():
+            db.close()
+
+async def reconcile_order(wechat_pay_service: WeChatPayService, order, expire_before: datetime) -> dict:
+    """
+    向支付网关查询单个待支付订单，返回处理决定：
+        paid      网关显示已支付（回调丢失），补做支付成功处理
+        cancelled 订单已关闭/撤销，或超时未支付（先在网关关闭，避免关闭后用户又完成支付）
+        failed    支付失败
+        pending   仍在等待支付
+        error     查询失败，下一轮重试
+    """
+    expired = order.created_at < expire_before
+    result = await wechat_pay_service.query_order(out_trade_no=order.order_id)
+    if not result["success"]:
+        # 统一下单没有成功的订单在网关不存在，超时后直接关闭
+        if result.get("err_code") == "ORDERNOTEXIST" and expired:
+            return {"action": "cancelled"}
+        return {"action": "error", "error": result["error"]}
+
+    trade_state = result.get("trade_state")
+    if trade_state == "SUCCESS":
+        return {"action": "paid", "transaction_id": result.get("transaction_id")}
+    if trade_state in ("CLOSED", "REVOKED"):
+        return {"action": "cancelled"}
+    if trade_state == "PAYERROR":
+        return {"action": "failed"}
+    if trade_state == "NOTPAY" and expired:
+        closed = await wechat_pay_service.close_order(order.order_id)
+        if closed["success"]:
+            return {"action": "cancelled"}
+        return {"action": "error", "error": closed["error"]}
+    return {"action": "pending"}
+
+async def reconcile_pending_payments_async(now: datetime = None) -> Counter:
+    """
+    对账：分批扫描创建一段时间后仍为待支付的微信支付订单，限制并发地向网关查询，
+    已支付的补做升级，超时未支付的关闭；返回各处理结果的数量
+    """
+    now = now or datetime.now()
+    scan_before = now - timedelta(seconds=settings.payment_reconcile_min_age_seconds)
+    expire_before = now - timedelta(seconds=settings.payment_order_expire_seconds)
+    batch_size = settings.payment_reconcile_batch_size
+    semaphore = asyncio.Semaphore(settings.payment_reconcile_concurrency)
+    wechat_pay_service = WeChatPayService()
+    callback_service = get_payment_callback_service()
+    stats = Counter()
+
+    async def check(order):
+        async with semaphore:
+            try:
+                return await reconcile_order(wechat_pay_service, order, expire_before)
+            except Exception as e:
+                return {"action": "error", "error": str(e)}
+
+    db = next(get_db())
+    try:
+        cursor = None
+        while True:
+            # 按 (created_at, id) 翻页，走 (status, created_at) 索引，不用OFFSET
+            query = db.query(PaymentRecord.id, PaymentRecord.order_id, PaymentRecord.created_at).filter(
+                PaymentRecord.status == PaymentStatus.PENDING,
+                PaymentRecord.payment_method == PaymentMethod.WECHAT,
+                PaymentRecord.created_at < scan_before
+            )
+            if cursor is not None:
+                query = query.filter(or_(
+                    PaymentRecord.created_at > cursor[0],
+                    and_(PaymentRecord.created_at == cursor[0], PaymentRecord.id > cursor[1])
+                ))
+            orders = query.order_by(PaymentRecord.created_at, PaymentRecord.id).limit(batch_size).all()
+            if not orders:
+                break
+            cursor = (orders[-1].created_at, orders[-1].id)
+
+            decisions = await asyncio.gather(*(check(order) for order in orders))
+            # 数据库更新在同一个会话中依次执行；单个订单出错只记为error，不影响排在后面的订单
+            for order, decision in zip(orders, decisions):
+                action = decision["action"]
+                try:
+                    if action == "paid":
+                        outcome = callback_service.handle_success(db, order.order_id, decision["transaction_id"])
+                        if outcome == APPLIED:
+                            callback_service.finish_success(order.order_id)
+                    elif action == "cancelled":
+                        callback_service.apply_failure(db, order.order_id, PaymentStatus.CANCELLED)
+                    elif action == "failed":
+                        callback_service.apply_failure(db, order.order_id, PaymentStatus.FAILED)
+                    elif action == "error":
+                        logger.warning(f"⚠️ 对账查询订单失败 {order.order_id}: {decision['error']}")
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"❌ 对账更新订单失败 {order.order_id} ({action}): {e}")
+                    action = "error"
+                stats[action] += 1
+
+            if len(orders) < batch_size:
+                break
+    finally:
+        db.close()
+        # 连接池属于本次任务的事件循环，结束时关闭
+        await get_http_client("wechat_pay").aclose()
+    return stats
+
+def reconcile_pending_payments():
+    """待支付订单对账（调度器线程中运行）"""
+    try:
+        stats = asyncio.run(reconcile_pending_payments_async())
+        if stats:
+            logger.info(f"✅ 支付对账完成: {dict(stats)}")
+        else:
+            logger.info("ℹ️ 没有需要对账的待支付订单")
+    except Exception as e:
+        logger.error(f"❌ 支付对账时出错: {e}")
+
 def start_scheduler():
     """启动定时任务调度器"""
     logger.info("🚀 启动定时任务调度器")
@@ -91,8 +227,12 @@ def start_scheduler():
     # 每天凌晨12点清理匿名记录
     schedule.every().day.at("00:00").do(cleanup_anonymous_records)
     
-    # 每周日凌晨2点清理所有旧记录
-    schedule.every().sunday.at("02:00").do(cleanup_old_records)
+    # 每天凌晨2点清理超过保留期的记录，并预建转换记录分区
+    schedule.every().day.at("02:00").do(cleanup_old_records)
+    schedule.every().day.at("02:30").do(maintain_conversion_partitions)
+    
+    # 定期对账待支付订单（回调丢失时补做升级，超时订单关闭）
+    schedule.every(settings.payment_reconcile_interval_minutes).minutes.do(reconcile_pending_payments)
     
     # 运行调度器
     while True:
@@ -113,5 +253,9 @@ if __name__ == "__main__":
     
     print("🧹 开始清理旧记录...")
     cleanup_old_records()
+    maintain_conversion_partitions()
+    
+    print("💳 开始对账待支付订单...")
+    reconcile_pending_payments()
     
     print("✅ 清理任务完成")
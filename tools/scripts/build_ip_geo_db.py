@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+生成本地IP地理位置数据 - 把RIR分配表转换为 IpGeoService 使用的CSV
+
+输入为各RIR发布的delegated统计文件（如APNIC的 delegated-apnic-latest），
+每行形如 apnic|CN|ipv4|1.0.1.0|256|20110414|allocated。
+输出按起始地址排序，并合并国家相同的相邻IP段：
+    起始IP,结束IP,国家代码
+
+用法:
+    python tools/scripts/build_ip_geo_db.py delegated-apnic-latest [delegated-ripencc-latest ...] -o data/ip_geo.csv
+"""
+import argparse
+import csv
+import ipaddress
+import os
+from typing import Iterable, List, Tuple
+
+Range = Tuple[int, int, int, str]  # (版本, 起始, 结束, 国家代码)
+
+
+def parse_delegated(lines: Iterable[str]) -> List[Range]:
+    """解析delegated统计文件，跳过汇总行和未分配的记录"""
+    ranges = []
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        parts = line.strip().split("|")
+        if len(parts) < 7 or parts[2] not in ("ipv4", "ipv6") or parts[6] not in ("allocated", "assigned"):
+            continue
+        country_code = parts[1].upper()
+        if not country_code or country_code == "*":
+            continue
+        start = ipaddress.ip_address(parts[3])
+        if parts[2] == "ipv4":
+            # ipv4的第5列是地址数量
+            end = int(start) + int(parts[4]) - 1
+        else:
+            # ipv6的第5列是前缀长度
+            end = int(ipaddress.ip_network(f"{parts[3]}/{parts[4]}").broadcast_address)
+        ranges.append((start.version, int(start), end, country_code))
+    return ranges
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """合并国家相同且相邻的IP段"""
+    merged: List[Range] = []
+    for version, start, end, country_code in sorted(ranges):
+        if merged:
+            last_version, last_start, last_end, last_country = merged[-1]
+            if last_version == version and last_country == country_code and start <= last_end + 1:
+                merged[-1] = (version, last_start, max(end, last_end), country_code)
+                continue
+        merged.append((version, start, end, country_code))
+    return merged
+
+
+def write_csv(ranges: List[Range], output: str):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start_ip", "end_ip", "country_code"])
+        for version, start, end, country_code in ranges:
+            address_class = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+            writer.writerow([address_class(start), address_class(end), country_code])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把RIR分配表转换为本地IP地理位置CSV")
+    parser.add_argument("inputs", nargs="+", help="delegated统计文件")
+    parser.add_argument("-o", "--output", default="data/ip_geo.csv", help="输出CSV路径")
+    args = parser.parse_args()
+
+    ranges = []
+    for path in args.inputs:
+        with open(path, encoding="utf-8") as f:
+            parsed = parse_delegated(f)
+        print(f"📄 {path}: {len(parsed)} 条")
+        ranges.extend(parsed)
+
+    merged = merge_ranges(ranges)
+    # 先写临时文件再替换，服务热加载时不会读到写了一半的文件
+    temp_path = f"{args.output}.tmp"
+    write_csv(merged, temp_path)
+    os.replace(temp_path, args.output)
+    print(f"✅ 已生成 {args.output}，合并后 {len(merged)} 条")
+
+
+if __name__ == "__main__":
+    main()